@@ -0,0 +1,325 @@
+import asyncio
+import io
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from operator import itemgetter
+from typing import Any
+
+from .b_tree import BTree
+from .node import Node
+
+
+def _run_batch_in_process(
+    data: bytes, t: int, method: str, batch: list[Any]
+) -> tuple[bytes | None, Any]:
+    """別プロセスで、ダンプから復元した B木に一括操作を適用します。
+
+    Args:
+        data: `BTree.dump` で書き出した B木。
+        t: B木の最小次数。
+        method: 呼び出す一括操作のメソッド名。
+        batch: メソッドに渡す入力。
+
+    Returns:
+        (変更後の B木のダンプ, メソッドの戻り値) のタプル。B木が変更されない場合、ダンプは None。
+    """
+    tree: BTree[Any] = BTree.load(io.BytesIO(data), t)
+    result = getattr(tree, method)(batch)
+    if method == "get_many":
+        return None, result
+    buf = io.BytesIO()
+    tree.dump(buf)
+    return buf.getvalue(), result
+
+
+def _run_batch_via_process(
+    tree: BTree[Any], executor: Executor, method: str, batch: list[Any]
+) -> Any:
+    """B木をダンプしてプロセスのエグゼキュータで一括操作を適用し、結果を同じ B木に読み込みます。
+
+    イベントループを止めないよう、スレッドで実行します。
+    読み込んだ B木のルートを tree に付け替えるため、tree を参照している他のオブジェクトにも結果が見えます。
+
+    Args:
+        tree: 操作対象の B木。
+        executor: 一括操作を実行するプロセスのエグゼキュータ。
+        method: 呼び出す一括操作のメソッド名。
+        batch: メソッドに渡す入力。
+
+    Returns:
+        メソッドの戻り値。
+    """
+    tree._settle()
+    buf = io.BytesIO()
+    tree.dump(buf)
+    data, result = executor.submit(
+        _run_batch_in_process, buf.getvalue(), tree.t, method, batch
+    ).result()
+    if data is not None:
+        tree.root = BTree.load(io.BytesIO(data), tree.t).root
+        tree._settle()
+    return result
+
+
+class AsyncBTree[T]:
+    """asyncio のイベントループを長時間止めずに B木を操作するためのファサード。
+
+    1 件ずつの操作は O(log n) なのでそのまま実行します。一括操作は入力をキーでソートしてから
+    チャンクに分け、各チャンクが訪問するノード数が yield_every 以下になるようにして、
+    チャンクごとにイベントループへ制御を返します。
+    走査は `BTree.snapshot` のスナップショット上で行うため、走査の途中で制御を返している間も
+    他のコルーチンが B木を変更できます。
+
+    executor を指定すると、offload_threshold 件以上の一括操作をエグゼキュータで実行します。
+    スレッドのエグゼキュータでは B木をそのまま操作し、プロセスのエグゼキュータでは
+    `BTree.dump` / `BTree.load` で B木をやり取りします (B木全体のコピーが必要になるため、
+    B木の大きさに匹敵するような一括操作に向いています)。プロセスとのやり取りのダンプと読み込み、
+    入力のソートもイベントループの外で行い、結果は同じ B木のオブジェクトに反映します。
+    プロセスのエグゼキュータは、サブクラスでない `BTree` にだけ使えます。ワーカープロセスは
+    スレッドから起動されるため、`mp_context` に "forkserver" か "spawn" を指定して作成してください。
+    エグゼキュータでの実行中は、このファサードを通した他の操作は完了を待ちます。
+
+    Attributes:
+        tree (BTree[T]): 操作対象の B木。
+        yield_every (int): イベントループに制御を返すまでに訪問するノード数の目安。
+        executor (Optional[Executor]): 大きな一括操作を実行するエグゼキュータ。
+        offload_threshold (int): エグゼキュータで実行する一括操作の最小の件数。
+    """
+
+    def __init__(
+        self,
+        tree: BTree[T],
+        yield_every: int = 1024,
+        executor: Executor | None = None,
+        offload_threshold: int = 100_000,
+    ):
+        """ファサードを初期化します。
+
+        Args:
+            tree: 操作対象の B木。
+            yield_every: イベントループに制御を返すまでに訪問するノード数の目安。
+            executor: 大きな一括操作を実行するエグゼキュータ。None の場合は常にイベントループ上で実行します。
+            offload_threshold: エグゼキュータで実行する一括操作の最小の件数。
+
+        Raises:
+            ValueError: yield_every が 1 未満の場合。
+            TypeError: プロセスのエグゼキュータと `BTree` のサブクラスを組み合わせた場合。
+        """
+        if yield_every < 1:
+            raise ValueError("yield_every は 1 以上である必要があります。")
+        if isinstance(executor, ProcessPoolExecutor) and type(tree) is not BTree:
+            # ダンプから読み込んだノードは BTree のノードで、サブクラスの状態を復元できない
+            raise TypeError(
+                "プロセスのエグゼキュータは BTree のサブクラスには使用できません。"
+            )
+        self.tree = tree
+        self.yield_every = yield_every
+        self.executor = executor
+        self.offload_threshold = offload_threshold
+        self._lock = asyncio.Lock()
+
+    async def insert(self, key: T, value: int) -> None:
+        """キーと値のペアを挿入します。`BTree.insert` と同じです。"""
+        async with self._lock:
+            self.tree.insert(key, value)
+
+    async def update(self, key: T, value: int) -> bool:
+        """既存のキーの値を更新します。`BTree.update` と同じです。"""
+        async with self._lock:
+            updated: bool = self.tree.update(key, value)
+        return updated
+
+    async def delete(self, key: T) -> bool:
+        """キーを削除します。`BTree.delete` と同じです。"""
+        async with self._lock:
+            deleted: bool = self.tree.delete(key)
+        return deleted
+
+    async def search(self, key: T) -> tuple[Node[T], int] | None:
+        """キーを検索します。`BTree.search` と同じです。"""
+        async with self._lock:
+            found: tuple[Node[T], int] | None = self.tree.search(key)
+        return found
+
+    def _chunk_size(self) -> int:
+        """1 つのチャンクで処理する件数を、ツリーの高さと yield_every から求めます。"""
+        height = 1
+        node = self.tree.root
+        while not node.is_leaf:
+            node = node.children[0]
+            height += 1
+        return max(1, self.yield_every // height)
+
+    async def _run_batch[R](
+        self,
+        method: str,
+        batch: list[Any],
+        sort_key: Callable[[Any], Any] | None,
+        apply: Callable[[list[Any]], list[R] | None],
+    ) -> list[R]:
+        """一括操作を、チャンクごとに制御を返しながら、またはエグゼキュータで実行します。
+
+        入力が offload_threshold 件以上でエグゼキュータが指定されている場合は、入力をそのまま
+        B木のメソッドに渡してエグゼキュータで実行します。ソートもエグゼキュータ側で行われます。
+        それ以外の場合は入力を sort_key で安定ソートしてチャンクに分け、apply に渡します。
+
+        Args:
+            method: エグゼキュータで実行する場合に呼び出す B木のメソッド名。
+            batch: 入力の順序のままの入力。
+            sort_key: 入力の要素からキーを取り出す関数。None の場合は要素そのものがキーです。
+            apply: ソート済みの 1 つのチャンクを処理する関数。
+
+        Returns:
+            入力の順序で並んだ結果のリスト。apply が None を返す場合は空のリスト。
+        """
+        async with self._lock:
+            if self.executor is not None and len(batch) >= self.offload_threshold:
+                offloaded: list[R] = await self._offload(method, batch)
+                return offloaded
+
+            keys = batch if sort_key is None else list(map(sort_key, batch))
+            order = sorted(range(len(batch)), key=keys.__getitem__)
+            ordered = [batch[pos] for pos in order]
+            found: list[R] = []
+            start = 0
+            while start < len(ordered):
+                # 挿入と削除でツリーの高さが変わるため、チャンクごとに求め直す
+                end = start + self._chunk_size()
+                chunk_results = apply(ordered[start:end])
+                if chunk_results is not None:
+                    found.extend(chunk_results)
+                start = end
+                if start < len(ordered):
+                    await asyncio.sleep(0)
+        if not found:
+            return found
+        results: list[Any] = [None] * len(batch)
+        for pos, value in zip(order, found, strict=True):
+            results[pos] = value
+        return results
+
+    async def _offload(self, method: str, batch: list[Any]) -> Any:
+        """一括操作をエグゼキュータで実行します。"""
+        loop = asyncio.get_running_loop()
+        if not isinstance(self.executor, ProcessPoolExecutor):
+            return await loop.run_in_executor(
+                self.executor, getattr(self.tree, method), batch
+            )
+        # ダンプと読み込みも B木の大きさに比例するため、イベントループではなくスレッドで行う
+        return await loop.run_in_executor(
+            None, _run_batch_via_process, self.tree, self.executor, method, batch
+        )
+
+    async def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """複数のキーと値のペアを、途中でイベントループに制御を返しながら挿入します。
+
+        同じキーのペアは入力の順序で挿入されます。
+
+        Args:
+            pairs: 挿入する (キー, 値) のペアの列。
+        """
+
+        def apply(chunk: list[tuple[T, int]]) -> None:
+            self.tree.insert_many(chunk)
+
+        await self._run_batch("insert_many", list(pairs), itemgetter(0), apply)
+
+    async def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        """複数のキーに対応する値を、途中でイベントループに制御を返しながら検索します。
+
+        Args:
+            keys: 検索するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの値のリスト。キーが見つからなかった場合は None。
+        """
+
+        def apply(chunk: list[T]) -> list[int | None]:
+            found: list[int | None] = self.tree.get_many(chunk)
+            return found
+
+        return await self._run_batch("get_many", list(keys), None, apply)
+
+    async def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        """複数のキーを、途中でイベントループに制御を返しながら削除します。
+
+        Args:
+            keys: 削除するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの削除が成功したかどうかのリスト。
+        """
+
+        def apply(chunk: list[T]) -> list[bool]:
+            deleted: list[bool] = self.tree.delete_many(chunk)
+            return deleted
+
+        return await self._run_batch("delete_many", list(keys), None, apply)
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self.keys()
+
+    async def keys(self) -> AsyncIterator[T]:
+        """キーを昇順に返す非同期イテレータ。
+
+        Yields:
+            B木に格納されているキー。
+        """
+        async for key, _ in self.range():
+            yield key
+
+    async def items(self) -> AsyncIterator[tuple[T, int]]:
+        """(キー, 値) のペアをキーの昇順に返す非同期イテレータ。
+
+        Yields:
+            B木に格納されている (キー, 値) のタプル。
+        """
+        async for pair in self.range():
+            yield pair
+
+    async def range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> AsyncIterator[tuple[T, int]]:
+        """範囲内の (キー, 値) のペアを返す非同期イテレータ。
+
+        走査を始めた時点のスナップショットを yield_every 件ずつ読み進め、その間に制御を返します。
+        スナップショットを作成できない B木では、走査が終わるまで他の操作を待たせるため、
+        走査の途中でこのファサードの他の操作を待つとデッドロックします。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+            reverse: True の場合はキーの降順に返します。
+
+        Yields:
+            範囲内の (キー, 値) のタプル。
+        """
+        async with self._lock:
+            try:
+                view: BTree[T] = self.tree.snapshot()
+            except TypeError:
+                view = self.tree
+        if view is self.tree:
+            async with self._lock:
+                async for pair in self._scan(view.range(lo, hi, inclusive, reverse)):
+                    yield pair
+        else:
+            async for pair in self._scan(view.range(lo, hi, inclusive, reverse)):
+                yield pair
+
+    async def _scan(
+        self, pairs: Iterator[tuple[T, int]]
+    ) -> AsyncIterator[tuple[T, int]]:
+        """同期のイテレータを yield_every 件ごとに制御を返しながら読み進めます。"""
+        count = 0
+        for pair in pairs:
+            yield pair
+            count += 1
+            if count == self.yield_every:
+                count = 0
+                await asyncio.sleep(0)
@@ -1,9 +1,36 @@
-from typing import Generic, TypeVar
+import struct
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from itertools import islice, pairwise
+from operator import itemgetter, le
+from typing import Any, BinaryIO, Generic, TypeVar
 
-from .node import KeyValuePair, Node
+from .codec import (
+    KEY_INT,
+    decode_key_section,
+    decode_values,
+    encode_key_section,
+    encode_values,
+    key_kind,
+)
+from .frozen import FrozenBTree
+from .node import KeyValuePair, Node, _get_key
 
 T = TypeVar("T")
 
+# 右端の葉に入るキーに下限がないことを表す値
+_NO_FLOOR = object()
+
+# ダンプファイルの形式: マジック, 最小次数, キーの型, エントリ数
+# 続いて、ブロックごとに (エントリ数, キーのセクションのバイト数), キーのセクション, 値のセクションが並ぶ。
+# 数値はすべてリトルエンディアン
+_DUMP_HEADER = struct.Struct("<8sIB3xQ")
+_DUMP_MAGIC = b"BTDUMP01"
+_BLOCK_HEADER = struct.Struct("<IQ")
+
+# dump で 1 つのブロックに書き出す最大のエントリ数
+DUMP_BLOCK_SIZE = 65536
+
 
 class BTree(Generic[T]):
     """B木全体を表すクラス。
@@ -11,18 +38,132 @@ class BTree(Generic[T]):
     Attributes:
         root (Optional[Node[T]]): B木のルートノード。最初は None。
         t (int): B木の最小次数 (minimum degree)。
+        append_optimized (bool): 単調増加するキーの挿入を高速化するかどうか。既定は False。
     """
 
-    def __init__(self, t: int):
+    # 変更してよいノードの世代を表すトークン。`snapshot` を呼び出すたびに新しくなる
+    _owner: object | None = None
+
+    # True の場合、右端の葉より右に追加されるキーを、ルートから降りずに右端のパスへ直接追加する。
+    # 追記の途中では右端のパス上のノードのキー数が t-1 未満になりうるため、既定では無効にする
+    append_optimized: bool = False
+
+    # 右端のパス (ルートから右端の葉まで) のキャッシュと、右端の葉に入るキーの下限
+    _spine: list[Node[T]] | None = None
+    _spine_checked: bool = False
+    _floor: object = _NO_FLOOR
+    # 右端のパス上のノードのキー数が、追記の途中で t-1 未満になっている可能性があるかどうか
+    _ragged: bool = False
+
+    def __init__(self, t: int, append_optimized: bool = False):
         """B木を初期化します。
 
         Args:
             t: B木の最小次数。t >= 2 である必要があります。
+            append_optimized: 単調増加するキーの挿入を高速化するかどうか。
+                True の場合、右端の葉に入るキーをルートから降りずに追加し、
+                右端のノードを満杯まで埋めます。
         """
         if t < 2:
             raise ValueError("B木の最小次数 t は 2 以上である必要があります。")
         self.root: Node[T] = Node(t, True)
         self.t = t
+        self.append_optimized = append_optimized
+
+    @classmethod
+    def from_sorted(
+        cls, iterable: Iterable[tuple[T, int]], t: int, fill_factor: float = 1.0
+    ) -> "BTree[T]":
+        """キーでソート済みの (キー, 値) の列から B木をボトムアップに構築します。
+
+        入力を 1 回だけ走査し、各レベルの右端のノードにキーを詰めていきます。
+        ノードが目標のキー数に達すると、次のキーを親レベルへ昇格させて新しいノードを開始します。
+        入力はジェネレータでもよく、全体をメモリに展開する必要はありません。
+
+        Args:
+            iterable: キーの昇順に並んだ (キー, 値) のペアの列。
+            t: B木の最小次数。
+            fill_factor: 各ノードに詰めるキー数の最大キー数 (2t-1) に対する割合。
+                0 < fill_factor <= 1 で、ノードのキー数は t-1 未満にはなりません。
+
+        Returns:
+            構築された B木。
+
+        Raises:
+            ValueError: fill_factor が範囲外の場合、または入力がソートされていない場合。
+        """
+        tree: BTree[T] = cls(t)
+        if not 0 < fill_factor <= 1:
+            raise ValueError("fill_factor は 0 より大きく 1 以下である必要があります。")
+        fill = max(t - 1, min(2 * t - 1, int(fill_factor * (2 * t - 1))))
+
+        # levels[0] が葉レベル。各レベルで現在キーを詰めている右端のノードを保持する
+        levels: list[Node[T]] = [tree.root]
+        prev_key: T | None = None
+        has_prev = False
+
+        for key, value in iterable:
+            if has_prev and key < prev_key:  # type: ignore[operator]
+                raise ValueError("from_sorted の入力はキーの昇順である必要があります。")
+            prev_key, has_prev = key, True
+
+            kv_pair = KeyValuePair(key, value)
+            level = 0
+            while True:
+                node = levels[level]
+                if len(node.items) < fill:
+                    node.items.append(kv_pair)
+                    # 区切りキーの右側に、下位の各レベルで新しいノードを開始する
+                    for lower in range(level - 1, -1, -1):
+                        child: Node[T] = Node(t, lower == 0)
+                        levels[lower + 1].children.append(child)
+                        levels[lower] = child
+                    break
+                # ノードが目標のキー数に達したので、このキーは親レベルの区切りキーになる
+                if level + 1 == len(levels):
+                    new_root: Node[T] = Node(t, False)
+                    new_root.children.append(node)
+                    levels.append(new_root)
+                level += 1
+
+        tree.root = levels[-1]
+        tree._fix_right_edge()
+        return tree
+
+    def _fix_right_edge(self) -> None:
+        """ボトムアップ構築後の右端のノードのキー数を補正します。
+
+        右端のノードはキー数が t-1 未満になり得るため、ルートから順に、
+        左隣の兄弟とのマージまたは再分配によって B木の制約を満たすようにします。
+        削除時と同様に、非葉ノードには先回りして t 個以上のキーを持たせておくことで、
+        子のマージで親のキー数が t-1 未満にならないようにします。
+        """
+        t = self.t
+        node = self._writable_root()
+        while not node.is_leaf:
+            child = node._writable_child(len(node.children) - 1)
+            need = t - 1 if child.is_leaf else t
+            if len(child.items) < need:
+                idx = len(node.children) - 2
+                left = node._writable_child(idx)
+                if len(left.items) + 1 + len(child.items) <= 2 * t - 1:
+                    # 左の兄弟とマージする
+                    node._merge_children(idx)
+                    child = left
+                    if node is self.root and len(node.items) == 0:
+                        self._replace_root(child, -1)
+                else:
+                    # 左の兄弟と再分配する
+                    all_items = left.items + [node.items[idx]] + child.items
+                    all_children = left.children + child.children
+                    mid = (len(all_items) - 1) // 2
+                    left.items = all_items[:mid]
+                    node.items[idx] = all_items[mid]
+                    child.items = all_items[mid + 1 :]
+                    if not child.is_leaf:
+                        left.children = all_children[: mid + 1]
+                        child.children = all_children[mid + 1 :]
+            node = child
 
     def insert(self, key: T, value: int) -> None:
         """B木に新しいキーと値のペアを挿入します。
@@ -32,14 +173,20 @@ class BTree(Generic[T]):
             value: 挿入する値。
         """
         kv_pair = KeyValuePair(key, value)
-        root = self.root
+        if self.append_optimized and self._try_append(kv_pair):
+            if Node._counters is not None:
+                Node._counters._add("appends")
+            return
+        # 右端のパスが分割で付け替えられている可能性があるため、次の追記の前に確認する
+        self._spine_checked = False
+        root = self._writable_root()
 
         # ルートノードが満杯の場合
         if len(root.items) == (2 * self.t - 1):
             # 新しいルートノードを作成
-            new_root = Node(self.t, False)  # 新しいルートは非葉ノード
+            new_root = root._new_node(False)  # 新しいルートは非葉ノード
             new_root.children.append(root)  # 古いルートを子にする
-            self.root = new_root
+            self._replace_root(new_root, 1)
             # 古いルートノードを分割する
             new_root.split_child(0, root)
             # 新しいキーを挿入する適切な子ノードを決定する
@@ -54,6 +201,124 @@ class BTree(Generic[T]):
         else:
             root.insert(kv_pair)
 
+    def _try_append(self, kv_pair: KeyValuePair[T]) -> bool:
+        """キーが右端の葉に入る場合に、ルートから降りずに右端の葉へ直接挿入します。
+
+        右端の葉が満杯で、キーが木の中で最大の場合は `_split_right` で右寄りに分割します。
+
+        Args:
+            kv_pair: 挿入するキーと値のペア。
+
+        Returns:
+            挿入した場合は True、通常の挿入が必要な場合は False。
+        """
+        key: Any = kv_pair.key
+        # キャッシュした下限は実際の下限以下なので、下限より小さいキーは確認なしで通常の挿入に回せる
+        floor = self._floor
+        if floor is not _NO_FLOOR and key < floor:
+            return False
+        if not self._spine_checked:
+            self._load_spine()
+            floor = self._floor
+            if floor is not _NO_FLOOR and key < floor:
+                return False
+        assert self._spine is not None
+
+        leaf = self._spine[-1]
+        items = leaf.items
+        if len(items) < 2 * self.t - 1:
+            if not items or not key < items[-1].key:
+                items.append(kv_pair)
+            else:
+                i = bisect_right(items, key, key=_get_key)
+                items.insert(i, kv_pair)
+            return True
+        if key < items[-1].key:
+            return False
+        self._split_right(kv_pair)
+        return True
+
+    def _load_spine(self) -> None:
+        """キャッシュした右端のパスがまだ木の右端であることを確認し、そうでなければ作り直します。"""
+        spine = self._spine
+        if spine is not None and spine[0] is self.root:
+            for parent, child in pairwise(spine):
+                if parent.children[-1] is not child:
+                    break
+            else:
+                self._spine_checked = True
+                return
+
+        node = self._writable_root()
+        spine = [node]
+        while not node.is_leaf:
+            node = node._writable_child(len(node.children) - 1)
+            spine.append(node)
+        # 右端の葉に入るキーの下限は、キーを持つ最も深い祖先の最後のキー
+        self._floor = _NO_FLOOR
+        for ancestor in reversed(spine[:-1]):
+            if ancestor.items:
+                self._floor = ancestor.items[-1].key
+                break
+        self._spine = spine
+        self._spine_checked = True
+
+    def _split_right(self, kv_pair: KeyValuePair[T]) -> None:
+        """満杯の右端の葉に最大のキーを追加するために、右寄りに分割します。
+
+        `split_child` のように半分ずつに分けるのではなく、満杯のノードはそのまま残し、
+        新しいキーを親へ区切りのキーとして追加して、その右に空の葉を作ります。
+        親も満杯の場合は同様に、空の非葉ノードを作って上のレベルへ追加します。
+        単調増加するキーを追加し続けると、右端以外のノードはすべて満杯になります。
+
+        右端のパス上に一時的にキー数が t-1 未満のノードができるため、
+        削除などの前に `_settle` で修正します。
+
+        Args:
+            kv_pair: 追加するキーと値のペア。木の中のすべてのキー以上である必要があります。
+        """
+        spine = self._spine
+        assert spine is not None
+        carry = spine[-1]._new_node(True)
+        chain = [carry]
+        level = len(spine) - 2
+        while level >= 0:
+            node = spine[level]
+            if len(node.items) < 2 * self.t - 1:
+                node.items.append(kv_pair)
+                node.children.append(carry)
+                break
+            upper = node._new_node(False)
+            upper.children.append(carry)
+            chain.insert(0, upper)
+            carry = upper
+            level -= 1
+        else:
+            new_root = self.root._new_node(False)
+            new_root.items.append(kv_pair)
+            new_root.children = [self.root, carry]
+            self._replace_root(new_root, 1)
+            spine = [new_root]
+            level = 0
+        self._spine = spine[: level + 1] + chain
+        self._floor = kv_pair.key
+        self._ragged = True
+        if Node._counters is not None:
+            Node._counters._add("right_splits", len(chain))
+
+    def _settle(self) -> None:
+        """追記によってキー数が t-1 未満になった右端のパス上のノードを修正し、右端のパスのキャッシュを破棄します。
+
+        削除や一括操作など、各ノードが B木の制約を満たしていることを前提とし、
+        右端のパスを組み替える可能性のある操作の前に呼び出します。
+        """
+        if self._ragged:
+            self._fix_right_edge()
+            self._ragged = False
+        self._spine = None
+        self._spine_checked = False
+        self._floor = _NO_FLOOR
+
     def search(self, key: T) -> tuple[Node[T], int] | None:
         """キーを検索します。
 
@@ -77,10 +342,8 @@ class BTree(Generic[T]):
         Returns:
             キーが見つかった場合は (ノード, キーのインデックス) のタプル、見つからなかった場合は None。
         """
-        # ノード内でキーを検索
-        i = 0
-        while i < len(node.items) and key > node.items[i].key:
-            i += 1
+        # ノード内でキーを二分探索
+        i = node._find_key(key)
 
         # キーが見つかった場合
         if i < len(node.items) and key == node.items[i].key:
@@ -107,9 +370,19 @@ class BTree(Generic[T]):
         if result is None:
             return False
 
-        node, idx = result
-        node.items[idx].value = value
-        return True
+        if self._owner is None:
+            node, idx = result
+            node.items[idx].value = value
+            return True
+
+        # スナップショットとペアを共有している可能性があるため、パスをコピーしてペアを置き換える
+        node = self._writable_root()
+        while True:
+            i = node._find_key(key)
+            if i < len(node.items) and node.items[i].key == key:
+                node.items[i] = KeyValuePair(key, value)
+                return True
+            node = node._writable_child(i)
 
     def delete(self, key: T) -> bool:
         """B木からキーを削除します。
@@ -122,12 +395,689 @@ class BTree(Generic[T]):
         """
         if not self.root:
             return False
-        
-        result = self.root.delete(key)
-        
+
+        self._settle()
+        result: bool = self._writable_root().delete(key)
+
         # ルートノードがキーを持たなくなった場合、
         # かつ子ノードが1つだけある場合、ツリーの高さを減らす
         if len(self.root.items) == 0 and not self.root.is_leaf:
-            self.root = self.root.children[0]
-        
+            self._replace_root(self.root.children[0], -1)
+
         return result
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """複数のキーと値のペアを一括で挿入します。
+
+        ペアをキーでソートしてからツリーを降り、同じサブツリーに入るペアは
+        1 回の降下にまとめるため、各ノードはバッチごとに 1 回だけ訪問されます。
+        同じキーのペアは入力の順序で挿入されます。
+
+        Args:
+            pairs: 挿入する (キー, 値) のペアの列。
+        """
+        batch = sorted((KeyValuePair(key, value) for key, value in pairs), key=_get_key)
+        if not batch:
+            return
+        self._settle()
+        self._writable_root()._insert_batch(batch)
+        self._split_overflowing_root()
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        """複数のキーに対応する値を一括で検索します。
+
+        Args:
+            keys: 検索するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの値のリスト。キーが見つからなかった場合は None。
+        """
+        key_list = list(keys)
+        results: list[int | None] = [None] * len(key_list)
+        order = sorted(range(len(key_list)), key=key_list.__getitem__)  # type: ignore[arg-type]
+
+        # (ノード, そのノードのサブツリーで探す入力位置のリスト) のスタック
+        stack: list[tuple[Node[T], list[int]]] = [(self.root, order)]
+        while stack:
+            node, positions = stack.pop()
+            groups: dict[int, list[int]] = {}
+            for pos in positions:
+                key = key_list[pos]
+                i = node._find_key(key)
+                if i < len(node.items) and node.items[i].key == key:
+                    results[pos] = node.items[i].value
+                elif not node.is_leaf:
+                    groups.setdefault(i, []).append(pos)
+            for i, group in groups.items():
+                stack.append((node.children[i], group))
+        return results
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        """複数のキーを一括で削除します。
+
+        キーをソートしてからツリーを降り、同じサブツリーにあるキーは 1 回の降下にまとめます。
+        削除による再平衡は、各ノードのサブツリーの処理を終えた後にまとめて行います。
+        入力に同じキーが複数回ある場合、2 回目以降は一括の処理の後で `delete` で 1 つずつ削除するため、
+        結果は入力の順に `delete` を呼んだ場合と同じです。
+
+        Args:
+            keys: 削除するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの削除が成功したかどうかのリスト。
+        """
+        key_list = list(keys)
+        results = [False] * len(key_list)
+        batch: list[tuple[T, int]] = []
+        repeats: list[tuple[T, int]] = []
+        for key, pos in sorted(
+            ((key, pos) for pos, key in enumerate(key_list)), key=itemgetter(0)
+        ):
+            if batch and batch[-1][0] == key:
+                repeats.append((key, pos))
+            else:
+                batch.append((key, pos))
+        if not batch:
+            return results
+        self._settle()
+        self._writable_root()._delete_batch(batch, results)
+
+        while len(self.root.items) == 0 and not self.root.is_leaf:
+            self._replace_root(self.root.children[0], -1)
+        self._split_overflowing_root()
+        # 同じキーのコピーは左右どちらの子ノードにもありうるため、一括では探さない
+        for key, pos in repeats:
+            results[pos] = self.delete(key)
+        return results
+
+    def delete_range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+    ) -> int:
+        """キーが lo から hi の範囲にあるペアをすべて削除します。範囲の指定は `range` と同じです。
+
+        範囲に完全に含まれるサブツリーはノードごと切り離し、範囲の両端に沿った
+        2 本のパス上のノードだけを修正して、最後に 1 回だけ再平衡します。
+        ただし、戻り値の削除したキーの数を求めるため、切り離したサブツリーのノードを 1 回ずつたどって
+        キー数を足し合わせます。そのため計算量は、削除するペアの数を k として O(t log n + k/t) で、
+        k に比例する部分が残ります (各ノードでは `len` を 1 回求めるだけで、ペアには触れません)。
+        `OrderStatisticBTree` ではサブツリーのキー数を使うため、O(t log n) です。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+
+        Returns:
+            削除したペアの数。
+        """
+        self._settle()
+        removed: int = self._writable_root()._delete_range(lo, hi, inclusive)
+
+        while len(self.root.items) == 0 and not self.root.is_leaf:
+            self._replace_root(self.root.children[0], -1)
+        self._split_overflowing_root()
+        return removed
+
+    def split_at(self, key: T) -> tuple["BTree[T]", "BTree[T]"]:
+        """key より小さいキーの B木と、key 以上のキーの B木に分割します。
+
+        ルートから key へ向かうパス上のノードだけを 2 つに分け、それ以外のサブツリーは
+        そのまま 2 つの B木に振り分けるため、O(t log n) で分割できます。
+        サブツリーは元の B木と共有し、スナップショットと同様に変更されるノードだけを複製するため、
+        元の B木はそのまま使い続けられます。
+
+        Args:
+            key: 分割するキー。
+
+        Returns:
+            (key より小さいキーの B木, key 以上のキーの B木) のタプル。
+        """
+        self._settle()
+        self._share()
+        tree_cls = BTree if isinstance(self, BTreeSnapshot) else type(self)
+        left: BTree[T] = tree_cls(self.t)
+        right: BTree[T] = tree_cls(self.t)
+        left._owner = object()
+        right._owner = object()
+        left.root, right.root = self.root._split_at(key, left._owner, right._owner)
+        for tree in (left, right):
+            while len(tree.root.items) == 0 and not tree.root.is_leaf:
+                tree.root = tree.root.children[0]
+        return left, right
+
+    @staticmethod
+    def join(left: "BTree[T]", right: "BTree[T]") -> "BTree[T]":
+        """left のすべてのキーの後ろに right のすべてのキーを並べた B木を作成します。
+
+        低い方の B木のルートを、高い方の B木の端のパス上にある同じ高さのノードへ
+        `Node._join` で連結するため、O(t log n) で連結できます。
+        サブツリーは元の 2 つの B木と共有し、変更されるノードだけを複製するため、
+        元の B木はそのまま使い続けられます。
+
+        Args:
+            left: 前半の B木。
+            right: 後半の B木。
+
+        Returns:
+            連結した B木。left と同じクラスです。
+
+        Raises:
+            ValueError: 最小次数が異なる場合、または left の最大のキーが right の最小のキーより大きい場合。
+            TypeError: ノードの種類が異なる場合。
+        """
+        if left.t != right.t:
+            raise ValueError("最小次数が異なる B木は連結できません。")
+        if type(left.root) is not type(right.root):
+            raise TypeError("ノードの種類が異なる B木は連結できません。")
+        left._settle()
+        right._settle()
+        if left.root.items and right.root.items:
+            last = left.root
+            while not last.is_leaf:
+                last = last.children[-1]
+            first = right.root
+            while not first.is_leaf:
+                first = first.children[0]
+            if first.items[0].key < last.items[-1].key:
+                raise ValueError("left のキーは right のキー以下である必要があります。")
+        left._share()
+        right._share()
+
+        tree_cls = BTree if isinstance(left, BTreeSnapshot) else type(left)
+        tree: BTree[T] = tree_cls(left.t)
+        tree._owner = object()
+        lower, upper = left.root, right.root
+        lower_height, upper_height = left._height(), right._height()
+        # 低い方のルートの上に、キーを持たない非葉ノードを重ねて高さをそろえる
+        while lower_height < upper_height:
+            lower = tree._wrap(lower)
+            lower_height += 1
+        while upper_height < lower_height:
+            upper = tree._wrap(upper)
+            upper_height += 1
+
+        tree.root = lower
+        tree._writable_root()._join(upper)
+        while len(tree.root.items) == 0 and not tree.root.is_leaf:
+            tree.root = tree.root.children[0]
+        tree._split_overflowing_root()
+        return tree
+
+    def _wrap(self, node: Node[T]) -> Node[T]:
+        """node だけを子に持ち、キーを持たない非葉ノードを作成します。"""
+        wrapper = self.root._new_node(False)
+        wrapper.owner = self._owner
+        wrapper.children.append(node)
+        return wrapper
+
+    def _height(self) -> int:
+        """ツリーの高さ (葉だけの場合は 1) を返します。"""
+        height = 1
+        node = self.root
+        while not node.is_leaf:
+            node = node.children[0]
+            height += 1
+        return height
+
+    def stats(self) -> dict[str, Any]:
+        """ツリーの構造に関する統計を返します。
+
+        すべてのノードを 1 回ずつ訪問します。
+
+        Returns:
+            次のキーを持つ辞書。
+                height: ツリーの高さ (葉だけの場合は 1)。
+                nodes: ノードの数。
+                entries: キーと値のペアの数。
+                fill_factor: ノードあたりの平均キー数の、最大キー数 (2t-1) に対する割合。
+                levels: ルートから順に並んだ、各レベルの統計の辞書のリスト。各辞書は
+                    nodes (ノード数)、entries (ペアの数)、min_keys / max_keys
+                    (ノードのキー数の最小値と最大値)、fill_histogram
+                    (キー数の 2t-1 に対する割合を 10% 刻みで数えたリスト。最後の区間は 100% を含む)
+                    を持ちます。
+        """
+        # バッファなど派生クラスが持つ状態はそのまま数えるため、右端のパスだけを修正する
+        BTree._settle(self)
+        capacity = 2 * self.t - 1
+        levels: list[dict[str, Any]] = []
+        level = [self.root]
+        while level:
+            histogram = [0] * 10
+            sizes = [len(node.items) for node in level]
+            for size in sizes:
+                histogram[min(9, size * 10 // capacity)] += 1
+            levels.append(
+                {
+                    "nodes": len(level),
+                    "entries": sum(sizes),
+                    "min_keys": min(sizes),
+                    "max_keys": max(sizes),
+                    "fill_histogram": histogram,
+                }
+            )
+            level = [child for node in level for child in node.children]
+
+        nodes = sum(stat["nodes"] for stat in levels)
+        entries = sum(stat["entries"] for stat in levels)
+        return {
+            "height": len(levels),
+            "nodes": nodes,
+            "entries": entries,
+            "fill_factor": entries / (nodes * capacity),
+            "levels": levels,
+        }
+
+    def _split_overflowing_root(self) -> None:
+        """満杯を超えたルートノードを分割し、必要なだけツリーの高さを増やします。"""
+        while len(self.root.items) > 2 * self.t - 1:
+            new_root = self._writable_root()._new_node(False)
+            new_root.children, new_root.items = self.root._split_overflowing()
+            self._replace_root(new_root, 1)
+
+    def _writable_root(self) -> Node[T]:
+        """ルートノードを、変更してよい状態にして返します。
+
+        ルートがスナップショットと共有されている場合は複製して置き換えます。
+        変更操作はこのルートから `Node._writable_child` で子をたどるため、
+        変更されるノードだけがルートから葉へのパスに沿って複製されます。
+
+        Returns:
+            変更してよいルートノード。
+        """
+        if self.root.owner is not self._owner:
+            self.root = self.root._clone(self._owner)
+        return self.root
+
+    def _replace_root(self, root: Node[T], height_change: int) -> None:
+        """変更操作で木の高さが変わったときに、ルートを root に置き換えます。
+
+        `stats.count_operations` の実行中は、高さの変化をカウンタに加えます。
+
+        Args:
+            root: 新しいルートノード。
+            height_change: 古いルートの上に新しいルートを重ねた場合は 1、
+                キーを持たないルートを唯一の子ノードに置き換えた場合は -1。
+        """
+        self.root = root
+        if Node._counters is not None:
+            Node._counters._count_height_change(height_change)
+
+    def snapshot(self) -> "BTreeSnapshot[T]":
+        """現時点の内容を読み込み専用で参照するスナップショットを O(1) で作成します。
+
+        スナップショットは現在のルートを共有するだけで、ノードを複製しません。
+        その後の変更では、変更するノードだけをルートから葉へのパスに沿って複製する
+        (コピーオンライト) ため、スナップショットの内容は変わりません。
+        追加で使うメモリは、スナップショットの作成後に変更されたノードの数に比例します。
+
+        Returns:
+            読み込み専用のスナップショット。
+        """
+        self._settle()
+        view: BTreeSnapshot[T] = BTreeSnapshot.__new__(BTreeSnapshot)
+        view.root = self.root
+        view.t = self.t
+        self._share()
+        return view
+
+    def _share(self) -> None:
+        """既存のノードがすべて他の B木と共有されたものとして、新しい世代に切り替えます。
+
+        以降の変更では、変更するノードが `_writable_root` / `Node._writable_child` で複製されます。
+        共有する前に、追記で t-1 未満になった右端のパス上のノードを修正します。
+        """
+        self._settle()
+        self._owner = object()
+
+    def freeze(self) -> FrozenBTree[T]:
+        """現時点の内容を、変更できない平坦な配列で表した `FrozenBTree` に変換します。
+
+        すべてのペアを 1 回走査してキーの昇順の配列に詰めます。元の B木はそのまま使えます。
+
+        Returns:
+            現時点の内容を持つ FrozenBTree。
+        """
+        return FrozenBTree.from_sorted(self.items())
+
+    def __iter__(self) -> Iterator[T]:
+        """キーを昇順に返すイテレータを返します。"""
+        return self.keys()
+
+    def keys(self) -> Iterator[T]:
+        """キーを昇順に遅延評価で返します。
+
+        Yields:
+            B木に格納されているキー。
+        """
+        for kv_pair in self._iter_range(None, None, (True, True), False):
+            yield kv_pair.key
+
+    def items(self) -> Iterator[tuple[T, int]]:
+        """(キー, 値) のペアをキーの昇順に遅延評価で返します。
+
+        Yields:
+            B木に格納されている (キー, 値) のタプル。
+        """
+        for kv_pair in self._iter_range(None, None, (True, True), False):
+            yield (kv_pair.key, kv_pair.value)
+
+    def range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[T, int]]:
+        """キーが lo から hi の範囲にある (キー, 値) のペアを遅延評価で返します。
+
+        ツリー全体を走査せず、範囲の端のキーまで直接降りてから走査を開始します。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+            reverse: True の場合はキーの降順に返します。
+
+        Yields:
+            範囲内の (キー, 値) のタプル。
+        """
+        for kv_pair in self._iter_range(lo, hi, inclusive, reverse):
+            yield (kv_pair.key, kv_pair.value)
+
+    def _iter_range(
+        self,
+        lo: T | None,
+        hi: T | None,
+        inclusive: tuple[bool, bool],
+        reverse: bool,
+    ) -> Iterator[KeyValuePair[T]]:
+        """範囲内のキーと値のペアを、明示的なスタックを使って順に返します。
+
+        スタックの各要素 (ノード, i) は、昇順の場合は「次に items[i] を返す」、
+        降順の場合は「次に items[i-1] を返す」ことを表します。
+        非葉ノードでは、対応する子ノードのサブツリーを走査し終えた後にそのキーを返します。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+            reverse: True の場合はキーの降順に返します。
+
+        Yields:
+            範囲内のキーと値のペア。
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        # bisect に渡すため、比較できる型として扱う
+        lo_key: Any = lo
+        hi_key: Any = hi
+        stack: list[tuple[Node[T], int]] = []
+
+        if not reverse:
+            # lo 以上 (lo を含まない場合は lo より大きい) 最初のキーまで降りる
+            node = self.root
+            while True:
+                if lo is None:
+                    i = 0
+                elif lo_inclusive:
+                    i = bisect_left(node.items, lo_key, key=_get_key)
+                else:
+                    i = bisect_right(node.items, lo_key, key=_get_key)
+                stack.append((node, i))
+                if node.is_leaf:
+                    break
+                node = node.children[i]
+
+            while stack:
+                node, i = stack.pop()
+                items = node.items
+                if node.is_leaf:
+                    for j in range(i, len(items)):
+                        kv_pair = items[j]
+                        if hi is not None and (
+                            kv_pair.key > hi or (not hi_inclusive and kv_pair.key == hi)
+                        ):
+                            return
+                        yield kv_pair
+                    continue
+                if i < len(items):
+                    kv_pair = items[i]
+                    if hi is not None and (
+                        kv_pair.key > hi or (not hi_inclusive and kv_pair.key == hi)
+                    ):
+                        return
+                    yield kv_pair
+                    stack.append((node, i + 1))
+                    # 右隣の子ノードの最も左の葉まで降りる
+                    node = node.children[i + 1]
+                    while not node.is_leaf:
+                        stack.append((node, 0))
+                        node = node.children[0]
+                    stack.append((node, 0))
+        else:
+            # hi 以下 (hi を含まない場合は hi より小さい) 最後のキーまで降りる
+            node = self.root
+            while True:
+                if hi is None:
+                    i = len(node.items)
+                elif hi_inclusive:
+                    i = bisect_right(node.items, hi_key, key=_get_key)
+                else:
+                    i = bisect_left(node.items, hi_key, key=_get_key)
+                stack.append((node, i))
+                if node.is_leaf:
+                    break
+                node = node.children[i]
+
+            while stack:
+                node, i = stack.pop()
+                items = node.items
+                if node.is_leaf:
+                    for j in range(i - 1, -1, -1):
+                        kv_pair = items[j]
+                        if lo is not None and (
+                            kv_pair.key < lo or (not lo_inclusive and kv_pair.key == lo)
+                        ):
+                            return
+                        yield kv_pair
+                    continue
+                if i > 0:
+                    kv_pair = items[i - 1]
+                    if lo is not None and (
+                        kv_pair.key < lo or (not lo_inclusive and kv_pair.key == lo)
+                    ):
+                        return
+                    yield kv_pair
+                    stack.append((node, i - 1))
+                    # 左隣の子ノードの最も右の葉まで降りる
+                    node = node.children[i - 1]
+                    while not node.is_leaf:
+                        stack.append((node, len(node.items)))
+                        node = node.children[-1]
+                    stack.append((node, len(node.items)))
+
+    def _count_entries(self) -> int:
+        """ノードをたどって、格納されているキーの総数を数えます。"""
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            count += len(node.items)
+            if not node.is_leaf:
+                stack.extend(node.children)
+        return count
+
+    def dump(self, file: BinaryIO) -> None:
+        """B木の内容をコンパクトなバイナリ形式でファイルに書き出します。
+
+        ヘッダー (マジック, 最小次数, キーの型, エントリ数) に続いて、
+        最大 DUMP_BLOCK_SIZE 件ごとのブロックを書き出します。
+        各ブロックはキーのセクションと値 (int64) のセクションを連続して持ちます。
+        ツリー全体をメモリ上のバイト列に展開せず、ブロックごとに書き出します。
+
+        キーはすべて同じ型 (64 ビットに収まる int、str、bytes のいずれか) である必要があります。
+
+        Args:
+            file: バイナリモードで開いた書き込み先のファイル。
+
+        Raises:
+            TypeError: 対応していない型のキーや、型がそろっていないキー、
+                64 ビットに収まらない int の値が含まれている場合。
+        """
+        count = self._count_entries()
+        kind = key_kind(next(self.keys())) if count else KEY_INT
+        file.write(_DUMP_HEADER.pack(_DUMP_MAGIC, self.t, kind, count))
+
+        keys: list[T] = []
+        values: list[int] = []
+        for kv_pair in self._iter_range(None, None, (True, True), False):
+            keys.append(kv_pair.key)
+            values.append(kv_pair.value)
+            if len(keys) == DUMP_BLOCK_SIZE:
+                self._dump_block(file, keys, values, kind)
+                keys, values = [], []
+        if keys:
+            self._dump_block(file, keys, values, kind)
+
+    @staticmethod
+    def _dump_block(
+        file: BinaryIO, keys: list[T], values: list[int], kind: int
+    ) -> None:
+        """1 つのブロックを書き出します。"""
+        key_section = encode_key_section(keys, kind)
+        file.write(_BLOCK_HEADER.pack(len(keys), len(key_section)))
+        file.write(key_section)
+        file.write(encode_values(values))
+
+    @classmethod
+    def load(cls, file: BinaryIO, t: int | None = None) -> "BTree[T]":
+        """`dump` で書き出したファイルから B木を読み込みます。
+
+        ブロックを 1 つずつ読み込んで復号し、そのペアを `from_sorted` に順に渡して構築します。
+        ファイル全体のペアをリストに展開しないため、追加のメモリは 1 ブロック分です。
+        キーの順序はブロックごとに確認します。
+
+        Args:
+            file: バイナリモードで開いた読み込み元のファイル。
+            t: 構築する B木の最小次数。None の場合はファイルに記録された値を使います。
+
+        Returns:
+            読み込んだ B木。
+
+        Raises:
+            ValueError: ファイルの形式が正しくない場合、または途中で終わっている場合。
+        """
+        magic, dumped_t, kind, count = _DUMP_HEADER.unpack(
+            _read_exact(file, _DUMP_HEADER.size)
+        )
+        if magic != _DUMP_MAGIC:
+            raise ValueError("B木のダンプファイルではありません。")
+        return cls.from_sorted(
+            _read_dump_blocks(file, kind, count), t if t is not None else dumped_t
+        )
+
+    @classmethod
+    def _from_sorted_pairs(cls, pairs: list[KeyValuePair[T]], t: int) -> "BTree[T]":
+        """ソート済みのキーと値のペアのリストから、B木をレベルごとに構築します。
+
+        `from_sorted` と異なり入力全体が手元にあるため、各レベルのノードにキー数が
+        均等になるようにリストのスライスで分配し、キーごとの処理を行いません。
+
+        Args:
+            pairs: キーの昇順に並んだキーと値のペアのリスト。
+            t: B木の最小次数。
+
+        Returns:
+            構築された B木。
+        """
+        tree: BTree[T] = cls(t)
+        children: list[Node[T]] | None = None
+        while True:
+            n = len(pairs)
+            if n <= 2 * t - 1:
+                tree.root.items = pairs
+                if children is not None:
+                    tree.root.is_leaf = False
+                    tree.root.children = children
+                return tree
+
+            # 各ノードのキー数が t-1 以上 2t-1 以下になるようにノード数を決める
+            count = min(-(-(n + 1) // (2 * t)), (n + 1) // t)
+            base, extra = divmod(n - (count - 1), count)
+
+            nodes: list[Node[T]] = []
+            separators: list[KeyValuePair[T]] = []
+            pos = 0
+            for i in range(count):
+                size = base + (1 if i < extra else 0)
+                node: Node[T] = Node(t, children is None)
+                node.items = pairs[pos : pos + size]
+                if children is not None:
+                    node.children = children[pos : pos + size + 1]
+                nodes.append(node)
+                if i < count - 1:
+                    separators.append(pairs[pos + size])
+                pos += size + 1
+
+            pairs, children = separators, nodes
+
+
+class BTreeSnapshot(BTree[T]):
+    """`BTree.snapshot` が返す、ある時点の B木を読み込み専用で参照するビュー。
+
+    検索・走査・`dump` は `BTree` と同じように使えますが、変更操作は TypeError になります。
+    """
+
+    def _read_only(self, *args: object, **kwargs: object) -> Any:
+        raise TypeError("スナップショットは読み込み専用です。")
+
+    insert = update = delete = insert_many = delete_many = delete_range = _read_only
+
+    def snapshot(self) -> "BTreeSnapshot[T]":
+        """スナップショットは変更されないため、自分自身を返します。"""
+        return self
+
+
+def _read_dump_blocks(
+    file: BinaryIO, kind: int, count: int
+) -> Iterator[tuple[Any, int]]:
+    """ダンプファイルのブロックを順に読み込み、(キー, 値) のペアを返します。
+
+    Args:
+        file: ヘッダーの直後まで読み込んだダンプファイル。
+        kind: ヘッダーに記録されたキーの型。
+        count: ヘッダーに記録されたエントリ数。
+
+    Yields:
+        キーの昇順に並んだ (キー, 値) のタプル。
+
+    Raises:
+        ValueError: ブロックの形式が正しくない場合、またはキーが昇順でない場合。
+    """
+    read = 0
+    last: Any = None
+    while read < count:
+        n, key_bytes = _BLOCK_HEADER.unpack(_read_exact(file, _BLOCK_HEADER.size))
+        if n == 0 or read + n > count:
+            raise ValueError("ダンプファイルのブロックが正しくありません。")
+        keys = decode_key_section(_read_exact(file, key_bytes), kind, n)
+        if not all(map(le, keys, islice(keys, 1, None))) or (read and keys[0] < last):
+            raise ValueError("ダンプファイルのキーが昇順ではありません。")
+        values = decode_values(_read_exact(file, 8 * n))
+        read += n
+        last = keys[-1]
+        yield from zip(keys, values, strict=True)
+
+
+def _read_exact(file: BinaryIO, size: int) -> bytes:
+    """ファイルからちょうど size バイトを読み込みます。
+
+    Raises:
+        ValueError: ファイルが途中で終わっている場合。
+    """
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("ダンプファイルが途中で終わっています。")
+    return data
@@ -0,0 +1,433 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+
+
+class BPlusNode[T]:
+    """B+木のノードを表すクラス。
+
+    値はすべて葉ノードに格納され、葉ノードは next / prev で双方向に連結されます。
+    非葉ノードは子ノードを選ぶための区切りキーだけを持ちます。
+    区切りキー keys[i] 以上のキーは children[i + 1] 以下のサブツリーに格納されます。
+
+    Attributes:
+        keys (list[T]): ノードに格納されているキーのリスト。ソートされています。
+        values (list[int]): 葉ノードの場合、keys と同じ順序で並んだ値のリスト。
+        children (list[BPlusNode[T]]): 子ノードのリスト。非葉ノードの場合のみ使用されます。
+        next (Optional[BPlusNode[T]]): 右隣の葉ノード。葉ノードの場合のみ使用されます。
+        prev (Optional[BPlusNode[T]]): 左隣の葉ノード。葉ノードの場合のみ使用されます。
+        t (int): B+木の最小次数 (minimum degree)。各ノードは t-1 個、最大 2t-1 個のキーを持ちます (ルートノードを除く)。
+        is_leaf (bool): このノードが葉ノードであるかどうかを示すフラグ。
+    """
+
+    def __init__(self, t: int, is_leaf: bool):
+        self.keys: list[T] = []
+        self.values: list[int] = []
+        self.children: list[BPlusNode[T]] = []
+        self.next: BPlusNode[T] | None = None
+        self.prev: BPlusNode[T] | None = None
+        self.t = t
+        self.is_leaf = is_leaf
+
+    def _new_node(self, is_leaf: bool) -> "BPlusNode[T]":
+        """このノードと同じ種類・同じ最小次数の新しいノードを作成します。
+
+        キーの格納方法を変えるサブクラスは、このメソッドを上書きします。
+
+        Args:
+            is_leaf: 新しいノードが葉ノードかどうか。
+
+        Returns:
+            作成したノード。
+        """
+        return BPlusNode(self.t, is_leaf)
+
+    def split_child(self, i: int, y: "BPlusNode[T]") -> None:
+        """満杯の子ノード y を分割します。
+
+        葉ノードの場合は後半のキーと値を新しい葉ノード z に移し、
+        z の最初のキーのコピーを区切りキーとしてこのノードに追加します。z は葉の連結リストにも挿入されます。
+        非葉ノードの場合は `Node.split_child` と同じく、中央のキーをこのノードに昇格させます。
+
+        Args:
+            i: self.children における子ノード y のインデックス。
+            y: 分割対象の子ノード
+        """
+        t = self.t
+        z = y._new_node(y.is_leaf)
+
+        if y.is_leaf:
+            z.keys = y.keys[t:]
+            z.values = y.values[t:]
+            y.keys = y.keys[:t]
+            y.values = y.values[:t]
+            separator = z.keys[0]
+
+            z.next = y.next
+            z.prev = y
+            if y.next is not None:
+                y.next.prev = z
+            y.next = z
+        else:
+            separator = y.keys[t - 1]
+            z.keys = y.keys[t:]
+            z.children = y.children[t:]
+            y.keys = y.keys[: t - 1]
+            y.children = y.children[:t]
+
+        self.children.insert(i + 1, z)
+        self.keys.insert(i, separator)
+
+    def insert(self, key: T, value: int) -> None:
+        """キーと値をこのノード (またはそのサブツリー) に挿入します。
+
+        このメソッドは、このノードが満杯でないことを前提としています。
+
+        Args:
+            key: 挿入するキー。
+            value: 挿入する値。
+        """
+        if self.is_leaf:
+            i = bisect_right(self.keys, key)  # type: ignore[call-overload]
+            self.keys.insert(i, key)
+            self.values.insert(i, value)
+            return
+
+        child_index = bisect_right(self.keys, key)  # type: ignore[call-overload]
+        child = self.children[child_index]
+        if len(child.keys) == (2 * self.t - 1):
+            self.split_child(child_index, child)
+
+            if key >= self.keys[child_index]:
+                child_index += 1
+
+        self.children[child_index].insert(key, value)
+
+    def _full_key(self, i: int) -> T:
+        """i 番目のキーを返します。キーの格納方法を変えるサブクラスは、このメソッドを上書きします。"""
+        return self.keys[i]
+
+    def delete(self, key: T) -> bool:
+        """このノードまたはそのサブツリーからキーを削除します。
+
+        削除されたキーが区切りキーとして非葉ノードに残っていても、
+        探索の経路は変わらないためそのままにします。
+
+        Args:
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+        """
+        if self.is_leaf:
+            idx = bisect_left(self.keys, key)  # type: ignore[call-overload]
+            if idx < len(self.keys) and self.keys[idx] == key:
+                del self.keys[idx]
+                del self.values[idx]
+                return True
+            return False
+
+        idx = bisect_right(self.keys, key)  # type: ignore[call-overload]
+        return self._ensure_child_has_enough_keys_and_delete(idx, key)
+
+    def _ensure_child_has_enough_keys_and_delete(self, idx: int, key: T) -> bool:
+        """指定された子ノードが最低 t 個のキーを持つようにしてから、削除を続行します。
+
+        区切りキーには右側の葉の最初のキーをコピーするため、同じキーが複数ある場合は
+        区切りキーと等しいキーが左側の子ノードにも残ります。子ノードで見つからず、
+        左隣の区切りキーが key と等しい場合は、左隣の子ノードで削除を続けます。
+
+        Args:
+            idx: 子ノードのインデックス。
+            key: 削除するキー。
+
+        Returns:
+            削除が成功したかどうか。
+        """
+        while True:
+            if len(self.children[idx].keys) == self.t - 1:
+                if idx > 0 and len(self.children[idx - 1].keys) >= self.t:
+                    self._borrow_from_prev(idx)
+                elif (
+                    idx < len(self.children) - 1
+                    and len(self.children[idx + 1].keys) >= self.t
+                ):
+                    self._borrow_from_next(idx)
+                else:
+                    if idx == len(self.children) - 1:
+                        self._merge_children(idx - 1)
+                        idx = idx - 1
+                    else:
+                        self._merge_children(idx)
+
+            if self.children[idx].delete(key):
+                return True
+            if idx == 0 or self._full_key(idx - 1) != key:
+                return False
+            idx -= 1
+
+    def _merge_children(self, idx: int) -> None:
+        """idx 番目の子と idx+1 番目の子をマージします。
+
+        葉ノードの場合は区切りキーを捨てて連結し、葉の連結リストからも兄弟を外します。
+
+        Args:
+            idx: マージする最初の子のインデックス。
+        """
+        child = self.children[idx]
+        sibling = self.children[idx + 1]
+
+        if child.is_leaf:
+            child.keys.extend(sibling.keys)
+            child.values.extend(sibling.values)
+            child.next = sibling.next
+            if sibling.next is not None:
+                sibling.next.prev = child
+        else:
+            child.keys.append(self.keys[idx])
+            child.keys.extend(sibling.keys)
+            child.children.extend(sibling.children)
+
+        del self.keys[idx]
+        del self.children[idx + 1]
+
+    def _borrow_from_prev(self, idx: int) -> None:
+        """前の兄弟からキーを借りて、子ノードに追加します。
+
+        Args:
+            idx: 子ノードのインデックス。
+        """
+        child = self.children[idx]
+        sibling = self.children[idx - 1]
+
+        if child.is_leaf:
+            child.keys.insert(0, sibling.keys.pop())
+            child.values.insert(0, sibling.values.pop())
+            self.keys[idx - 1] = child.keys[0]
+        else:
+            child.keys.insert(0, self.keys[idx - 1])
+            self.keys[idx - 1] = sibling.keys.pop()
+            child.children.insert(0, sibling.children.pop())
+
+    def _borrow_from_next(self, idx: int) -> None:
+        """次の兄弟からキーを借りて、子ノードに追加します。
+
+        Args:
+            idx: 子ノードのインデックス。
+        """
+        child = self.children[idx]
+        sibling = self.children[idx + 1]
+
+        if child.is_leaf:
+            child.keys.append(sibling.keys.pop(0))
+            child.values.append(sibling.values.pop(0))
+            self.keys[idx] = sibling.keys[0]
+        else:
+            child.keys.append(self.keys[idx])
+            self.keys[idx] = sibling.keys.pop(0)
+            child.children.append(sibling.children.pop(0))
+
+
+class BPlusTree[T]:
+    """B+木全体を表すクラス。
+
+    `BTree` と同じ操作を提供しますが、値はすべて連結された葉ノードに格納されるため、
+    範囲走査は葉ノードを順にたどるだけで行えます。
+
+    Attributes:
+        root (BPlusNode[T]): B+木のルートノード。
+        t (int): B+木の最小次数 (minimum degree)。
+    """
+
+    def __init__(self, t: int):
+        """B+木を初期化します。
+
+        Args:
+            t: B+木の最小次数。t >= 2 である必要があります。
+        """
+        if t < 2:
+            raise ValueError("B木の最小次数 t は 2 以上である必要があります。")
+        self.root: BPlusNode[T] = BPlusNode(t, True)
+        self.t = t
+
+    def insert(self, key: T, value: int) -> None:
+        """B+木に新しいキーと値のペアを挿入します。
+
+        Args:
+            key: 挿入するキー。
+            value: 挿入する値。
+        """
+        root = self.root
+        if len(root.keys) == (2 * self.t - 1):
+            new_root = root._new_node(False)
+            new_root.children.append(root)
+            self.root = new_root
+            new_root.split_child(0, root)
+        self.root.insert(key, value)
+
+    def _find_leaf(self, key: T, right: bool = True) -> BPlusNode[T]:
+        """キーが格納されるべき葉ノードを返します。
+
+        同じキーが複数ある場合、right が True ならそれより後の葉ノードには key より大きいキーしかない
+        葉ノードを、False ならそれより前の葉ノードには key より小さいキーしかない葉ノードを返します。
+        後者の場合、key の最初の位置は返した葉ノードか、その右隣の葉ノードの先頭にあります。
+
+        Args:
+            key: 探すキー。
+            right: 区切りキーと等しいキーを右側の子ノードへ進めるかどうか。
+        """
+        find = bisect_right if right else bisect_left
+        node = self.root
+        while not node.is_leaf:
+            node = node.children[find(node.keys, key)]  # type: ignore[call-overload]
+        return node
+
+    def search(self, key: T) -> tuple[BPlusNode[T], int] | None:
+        """キーを検索します。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーが見つかった場合は (葉ノード, キーのインデックス) のタプル、見つからなかった場合は None。
+        """
+        leaf = self._find_leaf(key, right=False)
+        i = bisect_left(leaf.keys, key)  # type: ignore[call-overload]
+        if i == len(leaf.keys) and leaf.next is not None:
+            # key 未満のキーしか持たない葉ノードでは、key は右隣の葉ノードの先頭にありうる
+            leaf, i = leaf.next, 0
+        if i < len(leaf.keys) and leaf.keys[i] == key:
+            return (leaf, i)
+        return None
+
+    def update(self, key: T, value: int) -> bool:
+        """既存のキーに関連付けられた値を更新します。
+
+        Args:
+            key: 更新するキー。
+            value: 新しい値。
+
+        Returns:
+            更新が成功した場合はTrue、キーが見つからなかった場合はFalse。
+        """
+        result = self.search(key)
+        if result is None:
+            return False
+
+        leaf, idx = result
+        leaf.values[idx] = value
+        return True
+
+    def delete(self, key: T) -> bool:
+        """B+木からキーを削除します。
+
+        Args:
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+        """
+        result = self.root.delete(key)
+
+        # ルートノードがキーを持たなくなった場合、ツリーの高さを減らす
+        if len(self.root.keys) == 0 and not self.root.is_leaf:
+            self.root = self.root.children[0]
+
+        return result
+
+    def __iter__(self) -> Iterator[T]:
+        """キーを昇順に返すイテレータを返します。"""
+        return self.keys()
+
+    def keys(self) -> Iterator[T]:
+        """キーを昇順に遅延評価で返します。
+
+        Yields:
+            B+木に格納されているキー。
+        """
+        for key, _ in self.range():
+            yield key
+
+    def items(self) -> Iterator[tuple[T, int]]:
+        """(キー, 値) のペアをキーの昇順に遅延評価で返します。
+
+        Yields:
+            B+木に格納されている (キー, 値) のタプル。
+        """
+        return self.range()
+
+    def range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[T, int]]:
+        """キーが lo から hi の範囲にある (キー, 値) のペアを遅延評価で返します。
+
+        範囲の端を含む葉ノードまで 1 回だけ降り、あとは葉の連結リストをたどります。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+            reverse: True の場合はキーの降順に返します。
+
+        Yields:
+            範囲内の (キー, 値) のタプル。
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        leaf: BPlusNode[T] | None
+
+        if not reverse:
+            if lo is None:
+                leaf = self.root
+                while not leaf.is_leaf:
+                    leaf = leaf.children[0]
+                i = 0
+            else:
+                # lo を含む場合は、同じキーの最初の位置から始める
+                leaf = self._find_leaf(lo, right=not lo_inclusive)
+                if lo_inclusive:
+                    i = bisect_left(leaf.keys, lo)  # type: ignore[call-overload]
+                else:
+                    i = bisect_right(leaf.keys, lo)  # type: ignore[call-overload]
+
+            while leaf is not None:
+                keys = leaf.keys
+                values = leaf.values
+                for j in range(i, len(keys)):
+                    key = keys[j]
+                    if hi is not None and (
+                        key > hi or (not hi_inclusive and key == hi)  # type: ignore[operator]
+                    ):
+                        return
+                    yield (key, values[j])
+                leaf = leaf.next
+                i = 0
+        else:
+            if hi is None:
+                leaf = self.root
+                while not leaf.is_leaf:
+                    leaf = leaf.children[-1]
+                i = len(leaf.keys)
+            else:
+                # hi を含まない場合は、hi 未満の最後のキーから始める
+                leaf = self._find_leaf(hi, right=hi_inclusive)
+                if hi_inclusive:
+                    i = bisect_right(leaf.keys, hi)  # type: ignore[call-overload]
+                else:
+                    i = bisect_left(leaf.keys, hi)  # type: ignore[call-overload]
+
+            while leaf is not None:
+                keys = leaf.keys
+                values = leaf.values
+                for j in range(i - 1, -1, -1):
+                    key = keys[j]
+                    if lo is not None and (
+                        key < lo or (not lo_inclusive and key == lo)  # type: ignore[operator]
+                    ):
+                        return
+                    yield (key, values[j])
+                leaf = leaf.prev
+                if leaf is not None:
+                    i = len(leaf.keys)
@@ -0,0 +1,581 @@
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from operator import sub
+from typing import Any, cast
+
+from .b_tree import BTree, BTreeSnapshot
+from .node import KeyValuePair, Node, _get_key
+
+# 削除のメッセージの値。削除のメッセージを適用した非葉ノードのペア (削除済みの区切り) もこの値を持つ
+_DELETE: Any = object()
+
+
+class BufferedNode[T](Node[T]):
+    """子ノードへまだ適用していない変更 (メッセージ) のバッファを持つ B木のノード。
+
+    メッセージはキーと値のペアで、値が `_DELETE` のものは削除、それ以外は挿入または更新を表します。
+    非葉ノードの buffer は、このノード自身とそのサブツリーにある同じキーのペアやメッセージよりも
+    新しい状態を、キーごとに最新の 1 件だけキーの順に保持します。
+    このノードの items にあるキーのメッセージは、子ノードへ流すときに、そのペアを置き換えます。
+    削除の場合は、区切りのキーとして残したまま値を `_DELETE` にします。
+
+    Attributes:
+        buffer (list[KeyValuePair]): キーでソートされた保留中のメッセージのリスト。葉ノードでは常に空です。
+        buffer_keys (list): buffer の各メッセージのキーのリスト。キー関数を使わずに二分探索するために持ちます。
+    """
+
+    def __init__(self, t: int, is_leaf: bool):
+        super().__init__(t, is_leaf)
+        self.buffer: list[KeyValuePair] = []
+        # T は比較の型を持たないため、bisect で探せるよう Any のリストとする
+        self.buffer_keys: list[Any] = []
+
+    def _new_node(self, is_leaf: bool) -> "BufferedNode[T]":
+        """バッファを持つ新しいノードを作成します。"""
+        node: BufferedNode[T] = BufferedNode(self.t, is_leaf)
+        if self.owner is not None:
+            node.owner = self.owner
+        return node
+
+    def _clone(self, owner: object | None) -> "BufferedNode[T]":
+        """バッファも複製した、このノードの浅い複製を作成します。"""
+        node: BufferedNode[T] = BufferedNode(self.t, self.is_leaf)
+        node.items = list(self.items)
+        node.children = list(self.children)
+        node.buffer = list(self.buffer)
+        node.buffer_keys = list(self.buffer_keys)
+        node.owner = owner
+        return node
+
+    def _child(self, i: int) -> "BufferedNode[T]":
+        """i 番目の子ノードを返します。子ノードはすべて `BufferedNode` です。"""
+        return cast("BufferedNode[T]", self.children[i])
+
+    def _writable_buffered_child(self, i: int) -> "BufferedNode[T]":
+        """`_writable_child` と同じです。子ノードはすべて `BufferedNode` です。"""
+        return cast("BufferedNode[T]", self._writable_child(i))
+
+    def _buffered_children(self) -> list["BufferedNode[T]"]:
+        """子ノードのリストを返します。子ノードはすべて `BufferedNode` です。"""
+        return cast("list[BufferedNode[T]]", self.children)
+
+    def _receive(self, messages: list[KeyValuePair[T]], capacity: int) -> None:
+        """メッセージをこのノードで受け取ります。
+
+        葉ノードではペアに適用し、非葉ノードではバッファに加えます。バッファが capacity を
+        超えた場合は `_flush` で子ノードへ流します。その結果このノードのキー数が
+        制約から外れることがあるため、呼び出し側で修正する必要があります。
+
+        Args:
+            messages: キーでソートされた、キーが重複しないメッセージのリスト。
+                このノードのサブツリーにある同じキーのペアやメッセージよりも新しい必要があります。
+            capacity: バッファに保持するメッセージの最大数。
+        """
+        if self.is_leaf:
+            self._apply_to_leaf(messages)
+            return
+
+        buffer, keys = self.buffer, self.buffer_keys
+        j = 0
+        for message in messages:
+            key = message.key
+            # メッセージはキーの順に並んでいるため、前のメッセージの位置から探す
+            j = bisect_left(keys, key, j)
+            if j < len(keys) and keys[j] == key:
+                buffer[j] = message
+            else:
+                keys.insert(j, key)
+                buffer.insert(j, message)
+        if len(buffer) > capacity:
+            self._flush(capacity)
+
+    def _apply_to_leaf(self, messages: list[KeyValuePair[T]]) -> None:
+        """キーでソート済みのメッセージを、葉ノードのペアに適用します。
+
+        挿入・更新のメッセージは、そのままペアとして葉ノードに格納します。
+        """
+        items = self.items
+        i = 0
+        for message in messages:
+            key: Any = message.key
+            i = bisect_left(items, key, i, key=_get_key)
+            if i < len(items) and items[i].key == key:
+                if message.value is _DELETE:
+                    del items[i]
+                else:
+                    items[i] = message
+            elif message.value is not _DELETE:
+                items.insert(i, message)
+
+    def _flush(self, capacity: int) -> None:
+        """バッファのメッセージが capacity を超えている場合に、子ノードへまとめて流します。
+
+        流すメッセージが多い子ノードから順に、バッファが capacity の半分以下になるまで流します。
+        流す子ノードを右から順に処理することで、分割や右の兄弟とのマージでは、
+        まだ流していない子ノードのバッファ上の範囲が変わらないようにします。
+
+        Args:
+            capacity: バッファに残してよいメッセージの最大数。
+        """
+        buffer, keys, items = self.buffer, self.buffer_keys, self.items
+        while len(buffer) > capacity:
+            # 区切りのキーでバッファを子ノードごとの範囲に分ける
+            bounds = [0]
+            for kv_pair in items:
+                bounds.append(bisect_left(keys, kv_pair.key, bounds[-1]))
+            bounds.append(len(keys))
+            counts = list(map(sub, bounds[1:], bounds))
+
+            chosen = []
+            remaining = len(buffer)
+            for i in sorted(range(len(counts)), key=counts.__getitem__, reverse=True):
+                if remaining <= capacity // 2:
+                    break
+                chosen.append(i)
+                remaining -= counts[i]
+
+            for i in sorted(chosen, reverse=True):
+                start, end = bounds[i], bounds[i + 1]
+                group = buffer[start:end]
+                del buffer[start:end]
+                del keys[start:end]
+                # 左側の区切りのキーのメッセージは、子ノードへ流さずに区切りのペアに適用する
+                if i > 0 and group and group[0].key == items[i - 1].key:
+                    items[i - 1] = group.pop(0)
+                self._writable_buffered_child(i)._receive(group, capacity)
+                # 左の兄弟とマージした場合は、それより左の範囲も変わるため分け直す
+                if self._fix_child(i, capacity) < i:
+                    break
+
+    def _fix_child(self, i: int, capacity: int) -> int:
+        """メッセージを受け取った i 番目の子ノードのキー数が制約から外れていれば、マージまたは分割で修正します。
+
+        Args:
+            i: 子ノードのインデックス。
+            capacity: バッファに保持するメッセージの最大数。
+
+        Returns:
+            修正したノードのうち最も左のもののインデックス。左の兄弟とマージした場合は i より小さくなります。
+        """
+        t = self.t
+        while len(self.children) > 1 and len(self.children[i].items) < t - 1:
+            # 右の兄弟 (最後の子の場合は左の兄弟) とマージする
+            if i == len(self.children) - 1:
+                i -= 1
+            self._merge_children(i)
+            child = self._child(i)
+            # マージでバッファがあふれた場合は先に流す。流した結果、再びキーが足りなくなることがある
+            if len(child.buffer) > capacity:
+                child._flush(capacity)
+
+        if len(self.children[i].items) > 2 * t - 1:
+            pieces, separators = self._writable_child(i)._split_overflowing()
+            self.children[i : i + 1] = pieces
+            self.items[i:i] = separators
+        return i
+
+    def _merge_children(self, idx: int) -> None:
+        """idx 番目の子と idx+1 番目の子を、バッファも含めてマージします。
+
+        葉ノードへ降ろす区切りのペアが削除済みの場合は、降ろさずに取り除きます。
+        """
+        sibling = self._child(idx + 1)
+        pos = len(self.children[idx].items)
+        super()._merge_children(idx)
+        child = self._child(idx)
+        # 兄弟のバッファのキーはすべて区切りのキー以上のため、連結してもソートされたまま
+        child.buffer.extend(sibling.buffer)
+        child.buffer_keys.extend(sibling.buffer_keys)
+        if child.is_leaf and child.items[pos].value is _DELETE:
+            del child.items[pos]
+
+    def _split_overflowing(self) -> tuple[list[Node[T]], list[KeyValuePair]]:
+        buffer, keys = self.buffer, self.buffer_keys
+        pieces, separators = super()._split_overflowing()
+        if buffer:
+            start = 0
+            for p, separator in enumerate(separators):
+                end = bisect_left(keys, separator.key, start)
+                piece = cast("BufferedNode[T]", pieces[p])
+                piece.buffer, piece.buffer_keys = buffer[start:end], keys[start:end]
+                start = end
+                # 親ノードへ昇格する区切りのペアより新しいメッセージは、昇格する前に適用する
+                if end < len(keys) and keys[end] == separator.key:
+                    separators[p] = buffer[end]
+                    start += 1
+            last = cast("BufferedNode[T]", pieces[-1])
+            last.buffer, last.buffer_keys = buffer[start:], keys[start:]
+        return pieces, separators
+
+    def _push(self, message: KeyValuePair[T], capacity: int) -> None:
+        """1 つのメッセージを、他のメッセージを動かさずに、キーのペアがあるノードまで降ろして適用します。
+
+        途中のバッファにある同じキーのメッセージは、message より古いため取り除きます。
+
+        Args:
+            message: このノードのサブツリーにある同じキーのどの状態よりも新しいメッセージ。
+            capacity: バッファに保持するメッセージの最大数。
+        """
+        if self.is_leaf:
+            self._apply_to_leaf([message])
+            return
+        key = message.key
+        keys = self.buffer_keys
+        j = bisect_left(keys, key)
+        if j < len(keys) and keys[j] == key:
+            del keys[j]
+            del self.buffer[j]
+        i = self._find_key(key)
+        if i < len(self.items) and self.items[i].key == key:
+            self.items[i] = message
+            return
+        self._writable_buffered_child(i)._push(message, capacity)
+        self._fix_child(i, capacity)
+
+    def _drain(self) -> None:
+        """サブツリーのすべてのバッファを空にします。
+
+        バッファを持たないサブツリーは複製も変更もしません。
+        """
+        self._flush(0)
+        i = 0
+        while i < len(self.children):
+            child = self._child(i)
+            if child.is_leaf:
+                return
+            if not child._has_buffered():
+                i += 1
+                continue
+            # 空にした子ノードがマージされた場合は、同じ位置をもう一度確認する
+            self._writable_buffered_child(i)._drain()
+            self._fix_child(i, 0)
+
+    def _has_buffered(self) -> bool:
+        """サブツリーに、バッファにメッセージを持つノードがあるかを返します。"""
+        stack: list[BufferedNode[T]] = [self]
+        while stack:
+            node = stack.pop()
+            if node.buffer:
+                return True
+            if not node.children[0].is_leaf:
+                stack.extend(node._buffered_children())
+        return False
+
+    def _dead_keys(self) -> list[T]:
+        """サブツリーの非葉ノードにある、削除済みの区切りのペアのキーを返します。"""
+        keys: list[T] = []
+        stack: list[BufferedNode[T]] = [self]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                continue
+            keys.extend(
+                kv_pair.key for kv_pair in node.items if kv_pair.value is _DELETE
+            )
+            stack.extend(node._buffered_children())
+        return keys
+
+
+def _to_buffered[T](node: Node[T]) -> BufferedNode[T]:
+    """ノードとそのサブツリーを、items のリストを共有したまま `BufferedNode` に置き換えます。"""
+    buffered: BufferedNode[T] = BufferedNode(node.t, node.is_leaf)
+    buffered.items = node.items
+    buffered.children = [_to_buffered(child) for child in node.children]
+    return buffered
+
+
+def _last_per_key[T](pairs: list[KeyValuePair[T]]) -> list[KeyValuePair[T]]:
+    """キーでソート済みのペアのリストから、同じキーが続く場合は最後のペアだけを残します。"""
+    return [
+        kv_pair
+        for kv_pair, following in zip(pairs, pairs[1:], strict=False)
+        if kv_pair.key != following.key
+    ] + pairs[-1:]
+
+
+def _last_of_runs[T](iterable: Iterable[tuple[T, int]]) -> Iterator[tuple[T, int]]:
+    """(キー, 値) の列から、同じキーが続く場合は最後のペアだけを返します。"""
+    iterator = iter(iterable)
+    previous = next(iterator, None)
+    if previous is None:
+        return
+    for pair in iterator:
+        if pair[0] != previous[0]:
+            yield previous
+        previous = pair
+    yield previous
+
+
+class BufferedBTree[T](BTree[T]):
+    """非葉ノードに変更のバッファを持つ、書き込みに最適化した B木 (Bε 木)。
+
+    挿入・更新・削除はメッセージとしてルートのバッファに加えるだけで、葉まで降りません。
+    バッファが buffer_size を超えると、最も多くのメッセージが向かう子ノードへまとめて流すため、
+    ランダムなキーの書き込みでも、ノードを 1 回たどるコストを多くのメッセージで分け合います。
+    検索はルートから降りる途中で各ノードのバッファも確認し、最も上で見つかった状態を
+    最新の状態として使うため、O(log n) のままです。
+
+    キーは一意で、既存のキーへの `insert` は値を上書きします (upsert)。
+    `update` と `delete` は戻り値を求めるためにキーを検索してから、メッセージを加えます。
+    範囲の走査・`dump`・`delete_range`・`split_at` / `join`・スナップショットなど、
+    `BTree` と同じ処理を行う操作の前には、すべてのバッファを空にします。
+
+    Attributes:
+        buffer_size (int): 非葉ノードのバッファに保持するメッセージの最大数。
+    """
+
+    # メッセージの順序を保つため、右端の葉へ直接追加する追記の高速化は使わない
+    append_optimized = False
+
+    root: BufferedNode[T]
+
+    def __init__(self, t: int, buffer_size: int | None = None):
+        """B木を初期化します。
+
+        Args:
+            t: B木の最小次数。
+            buffer_size: 非葉ノードのバッファに保持するメッセージの最大数。
+                None の場合は 32t (子ノードの最大数の 16 倍) です。
+
+        Raises:
+            ValueError: t または buffer_size が範囲外の場合。
+        """
+        super().__init__(t)
+        if buffer_size is None:
+            buffer_size = 32 * t
+        if buffer_size < 1:
+            raise ValueError("buffer_size は 1 以上である必要があります。")
+        self.root = BufferedNode(t, True)
+        self.buffer_size = buffer_size
+        # 前回すべてのバッファを空にしてから、メッセージを加えたか・削除のメッセージを加えたか
+        self._buffered = False
+        self._deleted = False
+
+    @classmethod
+    def from_sorted(
+        cls, iterable: Iterable[tuple[T, int]], t: int, fill_factor: float = 1.0
+    ) -> "BufferedBTree[T]":
+        """キーでソート済みの (キー, 値) の列から B木を構築します。`BTree.from_sorted` と同じです。
+
+        同じキーが続く場合は、最後のペアの値になります。
+        """
+        tree: BufferedBTree[T] = cls(t)
+        plain = BTree.from_sorted(_last_of_runs(iterable), t, fill_factor)
+        tree.root = _to_buffered(plain.root)
+        return tree
+
+    def _lookup(self, key: T) -> tuple[KeyValuePair[T] | None, bool]:
+        """key の最新の状態を、ルートから降りながら各ノードのバッファとペアを確認して求めます。
+
+        Returns:
+            (生きているペアまたは挿入・更新のメッセージ, それがバッファにあるかどうか) のタプル。
+            キーが存在しない場合と、最新の状態が削除の場合は、1 つ目の要素は None です。
+        """
+        probe: Any = key
+        node = self.root
+        while True:
+            if not node.is_leaf:
+                # このノードのペアより新しいため、バッファを先に確認する
+                keys = node.buffer_keys
+                j = bisect_left(keys, probe)
+                if j < len(keys) and keys[j] == key:
+                    message = node.buffer[j]
+                    return (None if message.value is _DELETE else message), True
+            items = node.items
+            i = bisect_left(items, probe, key=_get_key)
+            if i < len(items) and items[i].key == key:
+                kv_pair = items[i]
+                return (None if kv_pair.value is _DELETE else kv_pair), False
+            if node.is_leaf:
+                return None, False
+            node = node._child(i)
+
+    def get(self, key: T) -> int | None:
+        """キーに対応する値を返します。ノードは変更しません。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーに対応する値。キーが見つからなかった場合は None。
+        """
+        kv_pair, _ = self._lookup(key)
+        return None if kv_pair is None else kv_pair.value
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        return [self.get(key) for key in keys]
+
+    def search(self, key: T) -> tuple[Node[T], int] | None:
+        """キーを検索します。`BTree.search` と同じです。
+
+        ノードとインデックスを返すため、最新の状態がバッファにある場合は、そのメッセージを
+        キーのペアがあるノードまで降ろして適用してから探します。
+        値だけが必要な場合は、ノードを変更しない `get` を使用してください。
+        """
+        kv_pair, buffered = self._lookup(key)
+        if kv_pair is None:
+            return None
+        if buffered:
+            root = cast("BufferedNode[T]", self._writable_root())
+            root._push(kv_pair, self.buffer_size)
+            self._fix_root()
+        found: tuple[Node[T], int] | None = super().search(key)
+        return found
+
+    def insert(self, key: T, value: int) -> None:
+        """キーと値のペアを挿入します。キーがすでに存在する場合は値を上書きします。
+
+        Args:
+            key: 挿入するキー。
+            value: 挿入する値。
+        """
+        self._put(KeyValuePair(key, value))
+
+    def update(self, key: T, value: int) -> bool:
+        if self._lookup(key)[0] is None:
+            return False
+        self._put(KeyValuePair(key, value))
+        return True
+
+    def delete(self, key: T) -> bool:
+        """キーを削除するメッセージを加えます。
+
+        Args:
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+        """
+        if self._lookup(key)[0] is None:
+            return False
+        self._put(KeyValuePair(key, _DELETE))
+        self._deleted = True
+        return True
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """複数のペアを、キーでソートしたメッセージとしてまとめてルートに加えます。
+
+        同じキーが複数ある場合は、入力の最後のペアの値になります。
+        """
+        messages = sorted(
+            (KeyValuePair(key, value) for key, value in pairs), key=_get_key
+        )
+        if messages:
+            self._put_many(_last_per_key(messages))
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        return [self.delete(key) for key in keys]
+
+    def _put(self, message: KeyValuePair[T]) -> None:
+        """1 つのメッセージをルートのバッファに加えます。
+
+        書き込みのたびに通るため、`_receive` を呼び出さずにルートのバッファへ直接加えます。
+        """
+        root = cast("BufferedNode[T]", self._writable_root())
+        self._buffered = True
+        if root.is_leaf:
+            root._apply_to_leaf([message])
+            self._fix_root()
+            return
+        keys, key = root.buffer_keys, message.key
+        j = bisect_left(keys, key)
+        if j < len(keys) and keys[j] == key:
+            root.buffer[j] = message
+            return
+        keys.insert(j, key)
+        root.buffer.insert(j, message)
+        if len(keys) > self.buffer_size:
+            root._flush(self.buffer_size)
+            self._fix_root()
+
+    def _put_many(self, messages: list[KeyValuePair[T]]) -> None:
+        """キーでソートされた、キーが重複しないメッセージをルートに加えます。"""
+        cast("BufferedNode[T]", self._writable_root())._receive(
+            messages, self.buffer_size
+        )
+        self._fix_root()
+        self._buffered = True
+
+    def _fix_root(self) -> None:
+        """キー数が制約から外れたルートを、分割または唯一の子ノードへの置き換えで修正します。"""
+        while True:
+            self._split_overflowing_root()
+            root = self.root
+            if root.items or root.is_leaf:
+                return
+            # キーがなくなったルートのバッファを子ノードへ渡して、ツリーの高さを減らす
+            child = root._writable_buffered_child(0)
+            child._receive(root.buffer, self.buffer_size)
+            self._replace_root(child, -1)
+
+    def _settle(self) -> None:
+        """すべてのバッファを空にし、削除済みの区切りのペアを取り除きます。
+
+        `BTree` と同じ処理を行う操作は、ノードがバッファを持たないことを前提とするため、その前に呼び出します。
+        """
+        super()._settle()
+        if self._buffered:
+            if not self.root.is_leaf:
+                cast("BufferedNode[T]", self._writable_root())._drain()
+                self._fix_root()
+            self._buffered = False
+        if self._deleted:
+            # バッファが空なので、通常の削除で区切りのペアを取り除ける
+            for key in self.root._dead_keys():
+                self._writable_root().delete(key)
+                if len(self.root.items) == 0 and not self.root.is_leaf:
+                    self._replace_root(self.root.children[0], -1)
+            self._deleted = False
+
+    def _iter_range(
+        self,
+        lo: T | None,
+        hi: T | None,
+        inclusive: tuple[bool, bool],
+        reverse: bool,
+    ) -> Iterator[KeyValuePair[T]]:
+        self._settle()
+        pairs: Iterator[KeyValuePair[T]] = super()._iter_range(
+            lo, hi, inclusive, reverse
+        )
+        return pairs
+
+    def _count_entries(self) -> int:
+        self._settle()
+        count: int = super()._count_entries()
+        return count
+
+    def stats(self) -> dict[str, Any]:
+        """`BTree.stats` に、バッファにあるメッセージの数 (buffered_messages) を加えた統計を返します。
+
+        バッファは空にしないため、entries とレベルごとの統計には削除済みの区切りのペアも含みます。
+        """
+        stats: dict[str, Any] = super().stats()
+        buffered = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            buffered += len(node.buffer)
+            if not node.is_leaf:
+                stack.extend(node._buffered_children())
+        stats["buffered_messages"] = buffered
+        return stats
+
+    def snapshot(self) -> BTreeSnapshot[T]:
+        """すべてのバッファを空にしてから、スナップショットを作成します。`BTree.snapshot` と同じです。"""
+        self._settle()
+        return super().snapshot()
+
+    def split_at(self, key: T) -> tuple["BTree[T]", "BTree[T]"]:
+        left, right = super().split_at(key)
+        for part in (left, right):
+            if isinstance(part, BufferedBTree):
+                part.buffer_size = self.buffer_size
+        return left, right
+
+    @staticmethod
+    def join(left: "BTree[T]", right: "BTree[T]") -> "BTree[T]":
+        tree = BTree.join(left, right)
+        if isinstance(left, BufferedBTree) and isinstance(tree, BufferedBTree):
+            tree.buffer_size = left.buffer_size
+        return tree
@@ -0,0 +1,276 @@
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+from .b_tree import BTree
+from .node import KeyValuePair, Node, _get_key
+
+# 受け入れ方針の名前
+_ADMISSIONS = ("lru", "tinylfu")
+
+
+def _edge_has_key[T](node: Node[T], key: T, end: int) -> bool:
+    """サブツリーの端 (end が 0 なら左端、-1 なら右端) のパス上に key のペアがあるかを返します。
+
+    追記の途中でキーを持たないノードがあっても、サブツリーの最小 (最大) のキーは
+    このパス上のいずれかのノードの端にあります。
+    """
+    while True:
+        if node.items and node.items[end].key == key:
+            return True
+        if node.is_leaf:
+            return False
+        node = node.children[end]
+
+
+class CachedBTree[T](BTree[T]):
+    """よく読まれるキーのペアを、キーからペアへの有界なキャッシュで保持する B木。
+
+    `get` と `update` は、キャッシュにあるキーならルートから降りずに O(1) で処理します。
+    キャッシュはペアのオブジェクトを保持するため、`update` でペアの値を書き換えると
+    キャッシュも同時に新しい値になります。キャッシュがいっぱいの場合は、最も長く使われていない
+    キーを追い出します (LRU)。admission が "tinylfu" の場合は、さらに最近のアクセス回数が
+    追い出すキー以下の新しいキーをキャッシュに入れないため、一度しか読まれないキーの走査で
+    よく読まれるキーが追い出されません。
+
+    同じキーのペアが複数ある場合、`search` が返すペアは分割やマージで入れ替わることがあるため、
+    キャッシュにはペアが 1 つしかないキーだけを入れます。ペアが 1 つのキーは、
+    `_delete_from_non_leaf` の先行者・後続者との交換や分割・マージでノード間を移動しても、
+    同じペアのオブジェクトのままです。そのため、キャッシュを無効にする必要があるのは、
+    `insert`・`delete` などでそのキー自身のペアが増減した場合と、スナップショットと
+    ペアを共有していて `update` がペアを置き換えた場合だけです。
+
+    Attributes:
+        cache_size (int): キャッシュに保持するキーの最大数。
+        admission (str): キャッシュに入れるキーの方針。"lru" または "tinylfu"。
+    """
+
+    def __init__(self, t: int, cache_size: int = 1024, admission: str = "lru"):
+        """B木を初期化します。
+
+        Args:
+            t: B木の最小次数。
+            cache_size: キャッシュに保持するキーの最大数。
+            admission: キャッシュに入れるキーの方針。"lru" はすべて入れ、
+                "tinylfu" は最近のアクセス回数が追い出すキーより多い場合だけ入れます。
+
+        Raises:
+            ValueError: t・cache_size・admission が範囲外の場合。
+        """
+        super().__init__(t)
+        if cache_size < 1:
+            raise ValueError("cache_size は 1 以上である必要があります。")
+        if admission not in _ADMISSIONS:
+            raise ValueError(
+                f"admission は {_ADMISSIONS} のいずれかである必要があります。"
+            )
+        self.cache_size = cache_size
+        self.admission = admission
+        # 最も長く使われていないキーが先頭に来る、キーからペアへの辞書
+        self._cache: OrderedDict[T, KeyValuePair[T]] = OrderedDict()
+        # tinylfu で使う、最近のアクセス回数。アクセスの合計が cache_size の 10 倍に達するたびに半分にする
+        self._frequency: dict[T, int] = {}
+        self._accesses = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def cache_hits(self) -> int:
+        """`get` と `update` がキャッシュでキーを見つけた回数。"""
+        return self._hits
+
+    @property
+    def cache_misses(self) -> int:
+        """`get` と `update` がキャッシュでキーを見つけられず、ルートから降りた回数。"""
+        return self._misses
+
+    def get(self, key: T) -> int | None:
+        """キーに対応する値を返します。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーに対応する値。キーが見つからなかった場合は None。
+        """
+        kv_pair = self._cache.get(key)
+        if kv_pair is not None:
+            self._hits += 1
+            self._cache.move_to_end(key)
+            if self.admission == "tinylfu":
+                self._record(key)
+            value: int = kv_pair.value
+            return value
+        self._misses += 1
+        kv_pair = self._load(key)
+        return None if kv_pair is None else kv_pair.value
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        """複数のキーに対応する値を、キャッシュを使って 1 つずつ検索します。"""
+        return [self.get(key) for key in keys]
+
+    def search(self, key: T) -> tuple[Node[T], int] | None:
+        """キーを検索します。`BTree.search` と同じです。
+
+        ノード内の位置は分割やマージで変わるためキャッシュしません。
+        値だけが必要な場合は、キャッシュを使う `get` を使用してください。
+        """
+        found: tuple[Node[T], int] | None = super().search(key)
+        return found
+
+    def _load(self, key: T) -> KeyValuePair[T] | None:
+        """ルートから降りてキーのペアを探し、ペアが 1 つしかないキーならキャッシュに入れます。"""
+        probe: Any = key
+        node = self.root
+        while True:
+            items = node.items
+            i = bisect_left(items, probe, key=_get_key)
+            if i < len(items) and items[i].key == key:
+                kv_pair: KeyValuePair[T] = items[i]
+                break
+            if node.is_leaf:
+                if self.admission == "tinylfu":
+                    self._record(key)
+                return None
+            node = node.children[i]
+
+        if self.admission == "tinylfu":
+            self._record(key)
+        # 同じキーのペアは、見つけたペアの右隣か、その両側のサブツリーの端にしかない
+        unique = i + 1 == len(items) or items[i + 1].key != key
+        if unique and not node.is_leaf:
+            unique = not _edge_has_key(node.children[i], key, -1) and not _edge_has_key(
+                node.children[i + 1], key, 0
+            )
+        if unique:
+            self._admit(key, kv_pair)
+        return kv_pair
+
+    def _admit(self, key: T, kv_pair: KeyValuePair[T]) -> None:
+        """キーをキャッシュに入れ、cache_size を超えた分だけ最も長く使われていないキーを追い出します。"""
+        cache = self._cache
+        if len(cache) >= self.cache_size:
+            victim = next(iter(cache))
+            if self.admission == "tinylfu" and self._frequency.get(
+                key, 0
+            ) <= self._frequency.get(victim, 0):
+                return
+            while len(cache) >= self.cache_size:
+                cache.popitem(last=False)
+        cache[key] = kv_pair
+
+    def _record(self, key: T) -> None:
+        """tinylfu のためにキーへのアクセスを数えます。
+
+        アクセスの合計が cache_size の 10 倍に達したら、すべての回数を半分にして
+        古いアクセスの影響を減らし、回数が 0 になったキーを忘れます。
+        """
+        frequency = self._frequency
+        frequency[key] = frequency.get(key, 0) + 1
+        self._accesses += 1
+        if self._accesses >= 10 * self.cache_size:
+            self._frequency = {k: n >> 1 for k, n in frequency.items() if n > 1}
+            self._accesses //= 2
+
+    def update(self, key: T, value: int) -> bool:
+        kv_pair = self._cache.get(key)
+        if kv_pair is not None and self._owner is None:
+            self._hits += 1
+            self._cache.move_to_end(key)
+            kv_pair.value = value
+            return True
+        if kv_pair is None:
+            self._misses += 1
+        else:
+            # スナップショットとペアを共有しているため、update はペアを置き換える
+            del self._cache[key]
+        updated: bool = super().update(key, value)
+        return updated
+
+    def insert(self, key: T, value: int) -> None:
+        super().insert(key, value)
+        # 同じキーのペアが増えるため、キャッシュから外す
+        self._cache.pop(key, None)
+
+    def delete(self, key: T) -> bool:
+        deleted: bool = super().delete(key)
+        if deleted:
+            self._cache.pop(key, None)
+        return deleted
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        pair_list = list(pairs)
+        super().insert_many(pair_list)
+        for key, _ in pair_list:
+            self._cache.pop(key, None)
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        key_list = list(keys)
+        results: list[bool] = super().delete_many(key_list)
+        for key, deleted in zip(key_list, results, strict=True):
+            if deleted:
+                self._cache.pop(key, None)
+        return results
+
+    def delete_range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+    ) -> int:
+        """範囲内のペアを取り除きます。`BTree.delete_range` と同じです。
+
+        キャッシュにあるキーのうち、範囲に含まれるものをキャッシュから外します。
+        """
+        removed: int = super().delete_range(lo, hi, inclusive)
+        if removed:
+            lo_inclusive, hi_inclusive = inclusive
+            for key in list(self._cache):
+                if lo is not None and (key < lo or (key == lo and not lo_inclusive)):  # type: ignore[operator]
+                    continue
+                if hi is not None and (key > hi or (key == hi and not hi_inclusive)):  # type: ignore[operator]
+                    continue
+                del self._cache[key]
+        return removed
+
+    def clear_cache(self) -> None:
+        """キャッシュとアクセス回数を空にします。ヒット・ミスの回数はそのままです。"""
+        self._cache.clear()
+        self._frequency.clear()
+        self._accesses = 0
+
+    def split_at(self, key: T) -> tuple["BTree[T]", "BTree[T]"]:
+        """キーで 2 つの B木に分割します。`BTree.split_at` と同じです。
+
+        分割した B木のキャッシュは空で、cache_size と admission を引き継ぎます。
+        """
+        left, right = super().split_at(key)
+        for part in (left, right):
+            if isinstance(part, CachedBTree):
+                part.cache_size = self.cache_size
+                part.admission = self.admission
+        return left, right
+
+    @staticmethod
+    def join(left: "BTree[T]", right: "BTree[T]") -> "BTree[T]":
+        """2 つの B木を連結します。`BTree.join` と同じです。
+
+        連結した B木のキャッシュは空で、left の cache_size と admission を引き継ぎます。
+        """
+        tree = BTree.join(left, right)
+        if isinstance(left, CachedBTree) and isinstance(tree, CachedBTree):
+            tree.cache_size = left.cache_size
+            tree.admission = left.admission
+        return tree
+
+    def stats(self) -> dict[str, Any]:
+        """`BTree.stats` に、キャッシュの統計を加えた統計を返します。
+
+        cached_keys (キャッシュにあるキーの数)、cache_hits、cache_misses を加えます。
+        """
+        stats: dict[str, Any] = super().stats()
+        stats["cached_keys"] = len(self._cache)
+        stats["cache_hits"] = self._hits
+        stats["cache_misses"] = self._misses
+        return stats
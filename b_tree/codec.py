@@ -0,0 +1,192 @@
+import struct
+import sys
+from array import array
+from itertools import accumulate, pairwise
+from typing import Any
+
+# キーの型を表すタグ
+KEY_INT = 0
+KEY_STR = 1
+KEY_BYTES = 2
+
+_INT64 = struct.Struct("<q")
+_LENGTH = struct.Struct("<I")
+
+
+def encode_key(key: Any) -> bytes:
+    """キーを型のタグ付きのバイト列に変換します。
+
+    対応する型は 64 ビットに収まる int、str、bytes です。
+
+    Args:
+        key: 変換するキー。
+
+    Returns:
+        タグ (1 バイト) に続いてキーの内容が並んだバイト列。
+
+    Raises:
+        TypeError: 対応していない型のキーの場合。
+    """
+    if isinstance(key, bool):
+        raise TypeError("bool 型のキーはバイト列に変換できません。")
+    if isinstance(key, int):
+        if not -(2**63) <= key < 2**63:
+            raise TypeError(
+                "64 ビットに収まらない int のキーはバイト列に変換できません。"
+            )
+        return bytes((KEY_INT,)) + _INT64.pack(key)
+    if isinstance(key, str):
+        data = key.encode("utf-8")
+        return bytes((KEY_STR,)) + _LENGTH.pack(len(data)) + data
+    if isinstance(key, bytes):
+        return bytes((KEY_BYTES,)) + _LENGTH.pack(len(key)) + key
+    raise TypeError(f"{type(key).__name__} 型のキーはバイト列に変換できません。")
+
+
+def decode_key(data: bytes | memoryview, offset: int) -> tuple[Any, int]:
+    """`encode_key` で変換したバイト列からキーを取り出します。
+
+    Args:
+        data: バイト列。
+        offset: キーの先頭の位置。
+
+    Returns:
+        (キー, キーの直後の位置) のタプル。
+
+    Raises:
+        ValueError: 不明なタグの場合。
+    """
+    tag = data[offset]
+    offset += 1
+    if tag == KEY_INT:
+        return _INT64.unpack_from(data, offset)[0], offset + _INT64.size
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    raw = bytes(data[offset : offset + length])
+    if tag == KEY_STR:
+        return raw.decode("utf-8"), offset + length
+    if tag == KEY_BYTES:
+        return raw, offset + length
+    raise ValueError(f"不明なキーのタグです: {tag}")
+
+
+def key_kind(key: Any) -> int:
+    """キーの型を表すタグを返します。
+
+    Args:
+        key: キー。
+
+    Returns:
+        KEY_INT、KEY_STR、KEY_BYTES のいずれか。
+
+    Raises:
+        TypeError: 対応していない型のキーの場合。
+    """
+    if isinstance(key, int) and not isinstance(key, bool):
+        return KEY_INT
+    if isinstance(key, str):
+        return KEY_STR
+    if isinstance(key, bytes):
+        return KEY_BYTES
+    raise TypeError(f"{type(key).__name__} 型のキーはバイト列に変換できません。")
+
+
+def _to_little_endian(values: array[int]) -> bytes:
+    """配列をリトルエンディアンのバイト列に変換します。"""
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array[int]:
+    """リトルエンディアンのバイト列を配列に変換します。"""
+    values: array[int] = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def encode_values(values: list[int]) -> bytes:
+    """値の列を int64 の配列のバイト列に変換します。
+
+    Args:
+        values: 変換する値のリスト。
+
+    Returns:
+        リトルエンディアンの int64 の配列のバイト列。
+
+    Raises:
+        TypeError: 64 ビットに収まる int でない値が含まれている場合。
+    """
+    try:
+        return _to_little_endian(array("q", values))
+    except OverflowError:
+        raise TypeError("値は 64 ビットに収まる int である必要があります。")
+
+
+def decode_values(data: bytes) -> list[int]:
+    """`encode_values` で変換したバイト列から値のリストを取り出します。"""
+    return _from_little_endian("q", data).tolist()
+
+
+def encode_key_section(keys: list[Any], kind: int) -> bytes:
+    """同じ型のキーの列を 1 つの連続したバイト列に変換します。
+
+    int の場合は int64 の配列、str と bytes の場合は各キーのバイト長 (uint32) の配列に
+    続いて、すべてのキーの内容をつなげたものになります。配列はリトルエンディアンです。
+
+    Args:
+        keys: 変換するキーのリスト。
+        kind: キーの型を表すタグ。
+
+    Returns:
+        キーのセクションのバイト列。
+
+    Raises:
+        TypeError: kind と異なる型のキーや、64 ビットに収まらない int のキーが含まれている場合。
+    """
+    if kind == KEY_INT:
+        if any(type(key) is not int for key in keys):
+            raise TypeError("キーの型がそろっていません。")
+        try:
+            return _to_little_endian(array("q", keys))
+        except OverflowError:
+            raise TypeError(
+                "64 ビットに収まらない int のキーはバイト列に変換できません。"
+            )
+    if kind == KEY_STR:
+        if any(type(key) is not str for key in keys):
+            raise TypeError("キーの型がそろっていません。")
+        raw = [key.encode("utf-8") for key in keys]
+    else:
+        if any(type(key) is not bytes for key in keys):
+            raise TypeError("キーの型がそろっていません。")
+        raw = keys
+    return _to_little_endian(array("I", map(len, raw))) + b"".join(raw)
+
+
+def decode_key_section(data: bytes, kind: int, n: int) -> list[Any]:
+    """`encode_key_section` で変換したバイト列からキーのリストを取り出します。
+
+    Args:
+        data: キーのセクションのバイト列。
+        kind: キーの型を表すタグ。
+        n: キーの数。
+
+    Returns:
+        キーのリスト。
+
+    Raises:
+        ValueError: 不明なタグの場合。
+    """
+    if kind == KEY_INT:
+        return _from_little_endian("q", data).tolist()
+    if kind not in (KEY_STR, KEY_BYTES):
+        raise ValueError(f"不明なキーのタグです: {kind}")
+    lengths = _from_little_endian("I", data[: 4 * n])
+    ends = list(accumulate(lengths, initial=4 * n))
+    raw = [data[start:end] for start, end in pairwise(ends)]
+    if kind == KEY_STR:
+        return [chunk.decode("utf-8") for chunk in raw]
+    return raw
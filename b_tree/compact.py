@@ -0,0 +1,652 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, MutableSequence
+from heapq import merge
+from operator import itemgetter
+
+
+class CompactNode[T]:
+    """メモリ効率を優先した B木のノードを表すクラス。
+
+    `Node` と異なり、キーと値を `KeyValuePair` のリストではなく
+    2 つの並列リストで保持し、`__slots__` によってインスタンス辞書を持ちません。
+    最小次数 t はツリー側で保持し、葉かどうかは children が None かどうかで判定します。
+
+    Attributes:
+        keys (MutableSequence[T]): ノードに格納されているキーのリスト。ソートされています。
+        values (MutableSequence[int]): keys と同じ順序で並んだ値のリスト。
+        children (Optional[list[CompactNode[T]]]): 子ノードのリスト。葉ノードの場合は None。
+    """
+
+    __slots__ = ("keys", "values", "children")
+
+    def __init__(
+        self,
+        keys: MutableSequence[T] | None = None,
+        values: MutableSequence[int] | None = None,
+        children: "list[CompactNode[T]] | None" = None,
+    ) -> None:
+        # サブクラスでは list の代わりに array などの型付き配列を使う
+        self.keys: MutableSequence[T] = keys if keys is not None else []
+        self.values: MutableSequence[int] = values if values is not None else []
+        self.children = children
+
+    @property
+    def is_leaf(self) -> bool:
+        """このノードが葉ノードであるかどうか。"""
+        return self.children is None
+
+
+class CompactBTree[T]:
+    """`CompactNode` で構成される B木。
+
+    挿入・検索・更新・削除のアルゴリズムは `BTree` / `Node` と同じですが、
+    ノードが t を持たないため、分割・マージ・借用はツリー側のメソッドで行います。
+
+    Attributes:
+        root (CompactNode[T]): B木のルートノード。
+        t (int): B木の最小次数 (minimum degree)。
+    """
+
+    __slots__ = ("root", "t")
+
+    # 新しいノードの生成に使うクラス。サブクラスでキーと値の格納形式を変えるために使う
+    node_class: type[CompactNode] = CompactNode
+
+    def __init__(self, t: int):
+        """B木を初期化します。
+
+        Args:
+            t: B木の最小次数。t >= 2 である必要があります。
+        """
+        if t < 2:
+            raise ValueError("B木の最小次数 t は 2 以上である必要があります。")
+        self.root: CompactNode[T] = self.node_class()
+        self.t = t
+
+    def insert(self, key: T, value: int) -> None:
+        """B木に新しいキーと値のペアを挿入します。
+
+        Args:
+            key: 挿入するキー。
+            value: 挿入する値。
+        """
+        root = self.root
+        if len(root.keys) == 2 * self.t - 1:
+            new_root: CompactNode[T] = self.node_class(children=[root])
+            self.root = new_root
+            self._split_child(new_root, 0)
+            root = new_root
+
+        node = root
+        while node.children is not None:
+            i = bisect_right(node.keys, key)  # type: ignore[call-overload]
+            child = node.children[i]
+            if len(child.keys) == 2 * self.t - 1:
+                self._split_child(node, i)
+                if key > node.keys[i]:
+                    i += 1
+            node = node.children[i]
+
+        i = bisect_right(node.keys, key)  # type: ignore[call-overload]
+        node.keys.insert(i, key)
+        node.values.insert(i, value)
+
+    def _split_child(self, parent: CompactNode[T], i: int) -> None:
+        """parent の i 番目の子ノード (満杯) を分割します。
+
+        Args:
+            parent: 分割対象の子を持つノード。
+            i: parent.children における子ノードのインデックス。
+        """
+        assert parent.children is not None
+        t = self.t
+        y = parent.children[i]
+        z: CompactNode[T] = self.node_class(y.keys[t:], y.values[t:])
+        if y.children is not None:
+            z.children = y.children[t:]
+            y.children = y.children[:t]
+
+        parent.keys.insert(i, y.keys[t - 1])
+        parent.values.insert(i, y.values[t - 1])
+        parent.children.insert(i + 1, z)
+
+        del y.keys[t - 1 :]
+        del y.values[t - 1 :]
+
+    def search(self, key: T) -> tuple[CompactNode[T], int] | None:
+        """キーを検索します。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーが見つかった場合は (ノード, キーのインデックス) のタプル、見つからなかった場合は None。
+            値は `node.values[idx]` で参照できます。
+        """
+        node = self.root
+        while True:
+            i = bisect_left(node.keys, key)  # type: ignore[call-overload]
+            if i < len(node.keys) and node.keys[i] == key:
+                return (node, i)
+            if node.children is None:
+                return None
+            node = node.children[i]
+
+    def get(self, key: T) -> int | None:
+        """キーに対応する値を返します。
+
+        `search` が返すノードはペアではなく keys と values の配列を持つため、
+        値だけが必要な場合はこちらを使います。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーの値。キーが見つからなかった場合は None。
+        """
+        result = self.search(key)
+        if result is None:
+            return None
+        node, idx = result
+        return node.values[idx]
+
+    def update(self, key: T, value: int) -> bool:
+        """既存のキーに関連付けられた値を更新します。
+
+        Args:
+            key: 更新するキー。
+            value: 新しい値。
+
+        Returns:
+            更新が成功した場合はTrue、キーが見つからなかった場合はFalse。
+        """
+        result = self.search(key)
+        if result is None:
+            return False
+
+        node, idx = result
+        node.values[idx] = value
+        return True
+
+    def delete(self, key: T) -> bool:
+        """B木からキーを削除します。
+
+        Args:
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+        """
+        result = self._delete(self.root, key)
+
+        # ルートノードがキーを持たなくなった場合、ツリーの高さを減らす
+        if len(self.root.keys) == 0 and self.root.children is not None:
+            self.root = self.root.children[0]
+
+        return result
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """複数のキーと値のペアを一括で挿入します。
+
+        `BTree.insert_many` と同じく、ペアをキーでソートしてからツリーを降り、
+        同じサブツリーに入るペアは 1 回の降下にまとめます。同じキーのペアは入力の順序で挿入されます。
+
+        Args:
+            pairs: 挿入する (キー, 値) のペアの列。
+        """
+        batch = sorted(pairs, key=itemgetter(0))
+        if not batch:
+            return
+        self._insert_batch(self.root, batch)
+        self._split_overflowing_root()
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        """複数のキーを一括で削除します。
+
+        `BTree.delete_many` と同じく、キーをソートしてからツリーを降り、
+        削除による再平衡は各ノードのサブツリーの処理を終えた後にまとめて行います。
+        入力に同じキーが複数回ある場合、2 回目以降は一括の処理の後で `delete` で 1 つずつ削除します。
+
+        Args:
+            keys: 削除するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの削除が成功したかどうかのリスト。
+        """
+        key_list = list(keys)
+        results = [False] * len(key_list)
+        batch: list[tuple[T, int]] = []
+        repeats: list[tuple[T, int]] = []
+        for key, pos in sorted(
+            ((key, pos) for pos, key in enumerate(key_list)), key=itemgetter(0)
+        ):
+            if batch and batch[-1][0] == key:
+                repeats.append((key, pos))
+            else:
+                batch.append((key, pos))
+        if not batch:
+            return results
+        self._delete_batch(self.root, batch, results)
+
+        while len(self.root.keys) == 0 and self.root.children is not None:
+            self.root = self.root.children[0]
+        self._split_overflowing_root()
+        # 同じキーのコピーは左右どちらの子ノードにもありうるため、一括では探さない
+        for key, pos in repeats:
+            results[pos] = self.delete(key)
+        return results
+
+    def _delete(self, node: CompactNode[T], key: T) -> bool:
+        """node のサブツリーからキーを削除します。
+
+        Args:
+            node: 削除を開始するノード。
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+        """
+        t = self.t
+        while True:
+            idx = bisect_left(node.keys, key)  # type: ignore[call-overload]
+            found = idx < len(node.keys) and node.keys[idx] == key
+
+            if node.children is None:
+                if not found:
+                    return False
+                del node.keys[idx]
+                del node.values[idx]
+                return True
+
+            children = node.children
+            if found:
+                if len(children[idx].keys) >= t:
+                    # 前駆者と交換し、左の子から前駆者を削除
+                    pred = children[idx]
+                    while pred.children is not None:
+                        pred = pred.children[-1]
+                    node.keys[idx] = pred.keys[-1]
+                    node.values[idx] = pred.values[-1]
+                    key = pred.keys[-1]
+                    node = children[idx]
+                elif len(children[idx + 1].keys) >= t:
+                    # 後継者と交換し、右の子から後継者を削除
+                    succ = children[idx + 1]
+                    while succ.children is not None:
+                        succ = succ.children[0]
+                    node.keys[idx] = succ.keys[0]
+                    node.values[idx] = succ.values[0]
+                    key = succ.keys[0]
+                    node = children[idx + 1]
+                else:
+                    self._merge_children(node, idx)
+                    node = children[idx]
+                continue
+
+            # 子ノードが t-1 個のキーしかない場合は、降りる前に補充する
+            if len(children[idx].keys) == t - 1:
+                if idx > 0 and len(children[idx - 1].keys) >= t:
+                    self._borrow_from_prev(node, idx)
+                elif idx < len(children) - 1 and len(children[idx + 1].keys) >= t:
+                    self._borrow_from_next(node, idx)
+                elif idx == len(children) - 1:
+                    self._merge_children(node, idx - 1)
+                    idx -= 1
+                else:
+                    self._merge_children(node, idx)
+            node = children[idx]
+
+    def _merge_children(self, node: CompactNode[T], idx: int) -> None:
+        """node の idx 番目の子と idx+1 番目の子をマージします。
+
+        Args:
+            node: マージ対象の子を持つノード。
+            idx: マージする最初の子のインデックス。
+        """
+        assert node.children is not None
+        child = node.children[idx]
+        sibling = node.children[idx + 1]
+
+        child.keys.append(node.keys.pop(idx))
+        child.values.append(node.values.pop(idx))
+        child.keys.extend(sibling.keys)
+        child.values.extend(sibling.values)
+        if child.children is not None and sibling.children is not None:
+            child.children.extend(sibling.children)
+
+        del node.children[idx + 1]
+
+    def _borrow_from_prev(self, node: CompactNode[T], idx: int) -> None:
+        """前の兄弟からキーを借りて、idx 番目の子ノードに追加します。
+
+        Args:
+            node: 借用対象の子を持つノード。
+            idx: 子ノードのインデックス。
+        """
+        assert node.children is not None
+        child = node.children[idx]
+        sibling = node.children[idx - 1]
+
+        child.keys.insert(0, node.keys[idx - 1])
+        child.values.insert(0, node.values[idx - 1])
+        node.keys[idx - 1] = sibling.keys.pop()
+        node.values[idx - 1] = sibling.values.pop()
+        if child.children is not None and sibling.children is not None:
+            child.children.insert(0, sibling.children.pop())
+
+    def _borrow_from_next(self, node: CompactNode[T], idx: int) -> None:
+        """次の兄弟からキーを借りて、idx 番目の子ノードに追加します。
+
+        Args:
+            node: 借用対象の子を持つノード。
+            idx: 子ノードのインデックス。
+        """
+        assert node.children is not None
+        child = node.children[idx]
+        sibling = node.children[idx + 1]
+
+        child.keys.append(node.keys[idx])
+        child.values.append(node.values[idx])
+        node.keys[idx] = sibling.keys.pop(0)
+        node.values[idx] = sibling.values.pop(0)
+        if child.children is not None and sibling.children is not None:
+            child.children.append(sibling.children.pop(0))
+
+    def _insert_batch(self, node: CompactNode[T], batch: list[tuple[T, int]]) -> None:
+        """キーでソート済みのペアのリストを、node のサブツリーに一括で挿入します。
+
+        `Node._insert_batch` と同じです。挿入後に node が満杯を超えることがあるため、
+        呼び出し側で分割する必要があります。
+
+        Args:
+            node: 挿入を開始するノード。
+            batch: キーでソートされた、挿入する (キー, 値) のペアのリスト。
+        """
+        if node.children is None:
+            # 同じキーは既存のペアの後ろに入るよう、安定なマージを使う
+            merged = list(
+                merge(
+                    zip(node.keys, node.values, strict=True), batch, key=itemgetter(0)
+                )
+            )
+            # スライスで同じ格納形式 (list または array) の空の配列を作る
+            keys, values = node.keys[:0], node.values[:0]
+            keys.extend(key for key, _ in merged)
+            values.extend(value for _, value in merged)
+            node.keys, node.values = keys, values
+            return
+
+        start = 0
+        while start < len(batch):
+            i = bisect_right(node.keys, batch[start][0])  # type: ignore[call-overload]
+            # i 番目の子ノードには、i 番目のキーより小さいペアが入る
+            end = len(batch)
+            if i < len(node.keys):
+                end = bisect_left(batch, node.keys[i], start, key=itemgetter(0))
+            self._insert_batch(node.children[i], batch[start:end])
+            start = end
+
+        self._rebalance_children(node)
+
+    def _delete_batch(
+        self,
+        node: CompactNode[T],
+        batch: list[tuple[T, int]],
+        results: list[bool],
+    ) -> None:
+        """キーでソート済みのキーのリストを、node のサブツリーから一括で削除します。
+
+        `Node._delete_batch` と同じです。削除後に node のキー数が t-1 未満になることがあるため、
+        呼び出し側で修正する必要があります。
+
+        Args:
+            node: 削除を開始するノード。
+            batch: キーでソートされた、(削除するキー, 入力での位置) のリスト。キーは重複しません。
+            results: 入力での位置ごとに、削除が成功したかを書き込むリスト。
+        """
+        keys = node.keys
+        if node.children is None:
+            for key, pos in batch:
+                idx = bisect_left(keys, key)  # type: ignore[call-overload]
+                if idx < len(keys) and keys[idx] == key:
+                    del keys[idx]
+                    del node.values[idx]
+                    results[pos] = True
+            return
+
+        matched: list[int] = []
+        groups: dict[int, list[tuple[T, int]]] = {}
+        for key, pos in batch:
+            idx = bisect_left(keys, key)  # type: ignore[call-overload]
+            if idx < len(keys) and keys[idx] == key:
+                matched.append(idx)
+                results[pos] = True
+                continue
+            groups.setdefault(idx, []).append((key, pos))
+
+        children = node.children
+        for child_index, group in groups.items():
+            self._delete_batch(children[child_index], group, results)
+
+        # インデックスがずれないよう、右側から順にキーを取り除く
+        for idx in reversed(matched):
+            del keys[idx]
+            del node.values[idx]
+            right = children.pop(idx + 1)
+            self._join(children[idx], right)
+
+        self._rebalance_children(node)
+
+    def _join(self, left: CompactNode[T], right: CompactNode[T]) -> None:
+        """同じ高さのノード right の内容を、区切りのキーなしで left の右側に連結します。
+
+        `Node._join` と同じです。連結後の left は呼び出し側で修正する必要があります。
+
+        Args:
+            left: 連結先のノード。
+            right: 連結するノード。すべてのキーが left のキーより大きい必要があります。
+        """
+        if left.children is not None and right.children is not None:
+            # 境界で隣り合う子ノード同士も再帰的に連結する
+            self._join(left.children[-1], right.children[0])
+            left.children.extend(right.children[1:])
+        left.keys.extend(right.keys)
+        left.values.extend(right.values)
+        if left.children is not None:
+            self._rebalance_children(left)
+
+    def _rebalance_children(self, node: CompactNode[T]) -> None:
+        """キー数が B木の制約から外れた node の子ノードを、分割またはマージによって修正します。
+
+        `Node._rebalance_children` と同じです。
+
+        Args:
+            node: 子ノードを修正するノード。
+        """
+        assert node.children is not None
+        t = self.t
+        children = node.children
+        i = 0
+        while i < len(children):
+            child = children[i]
+            if len(child.keys) > 2 * t - 1:
+                pieces, separator_keys, separator_values = self._split_overflowing(
+                    child
+                )
+                children[i : i + 1] = pieces
+                node.keys[i:i] = separator_keys
+                node.values[i:i] = separator_values
+                i += len(pieces)
+            elif len(child.keys) < t - 1 and len(children) > 1:
+                # 右の兄弟 (最後の子の場合は左の兄弟) とマージし、同じ位置を再確認する
+                if i == len(children) - 1:
+                    i -= 1
+                self._merge_children(node, i)
+                if children[i].children is not None:
+                    self._rebalance_children(children[i])
+            else:
+                i += 1
+
+    def _split_overflowing(
+        self, node: CompactNode[T]
+    ) -> tuple[list[CompactNode[T]], MutableSequence[T], MutableSequence[int]]:
+        """2t-1 個より多いキーを持つノードを、制約を満たす複数のノードに分割します。
+
+        Args:
+            node: 分割するノード。
+
+        Returns:
+            分割後のノードのリストと、それらの間に入る区切りのキーと値の配列。
+        """
+        t = self.t
+        m = len(node.keys)
+        k = (m + 2 * t) // (2 * t)
+        base, extra = divmod(m - (k - 1), k)
+
+        keys, values, children = node.keys, node.values, node.children
+        pieces: list[CompactNode[T]] = []
+        separator_keys, separator_values = keys[:0], values[:0]
+        pos = 0
+        for p in range(k):
+            size = base + (1 if p < extra else 0)
+            piece_children = None
+            if children is not None:
+                piece_children = children[pos : pos + size + 1]
+            pieces.append(
+                self.node_class(
+                    keys[pos : pos + size], values[pos : pos + size], piece_children
+                )
+            )
+            if p < k - 1:
+                separator_keys.append(keys[pos + size])
+                separator_values.append(values[pos + size])
+            pos += size + 1
+        return pieces, separator_keys, separator_values
+
+    def _split_overflowing_root(self) -> None:
+        """満杯を超えたルートノードを分割し、必要なだけツリーの高さを増やします。"""
+        while len(self.root.keys) > 2 * self.t - 1:
+            pieces, separator_keys, separator_values = self._split_overflowing(
+                self.root
+            )
+            self.root = self.node_class(separator_keys, separator_values, pieces)
+
+    def __iter__(self) -> Iterator[T]:
+        """キーを昇順に返すイテレータを返します。"""
+        return self.keys()
+
+    def keys(self) -> Iterator[T]:
+        """キーを昇順に遅延評価で返します。
+
+        Yields:
+            B木に格納されているキー。
+        """
+        for key, _ in self.range():
+            yield key
+
+    def items(self) -> Iterator[tuple[T, int]]:
+        """(キー, 値) のペアをキーの昇順に遅延評価で返します。
+
+        Yields:
+            B木に格納されている (キー, 値) のタプル。
+        """
+        return self.range()
+
+    def range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[T, int]]:
+        """キーが lo から hi の範囲にある (キー, 値) のペアを遅延評価で返します。
+
+        `BTree.range` と同じく、明示的なスタックを使って範囲の端から走査します。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+            reverse: True の場合はキーの降順に返します。
+
+        Yields:
+            範囲内の (キー, 値) のタプル。
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        stack: list[tuple[CompactNode[T], int]] = []
+        node = self.root
+
+        if not reverse:
+            while True:
+                if lo is None:
+                    i = 0
+                elif lo_inclusive:
+                    i = bisect_left(node.keys, lo)  # type: ignore[call-overload]
+                else:
+                    i = bisect_right(node.keys, lo)  # type: ignore[call-overload]
+                stack.append((node, i))
+                if node.children is None:
+                    break
+                node = node.children[i]
+
+            while stack:
+                node, i = stack.pop()
+                keys = node.keys
+                if node.children is None:
+                    end = len(keys)
+                elif i < len(keys):
+                    end = i + 1
+                else:
+                    continue
+                for j in range(i, end):
+                    key = keys[j]
+                    if hi is not None and (
+                        key > hi or (not hi_inclusive and key == hi)  # type: ignore[operator]
+                    ):
+                        return
+                    yield (key, node.values[j])
+                if node.children is not None:
+                    # 右隣の子ノードの最も左の葉まで降りる
+                    stack.append((node, i + 1))
+                    node = node.children[i + 1]
+                    while node.children is not None:
+                        stack.append((node, 0))
+                        node = node.children[0]
+                    stack.append((node, 0))
+        else:
+            while True:
+                if hi is None:
+                    i = len(node.keys)
+                elif hi_inclusive:
+                    i = bisect_right(node.keys, hi)  # type: ignore[call-overload]
+                else:
+                    i = bisect_left(node.keys, hi)  # type: ignore[call-overload]
+                stack.append((node, i))
+                if node.children is None:
+                    break
+                node = node.children[i]
+
+            while stack:
+                node, i = stack.pop()
+                keys = node.keys
+                if node.children is None:
+                    end = 0
+                elif i > 0:
+                    end = i - 1
+                else:
+                    continue
+                for j in range(i - 1, end - 1, -1):
+                    key = keys[j]
+                    if lo is not None and (
+                        key < lo or (not lo_inclusive and key == lo)  # type: ignore[operator]
+                    ):
+                        return
+                    yield (key, node.values[j])
+                if node.children is not None:
+                    # 左隣の子ノードの最も右の葉まで降りる
+                    stack.append((node, i - 1))
+                    node = node.children[i - 1]
+                    while node.children is not None:
+                        stack.append((node, len(node.keys)))
+                        node = node.children[-1]
+                    stack.append((node, len(node.keys)))
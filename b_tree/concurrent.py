@@ -0,0 +1,620 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator
+from typing import Any, BinaryIO, cast
+
+from .b_tree import BTree, BTreeSnapshot
+from .node import KeyValuePair, Node, _get_key
+
+
+class RWLatch:
+    """共有 (読み込み) と排他 (書き込み) の 2 つのモードを持つラッチ。
+
+    書き込みを待っているスレッドがある間は新しい共有ラッチを与えないため、
+    読み込みが続いても書き込みが飢餓状態になりません。再入はできません。
+    """
+
+    __slots__ = ("_cond", "_readers", "_writer", "_waiting_writers")
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_shared(self) -> None:
+        """共有ラッチを取得します。"""
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_shared(self) -> None:
+        """共有ラッチを解放します。"""
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_exclusive(self) -> None:
+        """排他ラッチを取得します。"""
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_exclusive(self) -> None:
+        """排他ラッチを解放します。"""
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+def _lower_bound[T](items: list[KeyValuePair[T]], key: T) -> int:
+    """items の中で key 以上の最初のペアの位置を返します。"""
+    probe: Any = key
+    return bisect_left(items, probe, key=_get_key)
+
+
+def _upper_bound[T](items: list[KeyValuePair[T]], key: T) -> int:
+    """items の中で key より大きい最初のペアの位置を返します。"""
+    probe: Any = key
+    return bisect_right(items, probe, key=_get_key)
+
+
+class LatchedNode[T](Node[T]):
+    """ラッチを持つ B木のノード。
+
+    Attributes:
+        latch (RWLatch): このノードの items / children を保護するラッチ。
+    """
+
+    def __init__(self, t: int, is_leaf: bool):
+        super().__init__(t, is_leaf)
+        self.latch = RWLatch()
+
+    def _new_node(self, is_leaf: bool) -> "LatchedNode[T]":
+        """ラッチを持つ新しいノードを作成します。"""
+        return LatchedNode(self.t, is_leaf)
+
+    def _child(self, i: int) -> "LatchedNode[T]":
+        """i 番目の子ノードを返します。子ノードはすべて `LatchedNode` です。"""
+        return cast("LatchedNode[T]", self.children[i])
+
+
+def _to_latched[T](node: Node[T]) -> LatchedNode[T]:
+    """ノードとそのサブツリーを、items と children のリストを共有したまま `LatchedNode` に置き換えます。"""
+    latched: LatchedNode[T] = LatchedNode(node.t, node.is_leaf)
+    latched.items = node.items
+    latched.children = [_to_latched(child) for child in node.children]
+    return latched
+
+
+class ConcurrentBTree[T](BTree[T]):
+    """複数のスレッドから同時に操作できる B木。
+
+    各ノードがラッチを持ち、ルートから葉へ向かってラッチを順に取得するラッチカップリング
+    (latch crabbing) で操作します。
+
+    - 読み込みは子の共有ラッチを取得した時点で親のラッチを解放します。
+    - 挿入は満杯の子を降りる前に分割する (`Node.insert` と同じ先回りの分割) ため、
+      子の排他ラッチを取得して分割した時点で、親が変更されることはもうないので親を解放します。
+    - 削除は t-1 個のキーしか持たない子を降りる前に借用またはマージで補充する
+      (`Node._ensure_child_has_enough_keys_and_delete` と同じ先回りの補充) ため、同様に親を解放します。
+
+    ラッチは常にルートから葉の順、同じ親の子どうしでは左から右の順に取得するため、デッドロックしません。
+    走査 (`keys` / `items` / `range`) は葉を 1 つずつラッチカップリングで読み取り、
+    ペアを返す前にラッチを解放するため、走査中に返された要素を受け取る側が同じ木を変更しても問題ありません。
+
+    Attributes:
+        root (LatchedNode[T]): B木のルートノード。
+        t (int): B木の最小次数。
+    """
+
+    def __init__(self, t: int):
+        super().__init__(t)
+        self.root: Node[T] = LatchedNode(t, True)
+        # self.root の付け替えを保護するラッチ
+        self._root_latch = RWLatch()
+
+    @classmethod
+    def from_sorted(
+        cls, iterable: Iterable[tuple[T, int]], t: int, fill_factor: float = 1.0
+    ) -> "ConcurrentBTree[T]":
+        """キーでソート済みの (キー, 値) の列から B木を構築します。`BTree.from_sorted` と同じです。"""
+        tree: ConcurrentBTree[T] = cls(t)
+        tree.root = _to_latched(BTree.from_sorted(iterable, t, fill_factor).root)
+        return tree
+
+    def snapshot(self) -> "BTreeSnapshot[T]":
+        """並行操作の B木では使用できません。
+
+        ラッチカップリングによる変更はノードをその場で書き換えるため、
+        スナップショットとノードを共有できません。ある時点の内容が必要な場合は `items` を使用してください。
+
+        Raises:
+            TypeError: 常に送出されます。
+        """
+        raise TypeError("ConcurrentBTree ではスナップショットを作成できません。")
+
+    def _share(self) -> None:
+        """並行操作の B木ではノードを共有できないため、`split_at` と `BTree.join` も使用できません。
+
+        Raises:
+            TypeError: 常に送出されます。
+        """
+        raise TypeError("ConcurrentBTree のノードは他の B木と共有できません。")
+
+    def _latch_root(self, exclusive: bool) -> LatchedNode[T]:
+        """ルートノードのラッチを取得して返します。"""
+        self._root_latch.acquire_shared()
+        root = cast("LatchedNode[T]", self.root)
+        if exclusive:
+            root.latch.acquire_exclusive()
+        else:
+            root.latch.acquire_shared()
+        self._root_latch.release_shared()
+        return root
+
+    def get(self, key: T) -> int | None:
+        """キーに対応する値を返します。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーに対応する値。キーが見つからなかった場合は None。
+        """
+        node = self._latch_root(exclusive=False)
+        while True:
+            items = node.items
+            i = _lower_bound(items, key)
+            if i < len(items) and items[i].key == key:
+                value: int = items[i].value
+                node.latch.release_shared()
+                return value
+            if node.is_leaf:
+                node.latch.release_shared()
+                return None
+            child = node._child(i)
+            child.latch.acquire_shared()
+            node.latch.release_shared()
+            node = child
+
+    def search(self, key: T) -> tuple[Node[T], int] | None:
+        """キーを検索します。
+
+        返されるノードとインデックスは、他のスレッドの変更によってすぐに古くなる可能性があります。
+        値が必要な場合は `get` を使用してください。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーが見つかった場合は (ノード, キーのインデックス) のタプル、見つからなかった場合は None。
+        """
+        node = self._latch_root(exclusive=False)
+        while True:
+            i = node._find_key(key)
+            if i < len(node.items) and node.items[i].key == key:
+                node.latch.release_shared()
+                return (node, i)
+            if node.is_leaf:
+                node.latch.release_shared()
+                return None
+            child = node._child(i)
+            child.latch.acquire_shared()
+            node.latch.release_shared()
+            node = child
+
+    def update(self, key: T, value: int) -> bool:
+        """既存のキーに関連付けられた値を更新します。
+
+        構造は変わらないため、子の排他ラッチを取得した時点で親を解放します。
+
+        Args:
+            key: 更新するキー。
+            value: 新しい値。
+
+        Returns:
+            更新が成功した場合はTrue、キーが見つからなかった場合はFalse。
+        """
+        node = self._latch_root(exclusive=True)
+        while True:
+            i = node._find_key(key)
+            if i < len(node.items) and node.items[i].key == key:
+                node.items[i].value = value
+                node.latch.release_exclusive()
+                return True
+            if node.is_leaf:
+                node.latch.release_exclusive()
+                return False
+            child = node._child(i)
+            child.latch.acquire_exclusive()
+            node.latch.release_exclusive()
+            node = child
+
+    def insert(self, key: T, value: int) -> None:
+        """B木に新しいキーと値のペアを挿入します。
+
+        Args:
+            key: 挿入するキー。
+            value: 挿入する値。
+        """
+        kv_pair = KeyValuePair(key, value)
+        max_keys = 2 * self.t - 1
+
+        self._root_latch.acquire_exclusive()
+        node = cast("LatchedNode[T]", self.root)
+        node.latch.acquire_exclusive()
+        if len(node.items) == max_keys:
+            # ルートが満杯の場合は、新しいルートを公開する前にそのラッチを取得しておく
+            new_root = node._new_node(False)
+            new_root.latch.acquire_exclusive()
+            new_root.children.append(node)
+            new_root.split_child(0, node)
+            self._replace_root(new_root, 1)
+            node.latch.release_exclusive()
+            node = new_root
+        self._root_latch.release_exclusive()
+
+        # node は排他ラッチを保持しており、満杯ではない
+        while not node.is_leaf:
+            i = _upper_bound(node.items, key)
+            child = node._child(i)
+            child.latch.acquire_exclusive()
+            if len(child.items) == max_keys:
+                node.split_child(i, child)
+                if kv_pair.key > node.items[i].key:
+                    # 分割で作られた右側のノードはまだ他のスレッドから見えていない
+                    sibling = node._child(i + 1)
+                    sibling.latch.acquire_exclusive()
+                    child.latch.release_exclusive()
+                    child = sibling
+            # 子は満杯ではないので、この先で node が変更されることはない
+            node.latch.release_exclusive()
+            node = child
+
+        i = _upper_bound(node.items, key)
+        node.items.insert(i, kv_pair)
+        node.latch.release_exclusive()
+
+    def delete(self, key: T) -> bool:
+        """B木からキーを削除します。
+
+        Args:
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+        """
+        self._root_latch.acquire_exclusive()
+        node = cast("LatchedNode[T]", self.root)
+        node.latch.acquire_exclusive()
+        root_latched = True
+
+        # 非葉ノードにあるキーを削除する場合、そのノードと位置を保持したまま
+        # 前駆者 (左の子ツリーの最大) または後継者 (右の子ツリーの最小) を取り出しに降りる
+        holder: LatchedNode[T] | None = None
+        holder_idx = 0
+        take_max = False
+        mode_key = True
+        result = False
+
+        while True:
+            if mode_key:
+                idx = node._find_key(key)
+                found = idx < len(node.items) and node.items[idx].key == key
+            else:
+                idx = len(node.items) if take_max else 0
+                found = False
+
+            if node.is_leaf:
+                if mode_key:
+                    if found:
+                        del node.items[idx]
+                        result = True
+                else:
+                    # 前駆者または後継者を取り出して、保持しているノードのキーと置き換える
+                    assert holder is not None
+                    holder.items[holder_idx] = node.items.pop(-1 if take_max else 0)
+                    holder.latch.release_exclusive()
+                    result = True
+                node.latch.release_exclusive()
+                break
+
+            if found:
+                left = node._child(idx)
+                right = node._child(idx + 1)
+                left.latch.acquire_exclusive()
+                right.latch.acquire_exclusive()
+                if len(left.items) >= self.t:
+                    right.latch.release_exclusive()
+                    holder, holder_idx, take_max, mode_key = node, idx, True, False
+                    child = left
+                elif len(right.items) >= self.t:
+                    left.latch.release_exclusive()
+                    holder, holder_idx, take_max, mode_key = node, idx, False, False
+                    child = right
+                else:
+                    # 両方の子が t-1 個のキーしか持たないのでマージし、マージした子で削除を続ける
+                    node._merge_children(idx)
+                    right.latch.release_exclusive()
+                    child = left
+            else:
+                child = self._fill_child(node, idx)
+
+            if root_latched:
+                # ルートがキーをすべて失った場合は、ツリーの高さを減らす
+                if len(node.items) == 0:
+                    self._replace_root(child, -1)
+                self._root_latch.release_exclusive()
+                root_latched = False
+            if node is not holder:
+                node.latch.release_exclusive()
+            node = child
+
+        if root_latched:
+            self._root_latch.release_exclusive()
+        return result
+
+    def _fill_child(self, node: LatchedNode[T], idx: int) -> LatchedNode[T]:
+        """idx 番目の子が t 個以上のキーを持つようにして、その子の排他ラッチを取得して返します。
+
+        `Node._ensure_child_has_enough_keys_and_delete` と同じ手順で、
+        隣接する兄弟から借りるか、兄弟とマージします。兄弟のラッチは左から右の順に取得します。
+
+        Args:
+            node: 排他ラッチを保持している非葉ノード。
+            idx: 子ノードのインデックス。
+
+        Returns:
+            削除を続ける子ノード。
+        """
+        t = self.t
+        children = node.children
+        prev = node._child(idx - 1) if idx > 0 else None
+        child = node._child(idx)
+        nxt = node._child(idx + 1) if idx < len(children) - 1 else None
+        if prev is not None:
+            prev.latch.acquire_exclusive()
+        child.latch.acquire_exclusive()
+        if len(child.items) >= t:
+            if prev is not None:
+                prev.latch.release_exclusive()
+            return child
+        if nxt is not None:
+            nxt.latch.acquire_exclusive()
+
+        if prev is not None and len(prev.items) >= t:
+            node._borrow_from_prev(idx)
+        elif nxt is not None and len(nxt.items) >= t:
+            node._borrow_from_next(idx)
+        elif nxt is None:
+            # 最後の子の場合は前の子とマージ
+            assert prev is not None
+            node._merge_children(idx - 1)
+            child.latch.release_exclusive()
+            return prev
+        else:
+            node._merge_children(idx)
+            nxt.latch.release_exclusive()
+            nxt = None
+
+        if prev is not None:
+            prev.latch.release_exclusive()
+        if nxt is not None:
+            nxt.latch.release_exclusive()
+        return child
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """複数のキーと値のペアを、キーの昇順に 1 つずつ挿入します。
+
+        Args:
+            pairs: 挿入する (キー, 値) のペアの列。
+        """
+        for key, value in sorted(pairs, key=lambda pair: pair[0]):  # type: ignore[arg-type, return-value]
+            self.insert(key, value)
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        """複数のキーに対応する値を 1 つずつ検索します。
+
+        Args:
+            keys: 検索するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの値のリスト。キーが見つからなかった場合は None。
+        """
+        return [self.get(key) for key in keys]
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        """複数のキーを 1 つずつ削除します。
+
+        Args:
+            keys: 削除するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの削除が成功したかどうかのリスト。
+        """
+        return [self.delete(key) for key in keys]
+
+    def delete_range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+    ) -> int:
+        """範囲内のキーを 1 つずつ削除します。
+
+        サブツリーを切り離すと複数のノードのラッチを同時に保持する必要があるため、
+        範囲内のキーを集めてから `delete` で削除します。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+
+        Returns:
+            削除したペアの数。
+        """
+        keys = [key for key, _ in self.range(lo, hi, inclusive)]
+        return sum(self.delete(key) for key in keys)
+
+    def _iter_range(
+        self,
+        lo: T | None,
+        hi: T | None,
+        inclusive: tuple[bool, bool],
+        reverse: bool,
+    ) -> Iterator[KeyValuePair[T]]:
+        """範囲内のキーと値のペアを、葉を 1 つずつラッチカップリングで読み取りながら順に返します。
+
+        各ステップでは、前回返したペアのキーの位置へルートから共有ラッチのカップリングで降り、
+        1 つの葉の範囲内のペアと、走査の順でその葉の次に来る祖先の区切りのペアを読み取ります。
+        同時に保持する共有ラッチは親子の 2 つだけで、ペアを返す前にすべて解放します。
+        そのため、走査の途中で受け取る側が同じ木を変更できます。その場合、
+        走査済みの位置より先の変更だけが結果に反映されます。
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        if reverse:
+            start, start_inclusive, stop, stop_inclusive = (
+                hi,
+                hi_inclusive,
+                lo,
+                lo_inclusive,
+            )
+        else:
+            start, start_inclusive, stop, stop_inclusive = (
+                lo,
+                lo_inclusive,
+                hi,
+                hi_inclusive,
+            )
+        while True:
+            batch, exhausted = self._read_leaf(start, start_inclusive, reverse)
+            if not exhausted:
+                # 区切りと同じキーのペアは他の葉にもあり得るため、そのキーのペアはまとめて読み取り、
+                # 次のステップはそのキーより後ろから始める
+                boundary = batch[-1].key
+                batch = [kv_pair for kv_pair in batch if kv_pair.key != boundary]
+                batch.extend(self._read_key(boundary, reverse))
+                start, start_inclusive = boundary, False
+            for kv_pair in batch:
+                key: Any = kv_pair.key
+                if stop is not None and (
+                    (key < stop if reverse else key > stop)
+                    or (key == stop and not stop_inclusive)
+                ):
+                    return
+                yield kv_pair
+            if exhausted:
+                return
+
+    def _read_leaf(
+        self, start: T | None, inclusive: bool, reverse: bool
+    ) -> tuple[list[KeyValuePair[T]], bool]:
+        """走査の順で start 以降にあるペアを、1 つの葉と祖先の区切りのペアの分だけ読み取ります。
+
+        Args:
+            start: 走査を再開するキー。None の場合は先頭 (reverse の場合は末尾) から。
+            inclusive: start と同じキーのペアを含むかどうか。
+            reverse: True の場合はキーの降順に読み取ります。
+
+        Returns:
+            (走査の順に並んだペアのリスト, 読み取った葉が走査の最後の葉かどうか) のタプル。
+        """
+        node = self._latch_root(exclusive=False)
+        separator: KeyValuePair[T] | None = None
+        while True:
+            items = node.items
+            if start is None:
+                i = len(items) if reverse else 0
+            elif inclusive != reverse:
+                i = _lower_bound(items, start)
+            else:
+                i = _upper_bound(items, start)
+            if node.is_leaf:
+                batch = items[i - 1 :: -1] if reverse and i else items[i:]
+                if reverse and not i:
+                    batch = []
+                break
+            # 降りる子のサブツリーの次に来るペアは、最も深い祖先の区切りのペア
+            if reverse and i > 0:
+                separator = items[i - 1]
+            elif not reverse and i < len(items):
+                separator = items[i]
+            child = node._child(i)
+            child.latch.acquire_shared()
+            node.latch.release_shared()
+            node = child
+        node.latch.release_shared()
+        if separator is None:
+            return batch, True
+        batch.append(separator)
+        return batch, False
+
+    def _read_key(self, key: T, reverse: bool) -> list[KeyValuePair[T]]:
+        """キーが key のペアをすべて読み取ります。
+
+        同じキーのペアは複数のノードにまたがることがあるため、`_collect` で祖先の共有ラッチを
+        保持したまま読み取ります。保持するのはそのキーのペアがあるノードのパスだけです。
+        """
+        out: list[KeyValuePair[T]] = []
+        root = self._latch_root(exclusive=False)
+        try:
+            self._collect(root, key, key, (True, True), out)
+        finally:
+            root.latch.release_shared()
+        if reverse:
+            out.reverse()
+        return out
+
+    def _collect(
+        self,
+        node: LatchedNode[T],
+        lo: T | None,
+        hi: T | None,
+        inclusive: tuple[bool, bool],
+        out: list[KeyValuePair[T]],
+    ) -> None:
+        """共有ラッチを保持しているノードのサブツリーから、範囲内のペアを昇順に out へ追加します。"""
+        items = node.items
+        lo_inclusive, hi_inclusive = inclusive
+        if lo is None:
+            start = 0
+        elif lo_inclusive:
+            start = _lower_bound(items, lo)
+        else:
+            start = _upper_bound(items, lo)
+        if hi is None:
+            end = len(items)
+        elif hi_inclusive:
+            end = _upper_bound(items, hi)
+        else:
+            end = _lower_bound(items, hi)
+
+        if node.is_leaf:
+            out.extend(items[start:end])
+            return
+        for i in range(start, end + 1):
+            child = node._child(i)
+            child.latch.acquire_shared()
+            try:
+                self._collect(child, lo, hi, inclusive, out)
+            finally:
+                child.latch.release_shared()
+            if i < end:
+                out.append(items[i])
+
+    def dump(self, file: BinaryIO) -> None:
+        """ある時点の内容をコンパクトなバイナリ形式でファイルに書き出します。
+
+        共有ラッチの下で読み取った内容から一時的な `BTree` を構築し、その `dump` を呼び出します。
+
+        Args:
+            file: バイナリモードで開いた書き込み先のファイル。
+        """
+        pairs = list(self._iter_range(None, None, (True, True), False))
+        BTree._from_sorted_pairs(pairs, self.t).dump(file)
@@ -0,0 +1,445 @@
+import struct
+from array import array
+from operator import itemgetter
+from types import TracebackType
+from typing import Any, cast
+
+from .b_tree import BTree
+from .node import KeyValuePair, Node
+from .pager import NO_PAGE, BufferPool, Pager
+
+# ノードのページの形式: 葉ノードかどうか, キーの数
+# 続いてキー (int64) と値 (int64) がキーの数だけ、非葉ノードの場合は子ノードのページ番号 (uint64) が並ぶ
+_PAGE_HEADER = struct.Struct("<B3xI")
+
+
+def degree_for_page_size(page_size: int) -> int:
+    """1 ページに収まる最大の最小次数 t を返します。
+
+    最大 2t-1 個のキーと値 (各 8 バイト) と 2t 個の子ノードのページ番号 (8 バイト) が
+    ページヘッダーとともに 1 ページに収まる必要があります。
+
+    Args:
+        page_size: 1 ページのバイト数。
+
+    Returns:
+        最小次数 t。
+    """
+    return (page_size - _PAGE_HEADER.size + 16) // 48
+
+
+def _check_int64(*numbers: int) -> None:
+    """キーや値がページに書き込める 64 ビット整数であることを確認します。
+
+    Raises:
+        TypeError: int でない場合、または 64 ビットに収まらない場合。
+    """
+    for number in numbers:
+        if not isinstance(number, int) or not -(1 << 63) <= number < 1 << 63:
+            raise TypeError(
+                "DiskBTree のキーと値は 64 ビットに収まる int である必要があります。"
+            )
+
+
+class DiskNode(Node[int]):
+    """ページファイルに格納される B木のノード。
+
+    `Node` の分割・マージ・借用のロジックはそのまま使い、
+    items / children / is_leaf にアクセスしたときにバッファプールを通してページから読み込みます。
+    バッファプールから追い出されたノードは中身を持たないスタブになります。
+    キーと値は 64 ビット整数である必要があります。
+
+    Attributes:
+        pool (BufferPool): このノードを管理するバッファプール。
+        page_id (int): このノードを格納するページの番号。
+        loaded (bool): ノードの中身がメモリ上に読み込まれているかどうか。
+    """
+
+    def __init__(self, t: int, is_leaf: bool, pool: BufferPool):
+        # ページが割り当てられるまではプールを通さずに中身を初期化する
+        self.pool = pool
+        self.page_id = NO_PAGE
+        self.loaded = True
+        self._items: list[KeyValuePair] | None = []
+        self._children: list[Node[int]] | None = []
+        self._is_leaf = is_leaf
+        self.t = t
+
+    @classmethod
+    def stub(cls, t: int, pool: BufferPool, page_id: int) -> "DiskNode":
+        """まだページから読み込まれていないノードを作成します。
+
+        Args:
+            t: B木の最小次数。
+            pool: ノードを管理するバッファプール。
+            page_id: ノードを格納するページの番号。
+
+        Returns:
+            作成したノード。
+        """
+        node = cls.__new__(cls)
+        node.t = t
+        node.pool = pool
+        node.page_id = page_id
+        node.loaded = False
+        node._items = None
+        node._children = None
+        node._is_leaf = False
+        return node
+
+    @property
+    def items(self) -> list[KeyValuePair]:
+        self.pool.access(self)
+        return self._items  # type: ignore[return-value]
+
+    @items.setter
+    def items(self, value: list[KeyValuePair]) -> None:
+        self.pool.access(self)
+        self._items = value
+
+    @property
+    def children(self) -> list[Node[int]]:
+        self.pool.access(self)
+        return self._children  # type: ignore[return-value]
+
+    @children.setter
+    def children(self, value: list[Node[int]]) -> None:
+        self.pool.access(self)
+        self._children = value
+
+    @property
+    def is_leaf(self) -> bool:
+        if not self.loaded:
+            self.pool.access(self)
+        return self._is_leaf
+
+    @is_leaf.setter
+    def is_leaf(self, value: bool) -> None:
+        self._is_leaf = value
+
+    def load(self, data: bytes) -> None:
+        """ページの内容からノードの中身を読み込みます。
+
+        Args:
+            data: ページの内容。
+        """
+        is_leaf, n = _PAGE_HEADER.unpack_from(data)
+        offset = _PAGE_HEADER.size
+        keys: array[int] = array("q")
+        keys.frombytes(data[offset : offset + 8 * n])
+        offset += 8 * n
+        values: array[int] = array("q")
+        values.frombytes(data[offset : offset + 8 * n])
+        offset += 8 * n
+
+        self._is_leaf = bool(is_leaf)
+        self._items = [KeyValuePair(k, v) for k, v in zip(keys, values, strict=True)]
+        self._children = []
+        if not is_leaf:
+            child_ids: array[int] = array("Q")
+            child_ids.frombytes(data[offset : offset + 8 * (n + 1)])
+            self._children = [self.pool.get(page_id) for page_id in child_ids]
+        self.loaded = True
+
+    def dump(self) -> bytes:
+        """ノードの中身をページの内容に変換します。
+
+        Returns:
+            ページの内容。
+        """
+        assert self._items is not None and self._children is not None
+        items = self._items
+        parts = [
+            _PAGE_HEADER.pack(self._is_leaf, len(items)),
+            array("q", [kv.key for kv in items]).tobytes(),
+            array("q", [kv.value for kv in items]).tobytes(),
+        ]
+        if not self._is_leaf:
+            parts.append(
+                array(
+                    "Q", [cast(DiskNode, child).page_id for child in self._children]
+                ).tobytes()
+            )
+        return b"".join(parts)
+
+    def unload(self) -> None:
+        """ノードの中身を破棄してスタブに戻します。"""
+        self._items = None
+        self._children = None
+        self.loaded = False
+
+    def _new_node(self, is_leaf: bool) -> "DiskNode":
+        """新しいページを割り当てたノードを作成します。"""
+        node = DiskNode(self.t, is_leaf, self.pool)
+        self.pool.add(node)
+        return node
+
+    def _merge_children(self, idx: int) -> None:
+        """idx 番目の子と idx+1 番目の子をマージし、不要になった兄弟のページを解放します。"""
+        sibling = self.children[idx + 1]
+        super()._merge_children(idx)
+        self.pool.discard(sibling)
+
+    def _join(self, right: Node[int]) -> None:
+        """right をこのノードに連結し、不要になった right のページを解放します。"""
+        super()._join(right)
+        self.pool.discard(right)
+
+    def _discard_subtree(self, node: Node[int]) -> int:
+        """切り離したサブツリーのキーを数え、そのノードのページをすべて解放します。"""
+        count = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            count += len(node.items)
+            stack.extend(node.children)
+            self.pool.discard(node)
+        return count
+
+
+class DiskBTree(BTree[int]):
+    """ページファイルに格納される B木。
+
+    各ノードは固定サイズの 1 ページに格納され、最小次数 t はページサイズから決まります。
+    ノードはアクセスされたときにバッファプールを通して読み込まれ、
+    メモリ上のノード数が上限を超えると最も長く使われていないノードから追い出されます。
+    変更は追い出すときか `flush` / `close` を呼び出したときにファイルへ書き込まれます。
+
+    Attributes:
+        pager (Pager): ページファイル。
+        pool (BufferPool): ノードのバッファプール。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        page_size: int = 4096,
+        cache_pages: int = 1024,
+        use_mmap: bool = True,
+    ):
+        """ページファイルを開きます。ファイルが存在しない場合は新しく作成します。
+
+        Args:
+            path: ページファイルのパス。
+            page_size: 新しく作成する場合の 1 ページのバイト数。
+            cache_pages: メモリ上に保持するノード (ページ) の最大数。
+            use_mmap: ページの読み込みに mmap を使うかどうか。
+
+        Raises:
+            ValueError: ページサイズが小さすぎて t >= 2 のノードが収まらない場合。
+        """
+        t = degree_for_page_size(page_size)
+        if t < 2:
+            raise ValueError("ページサイズが小さすぎます。")
+        self.pager = Pager(path, page_size, t, use_mmap)
+        self.t = self.pager.t
+        self.pool = BufferPool(self.pager, cache_pages, self._stub)
+
+        if self.pager.root_page == NO_PAGE:
+            root = DiskNode(self.t, True, self.pool)
+            self.pool.add(root)
+            self.pager.root_page = root.page_id
+        else:
+            root = self.pool.get(self.pager.root_page)
+        self.root: Node[int] = root
+
+    def _stub(self, page_id: int) -> DiskNode:
+        """まだ読み込まれていないノードを作成します。"""
+        return DiskNode.stub(self.t, self.pool, page_id)
+
+    @classmethod
+    def from_sorted(cls, iterable: Any, t: int, fill_factor: float = 1.0) -> Any:
+        """ページファイルの B木では使用できません。`insert_many` を使用してください。
+
+        Raises:
+            TypeError: 常に送出されます。
+        """
+        raise TypeError(
+            "DiskBTree はページファイルのパスが必要なため、from_sorted を使用できません。"
+            "insert_many を使用してください。"
+        )
+
+    @classmethod
+    def load(cls, file: Any, t: int | None = None) -> Any:
+        """ページファイルの B木では使用できません。
+
+        `BTree.load` で読み込んだ B木の `items` を `insert_many` に渡してください。
+
+        Raises:
+            TypeError: 常に送出されます。
+        """
+        raise TypeError(
+            "DiskBTree はページファイルのパスが必要なため、load を使用できません。"
+            "BTree.load で読み込んだ内容を insert_many に渡してください。"
+        )
+
+    def snapshot(self) -> Any:
+        """ページファイルの B木では使用できません。
+
+        ノードのページはその場で書き換えられ、マージで解放されたページは再利用されるため、
+        古いノードをスナップショットと共有できません。
+
+        Raises:
+            TypeError: 常に送出されます。
+        """
+        raise TypeError("DiskBTree ではスナップショットを作成できません。")
+
+    def _share(self) -> None:
+        """ページファイルの B木ではノードを共有できないため、`split_at` と `BTree.join` も使用できません。
+
+        Raises:
+            TypeError: 常に送出されます。
+        """
+        raise TypeError("DiskBTree のノードは他の B木と共有できません。")
+
+    def insert(self, key: int, value: int) -> None:
+        """キーと値のペアを挿入します。`BTree.insert` と同じです。
+
+        Raises:
+            TypeError: キーか値が 64 ビットに収まる int でない場合。
+        """
+        _check_int64(key, value)
+        with self.pool.pin(writing=True):
+            super().insert(key, value)
+            self._after_write(self.root)
+
+    def update(self, key: int, value: int) -> bool:
+        """既存のキーの値を更新します。`BTree.update` と同じです。
+
+        Raises:
+            TypeError: キーか値が 64 ビットに収まる int でない場合。
+        """
+        _check_int64(key, value)
+        with self.pool.pin(writing=True):
+            updated: bool = super().update(key, value)
+        return updated
+
+    def delete(self, key: int) -> bool:
+        with self.pool.pin(writing=True):
+            old_root = self.root
+            deleted: bool = super().delete(key)
+            self._after_write(old_root)
+        return deleted
+
+    def insert_many(self, pairs: Any) -> None:
+        """複数のキーと値のペアを一括で挿入します。
+
+        一括操作の途中ではアクセスしたノードを追い出せないため、ペアをキーでソートしてから
+        `_batch_size` 件ずつに分けて処理し、分けた処理の間でノードを追い出します。
+        そのため処理の途中でメモリ上にあるノードは、cache_pages 個と
+        max(cache_pages, 3 × 高さ) 個の合計以下に収まります。
+
+        Args:
+            pairs: 挿入する (キー, 値) のペアの列。
+
+        Raises:
+            TypeError: 64 ビットに収まる int でないキーか値が含まれている場合。何も挿入しません。
+        """
+        batch = sorted(pairs, key=itemgetter(0))
+        for key, value in batch:
+            _check_int64(key, value)
+        start = 0
+        while start < len(batch):
+            end = start + self._batch_size()
+            with self.pool.pin(writing=True):
+                super().insert_many(batch[start:end])
+                self._after_write(self.root)
+            start = end
+
+    def delete_many(self, keys: Any) -> list[bool]:
+        """複数のキーを一括で削除します。
+
+        `insert_many` と同じく、キーをソートしてから `_batch_size` 件ずつに分けて処理します。
+
+        Args:
+            keys: 削除するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの削除が成功したかどうかのリスト。
+        """
+        key_list = list(keys)
+        results = [False] * len(key_list)
+        order = sorted(range(len(key_list)), key=key_list.__getitem__)
+        start = 0
+        while start < len(order):
+            chunk = order[start : start + self._batch_size()]
+            with self.pool.pin(writing=True):
+                old_root = self.root
+                chunk_results = super().delete_many(key_list[pos] for pos in chunk)
+                self._after_write(old_root)
+            for pos, ok in zip(chunk, chunk_results, strict=True):
+                results[pos] = ok
+            start += len(chunk)
+        return results
+
+    def _batch_size(self) -> int:
+        """一括操作を 1 回の処理にまとめるキーの数を返します。
+
+        各キーは各レベルで、たどるノードと分割で作られるノードまたは併合・再分配の相手となる
+        左右の兄弟の、高々 3 個のノードにアクセスします。1 回の処理で新しくメモリに載るノードが
+        cache_pages 個以下になるよう、キーの数を cache_pages // (3 × 高さ) 以下にします。
+        """
+        capacity: int = self.pool.capacity
+        height: int = self._height()
+        return max(1, capacity // (3 * height))
+
+    def delete_range(
+        self,
+        lo: int | None = None,
+        hi: int | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+    ) -> int:
+        with self.pool.pin(writing=True):
+            old_root = self.root
+            removed: int = super().delete_range(lo, hi, inclusive)
+            self._after_write(old_root)
+        return removed
+
+    def search(self, key: int) -> tuple[Node[int], int] | None:
+        with self.pool.pin(writing=False):
+            found: tuple[Node[int], int] | None = super().search(key)
+        return found
+
+    def get_many(self, keys: Any) -> list[int | None]:
+        with self.pool.pin(writing=False):
+            values: list[int | None] = super().get_many(keys)
+        return values
+
+    def _after_write(self, old_root: Node[int]) -> None:
+        """変更操作の後に、高さが減って不要になったルートのページを解放し、ルートの位置を記録します。
+
+        Args:
+            old_root: 変更操作の前のルートノード。
+        """
+        node = old_root
+        while node is not self.root and len(node.items) == 0 and not node.is_leaf:
+            child = node.children[0]
+            self.pool.discard(node)
+            node = child
+        self.pager.root_page = cast(DiskNode, self.root).page_id
+
+    def flush(self) -> None:
+        """変更されたノードとヘッダーをファイルに書き込み、ディスクに同期します。"""
+        with self.pool.pin(writing=True):
+            old_root = self.root
+            self._settle()
+            self._after_write(old_root)
+        self.pool.flush()
+        self.pager.root_page = cast(DiskNode, self.root).page_id
+        self.pager.sync()
+
+    def close(self) -> None:
+        """変更を書き込んでファイルを閉じます。"""
+        self.flush()
+        self.pager.close()
+
+    def __enter__(self) -> "DiskBTree":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,261 @@
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+from operator import le
+from types import TracebackType
+from typing import Any, BinaryIO
+
+try:
+    import numpy as np
+
+    _HAS_NUMPY = True
+except ImportError:  # numpy はオプションの依存関係
+    _HAS_NUMPY = False
+
+# 保存ファイルの形式: マジック, エントリ数。続いて int64 のキーの配列と int64 の値の配列が並ぶ
+_FROZEN_HEADER = struct.Struct("<8sQ")
+_FROZEN_MAGIC = b"BTFROZ01"
+
+
+class FrozenBTree[T]:
+    """`BTree.freeze` が返す、変更できない平坦な配列で表した B木。
+
+    すべてのペアをキーの昇順に並べた 1 つのキーの配列と 1 つの値の配列で保持し、
+    ノードも子へのポインタも持ちません。検索は配列全体に対する 1 回の二分探索で、
+    ノードをたどる再帰も、ノードごとの二分探索もありません。
+    キーがすべて int の場合はキーを `array('q')` に詰めて格納し、
+    `save` で書き出したファイルを `open` で mmap すると、コピーなしで配列として参照します。
+    `get_many` は numpy が利用可能でキーが int の場合、`searchsorted` でまとめて探索します。
+
+    同じキーのペアが複数ある場合、`get` はそのうち最初のペアの値を返します。
+    """
+
+    def __init__(self, keys: Sequence[T], values: Sequence[int]):
+        """キーの昇順に並んだキーと値の配列から作成します。通常は `from_sorted` を使います。
+
+        Args:
+            keys: キーの昇順に並んだキーの配列。
+            values: keys と同じ順序で並んだ値の配列。
+        """
+        # list、array('q')、mmap した領域の memoryview のいずれか
+        self._keys: Any = keys
+        self._values: Any = values
+        self._mmap: mmap.mmap | None = None
+
+    @classmethod
+    def from_sorted(cls, iterable: Iterable[tuple[T, int]]) -> "FrozenBTree[T]":
+        """キーでソート済みの (キー, 値) の列から作成します。
+
+        Args:
+            iterable: キーの昇順に並んだ (キー, 値) のペアの列。
+
+        Returns:
+            作成された FrozenBTree。
+
+        Raises:
+            ValueError: 入力がソートされていない場合。
+        """
+        keys: list[Any] = []
+        values: array[int] = array("q")
+        for key, value in iterable:
+            keys.append(key)
+            values.append(value)
+        if not all(map(le, keys, islice(keys, 1, None))):
+            raise ValueError("from_sorted の入力はキーの昇順である必要があります。")
+        if all(type(key) is int for key in keys):
+            try:
+                return cls(array("q", keys), values)
+            except OverflowError:  # 64 ビットに収まらないキーはリストのまま持つ
+                pass
+        return cls(keys, values)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, key: T) -> int | None:
+        """キーに対応する値を返します。
+
+        Args:
+            key: 検索するキー。
+
+        Returns:
+            キーの値。キーが見つからなかった場合は None。
+        """
+        keys = self._keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            value: int = self._values[i]
+            return value
+        return None
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        """複数のキーに対応する値を一括で検索します。
+
+        Args:
+            keys: 検索するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの値のリスト。キーが見つからなかった場合は None。
+        """
+        key_list = list(keys)
+        if (
+            _HAS_NUMPY
+            and isinstance(self._keys, (array, memoryview))
+            # float などは int64 に変換すると別のキーと一致してしまうため、1 つずつ探す
+            and all(type(key) is int for key in key_list)
+        ):
+            try:
+                probes = np.asarray(key_list, dtype=np.int64)
+            except OverflowError:  # 64 ビットに収まらないキーは 1 つずつ探す
+                pass
+            else:
+                return self._get_many_vectorized(probes)
+        return [self.get(key) for key in key_list]
+
+    def _get_many_vectorized(self, probes: Any) -> list[int | None]:
+        """numpy の searchsorted を使って get_many を行います。
+
+        Args:
+            probes: 検索するキーの int64 の配列。
+
+        Returns:
+            入力の順序で並んだ、各キーの値のリスト。
+        """
+        n = len(self._keys)
+        if n == 0:
+            return [None] * len(probes)
+        node_keys = np.frombuffer(self._keys, dtype=np.int64)
+        node_values = np.frombuffer(self._values, dtype=np.int64)
+        idx = np.minimum(np.searchsorted(node_keys, probes, side="left"), n - 1)
+        found = node_keys[idx] == probes
+        results: list[int | None] = [None] * len(probes)
+        for pos, value in zip(
+            np.flatnonzero(found).tolist(),
+            node_values[idx[found]].tolist(),
+            strict=True,
+        ):
+            results[pos] = value
+        return results
+
+    def __iter__(self) -> Iterator[T]:
+        """キーを昇順に返すイテレータを返します。"""
+        return iter(self._keys)
+
+    def keys(self) -> Iterator[T]:
+        """キーを昇順に遅延評価で返します。"""
+        return iter(self._keys)
+
+    def items(self) -> Iterator[tuple[T, int]]:
+        """(キー, 値) のペアをキーの昇順に遅延評価で返します。"""
+        return zip(self._keys, self._values, strict=True)
+
+    def range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[T, int]]:
+        """キーが lo から hi の範囲にある (キー, 値) のペアを遅延評価で返します。
+
+        範囲の両端を二分探索で求め、その間の配列の要素を順に返します。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+            reverse: True の場合はキーの降順に返します。
+
+        Yields:
+            範囲内の (キー, 値) のタプル。
+        """
+        keys, values = self._keys, self._values
+        lo_inclusive, hi_inclusive = inclusive
+        start, end = 0, len(keys)
+        if lo is not None:
+            find = bisect_left if lo_inclusive else bisect_right
+            start = find(keys, lo)
+        if hi is not None:
+            find = bisect_right if hi_inclusive else bisect_left
+            end = max(start, find(keys, hi))
+        positions = range(end - 1, start - 1, -1) if reverse else range(start, end)
+        for i in positions:
+            yield (keys[i], values[i])
+
+    def save(self, file: BinaryIO) -> None:
+        """`open` で mmap できる形式でファイルに書き出します。
+
+        ヘッダー (マジック, エントリ数) に続いて、int64 のキーの配列と int64 の値の配列を書き出します。
+
+        Args:
+            file: バイナリモードで開いた書き込み先のファイル。
+
+        Raises:
+            TypeError: キーが 64 ビットに収まる int でない場合。
+        """
+        if not isinstance(self._keys, (array, memoryview)):
+            raise TypeError(
+                "保存できるのは、キーが 64 ビットに収まる int の場合だけです。"
+            )
+        file.write(_FROZEN_HEADER.pack(_FROZEN_MAGIC, len(self._keys)))
+        file.write(self._keys)
+        file.write(self._values)
+
+    @classmethod
+    def open(cls, path: str) -> "FrozenBTree[int]":
+        """`save` で書き出したファイルを mmap して開きます。
+
+        キーと値の配列はマップされた領域をそのまま参照するため、エントリ数に関係なく
+        すぐに開けます。使い終わったら `close` を呼ぶか、with 文で使います。
+
+        Args:
+            path: ファイルのパス。
+
+        Returns:
+            ファイルの内容を参照する FrozenBTree。
+
+        Raises:
+            ValueError: ファイルの形式が正しくない場合、または途中で終わっている場合。
+        """
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(mapped) < _FROZEN_HEADER.size:
+                raise ValueError("ファイルが途中で終わっています。")
+            magic, n = _FROZEN_HEADER.unpack_from(mapped)
+            if magic != _FROZEN_MAGIC:
+                raise ValueError(f"{path} は FrozenBTree のファイルではありません。")
+            end = _FROZEN_HEADER.size + 16 * n
+            if len(mapped) < end:
+                raise ValueError("ファイルが途中で終わっています。")
+            view = memoryview(mapped)[_FROZEN_HEADER.size : end].cast("q")
+        except BaseException:
+            mapped.close()
+            raise
+        tree = FrozenBTree(view[:n], view[n:])
+        tree._mmap = mapped
+        return tree
+
+    def close(self) -> None:
+        """`open` で開いた場合、ファイルのマップを解除します。以後は使えません。"""
+        if self._mmap is None:
+            return
+        for view in (self._keys, self._values):
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self) -> "FrozenBTree[T]":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
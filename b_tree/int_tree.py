@@ -0,0 +1,199 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import Any, cast
+
+from .compact import CompactBTree, CompactNode
+
+try:
+    import numpy as np
+
+    _HAS_NUMPY = True
+except ImportError:  # numpy はオプションの依存関係
+    _HAS_NUMPY = False
+
+
+class IntNode(CompactNode[int]):
+    """64 ビット整数のキーと値を `array('q')` で保持するノード。
+
+    Python の int オブジェクトのリストではなく型付き配列にキーと値を詰めて格納するため、
+    エントリあたりのメモリ使用量が小さく、numpy からコピーなしで参照できます。
+    """
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        keys: "array[int] | None" = None,
+        values: "array[int] | None" = None,
+        children: "list[CompactNode[int]] | None" = None,
+    ) -> None:
+        super().__init__(
+            keys if keys is not None else array("q"),
+            values if values is not None else array("q"),
+            children,
+        )
+
+
+class IntBTree(CompactBTree[int]):
+    """64 ビット整数のキーと値に特化した B木。
+
+    ノードは `IntNode` で、挿入・検索・更新・削除・走査は `CompactBTree` と同じです。
+    対応する API は `BTree` の一部で、`insert` / `search` / `get` / `update` / `delete`、
+    `from_sorted` / `insert_many` / `get_many` / `delete_many`、`range` / `items` / `keys` です。
+    `delete_range`、`split_at` / `join`、`dump` / `load`、`snapshot`、`stats`、`freeze` はありません。
+    `search` はノードとインデックスを返し、値は `node.values[idx]` にあります。値だけが必要な場合は `get` を使います。
+    `get_many` は numpy が利用可能な場合、各ノードでバッチ内のキーをまとめて `searchsorted` で探索します。
+    キーと値は -2**63 から 2**63-1 の範囲である必要があります。
+    """
+
+    __slots__ = ()
+
+    node_class = IntNode
+
+    @classmethod
+    def from_sorted(
+        cls, iterable: Iterable[tuple[int, int]], t: int, fill_factor: float = 1.0
+    ) -> "IntBTree":
+        """キーでソート済みの (キー, 値) の列から B木をレベルごとに構築します。
+
+        入力は型付き配列に読み込んでから、各レベルのノードにキー数が均等になるように分配します。
+
+        Args:
+            iterable: キーの昇順に並んだ (キー, 値) のペアの列。
+            t: B木の最小次数。
+            fill_factor: 各ノードに詰めるキー数の最大キー数 (2t-1) に対する割合。
+
+        Returns:
+            構築された B木。
+
+        Raises:
+            ValueError: fill_factor が範囲外の場合、または入力がソートされていない場合。
+        """
+        tree = cls(t)
+        if not 0 < fill_factor <= 1:
+            raise ValueError("fill_factor は 0 より大きく 1 以下である必要があります。")
+        fill = max(t - 1, min(2 * t - 1, int(fill_factor * (2 * t - 1))))
+
+        keys: array[int] = array("q")
+        values: array[int] = array("q")
+        for key, value in iterable:
+            if keys and key < keys[-1]:
+                raise ValueError("from_sorted の入力はキーの昇順である必要があります。")
+            keys.append(key)
+            values.append(value)
+
+        children: list[CompactNode[int]] | None = None
+        while True:
+            n = len(keys)
+            if n <= 2 * t - 1:
+                tree.root = IntNode(keys, values, children)
+                return tree
+
+            # 各ノードのキー数が t-1 以上 fill 以下になるようにノード数を決める
+            count = min(-(-(n + 1) // (fill + 1)), (n + 1) // t)
+            base, extra = divmod(n - (count - 1), count)
+
+            nodes: list[CompactNode[int]] = []
+            separator_keys: array[int] = array("q")
+            separator_values: array[int] = array("q")
+            pos = 0
+            for i in range(count):
+                size = base + (1 if i < extra else 0)
+                node_children = None
+                if children is not None:
+                    node_children = children[pos : pos + size + 1]
+                nodes.append(
+                    IntNode(
+                        keys[pos : pos + size], values[pos : pos + size], node_children
+                    )
+                )
+                if i < count - 1:
+                    separator_keys.append(keys[pos + size])
+                    separator_values.append(values[pos + size])
+                pos += size + 1
+
+            keys, values, children = separator_keys, separator_values, nodes
+
+    def get_many(self, keys: Iterable[int]) -> list[int | None]:
+        """複数のキーに対応する値を一括で検索します。
+
+        同じサブツリーに入るキーは 1 回の降下にまとめ、
+        各ノードではそのノードに届いたキーをまとめて探索します。
+
+        Args:
+            keys: 検索するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの値のリスト。キーが見つからなかった場合は None。
+        """
+        key_list = list(keys)
+        results: list[int | None] = [None] * len(key_list)
+        if not key_list:
+            return results
+        if _HAS_NUMPY:
+            self._get_many_vectorized(key_list, results)
+            return results
+
+        order = sorted(range(len(key_list)), key=key_list.__getitem__)
+        stack: list[tuple[CompactNode[int], list[int]]] = [(self.root, order)]
+        while stack:
+            node, positions = stack.pop()
+            groups: dict[int, list[int]] = {}
+            for pos in positions:
+                key = key_list[pos]
+                i = bisect_left(node.keys, key)
+                if i < len(node.keys) and node.keys[i] == key:
+                    results[pos] = node.values[i]
+                elif node.children is not None:
+                    groups.setdefault(i, []).append(pos)
+            for i, group in groups.items():
+                assert node.children is not None
+                stack.append((node.children[i], group))
+        return results
+
+    def _get_many_vectorized(
+        self, key_list: list[int], results: list[int | None]
+    ) -> None:
+        """numpy の searchsorted を使って get_many を行います。
+
+        Args:
+            key_list: 検索するキーのリスト。
+            results: 入力の順序で値を書き込むリスト。
+        """
+        probes = np.asarray(key_list, dtype=np.int64)
+        order = np.argsort(probes, kind="stable")
+
+        stack: list[tuple[CompactNode[int], Any]] = [(self.root, order)]
+        while stack:
+            node, positions = stack.pop()
+            n = len(node.keys)
+            if n == 0:
+                continue
+            probe_keys = probes[positions]
+            node_keys = np.frombuffer(cast("array[int]", node.keys), dtype=np.int64)
+            idx = np.searchsorted(node_keys, probe_keys, side="left")
+            found = node_keys[np.minimum(idx, n - 1)] == probe_keys
+            if found.any():
+                node_values = np.frombuffer(
+                    cast("array[int]", node.values), dtype=np.int64
+                )
+                for pos, value in zip(
+                    positions[found].tolist(),
+                    node_values[idx[found]].tolist(),
+                    strict=True,
+                ):
+                    results[pos] = value
+                del node_values
+            del node_keys
+            if node.children is None:
+                continue
+
+            # 探索キーはソート済みなので、同じ子ノードへ向かうキーは連続している
+            missing = ~found
+            rest, child_idx = positions[missing], idx[missing]
+            if len(rest) == 0:
+                continue
+            uniq, starts = np.unique(child_idx, return_index=True)
+            for i, group in zip(uniq.tolist(), np.split(rest, starts[1:]), strict=True):
+                stack.append((node.children[i], group))
@@ -1,7 +1,16 @@
-from typing import Generic, TypeVar
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, ClassVar, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from .stats import OperationCounters
 
 T = TypeVar("T")
 
+# 二分探索でノード内のキーを比較するためのキー関数
+_get_key = attrgetter("key")
+
 
 class KeyValuePair(Generic[T]):
     """Node に格納される Key と Value のペアを表すクラス。
@@ -27,14 +36,72 @@ class Node(Generic[T]):
         children (list[Node[T]]): 子ノードのリスト。非葉ノードの場合のみ使用されます。
         t (int): B木の最小次数 (minimum degree)。各ノードは t-1 個、最大 2t-1 個のキーを持ちます (ルートノードを除く)。
         is_leaf (bool): このノードが葉ノードであるかどうかを示すフラグ。
+        owner (Optional[object]): このノードを変更してよい世代を表すトークン。
+            スナップショットと共有されているノードは、変更する前に `_writable_child` で複製されます。
     """
 
+    # スナップショットが作られるまではすべてのノードが None を共有し、インスタンスごとの属性は持たない
+    owner: object | None = None
+
+    # `stats.count_operations` の実行中だけ設定される、操作の回数のカウンタ。None の間は何も数えない
+    _counters: ClassVar["OperationCounters | None"] = None
+
     def __init__(self, t: int, is_leaf: bool):
         self.items: list[KeyValuePair] = []
         self.children: list[Node[T]] = []
         self.t = t
         self.is_leaf = is_leaf
 
+    def _new_node(self, is_leaf: bool) -> "Node[T]":
+        """このノードと同じ種類・同じ最小次数の新しいノードを作成します。
+
+        ノードの格納方法を変えるサブクラスは、このメソッドを上書きします。
+
+        Args:
+            is_leaf: 新しいノードが葉ノードかどうか。
+
+        Returns:
+            作成したノード。
+        """
+        node: Node[T] = Node(self.t, is_leaf)
+        if self.owner is not None:
+            node.owner = self.owner
+        return node
+
+    def _clone(self, owner: object | None) -> "Node[T]":
+        """子ノードとキーと値のペアを共有した、このノードの浅い複製を作成します。
+
+        Args:
+            owner: 複製したノードの世代を表すトークン。
+
+        Returns:
+            複製したノード。
+        """
+        node: Node[T] = Node(self.t, self.is_leaf)
+        node.items = list(self.items)
+        node.children = list(self.children)
+        node.owner = owner
+        return node
+
+    def _writable_child(self, i: int) -> "Node[T]":
+        """i 番目の子ノードを、変更してよい状態にして返します。
+
+        子ノードがこのノードと異なる世代のもの (スナップショットと共有されているもの) であれば、
+        複製してから子ノードのリストを置き換えます (パスコピー)。
+        このノード自身は変更してよい状態である必要があります。
+
+        Args:
+            i: 子ノードのインデックス。
+
+        Returns:
+            変更してよい i 番目の子ノード。
+        """
+        child = self.children[i]
+        if child.owner is not self.owner:
+            child = child._clone(self.owner)
+            self.children[i] = child
+        return child
+
     def split_child(self, i: int, y: "Node[T]") -> None:
         """子ノード を分割します。
 
@@ -47,7 +114,9 @@ class Node(Generic[T]):
             i: self.children における子ノード y のインデックス。
             y: 分割対象の子ノード
         """
-        z: Node = Node(y.t, y.is_leaf)
+        if Node._counters is not None:
+            Node._counters._add("splits")
+        z: Node = y._new_node(y.is_leaf)
         middle_kv_pair = y.items[self.t - 1]
         z.items = y.items[self.t :]
 
@@ -101,21 +170,27 @@ class Node(Generic[T]):
         """
         child_index = self.__find_insert_index(kv_pair.key)
 
-        child = self.children[child_index]
+        child = self._writable_child(child_index)
         if len(child.items) == (2 * self.t - 1):
             self.split_child(child_index, child)
 
             if kv_pair.key > self.items[child_index].key:
                 child_index += 1
 
-        self.children[child_index].insert(kv_pair)
+        self._writable_child(child_index).insert(kv_pair)
 
     def __find_insert_index(self, key: T) -> int:
-        """挿入するキーのインデックスを見つけるヘルパー関数"""
-        i = len(self.items) - 1
-        while i >= 0 and key < self.items[i].key:
-            i -= 1
-        return i + 1
+        """挿入するキーのインデックスを見つけるヘルパー関数
+
+        同じキーが既に存在する場合は、その直後のインデックスを返します。
+        """
+        # T は比較の型を持たないため、bisect には Any として渡す
+        probe: Any = key
+        counters = Node._counters
+        if counters is None:
+            return bisect_right(self.items, probe, key=_get_key)
+        counters._add("node_visits")
+        return bisect_right(self.items, probe, key=counters._counting_key)
 
     def delete(self, key: T) -> bool:
         """このノードまたはそのサブツリーからキーを削除します。
@@ -135,12 +210,12 @@ class Node(Generic[T]):
             else:
                 self._delete_from_non_leaf(idx)
             return True
-        
+
         # キーがこのノードにない場合
         if self.is_leaf:
             # 葉ノードでキーが見つからなければ、キーは存在しない
             return False
-        
+
         # 子ノードで削除処理を継続するが、先に必要な準備を行う
         child_idx = idx
         return self._ensure_child_has_enough_keys_and_delete(child_idx, key)
@@ -149,6 +224,7 @@ class Node(Generic[T]):
         """ノード内で指定されたキーの位置を検索します。
 
         キーが存在しない場合、適切な子ノードのインデックスを返します。
+        items はキーでソートされているため、二分探索で O(log t) で求めます。
 
         Args:
             key: 検索するキー。
@@ -156,11 +232,14 @@ class Node(Generic[T]):
         Returns:
             キーのインデックス、または適切な子ノードのインデックス。
         """
-        idx = 0
-        while idx < len(self.items) and self.items[idx].key < key:
-            idx += 1
-        return idx
-    
+        # T は比較の型を持たないため、bisect には Any として渡す
+        probe: Any = key
+        counters = Node._counters
+        if counters is None:
+            return bisect_left(self.items, probe, key=_get_key)
+        counters._add("node_visits")
+        return bisect_left(self.items, probe, key=counters._counting_key)
+
     def _delete_from_leaf(self, idx: int) -> None:
         """葉ノードからキーを削除します。
 
@@ -168,7 +247,7 @@ class Node(Generic[T]):
             idx: 削除するキーのインデックス。
         """
         del self.items[idx]
-    
+
     def _delete_from_non_leaf(self, idx: int) -> None:
         """非葉ノードからキーを削除します。
 
@@ -176,28 +255,28 @@ class Node(Generic[T]):
             idx: 削除するキーのインデックス。
         """
         key = self.items[idx].key
-        
+
         # ケース 1: idx の位置のキーの前にある子ノードが t 個以上のキーを持つ場合
         if len(self.children[idx].items) >= self.t:
             # 前駆者を見つけて、それと交換し、前駆者を削除
             pred = self._get_predecessor(idx)
             self.items[idx] = pred
-            self.children[idx].delete(pred.key)
-        
+            self._writable_child(idx).delete(pred.key)
+
         # ケース 2: idx+1 の位置のキーの後ろにある子ノードが t 個以上のキーを持つ場合
         elif len(self.children[idx + 1].items) >= self.t:
             # 後継者を見つけて、それと交換し、後継者を削除
             succ = self._get_successor(idx)
             self.items[idx] = succ
-            self.children[idx + 1].delete(succ.key)
-        
+            self._writable_child(idx + 1).delete(succ.key)
+
         # ケース 3: 両方の子ノードが t-1 個のキーしか持たない場合
         else:
             # 子ノードをマージして、そのマージされたノードで削除を続行
             self._merge_children(idx)
             # idx 番目のキーはマージされた子ノードに移動しているので、そこで削除を続行
-            self.children[idx].delete(key)
-    
+            self._writable_child(idx).delete(key)
+
     def _get_predecessor(self, idx: int) -> KeyValuePair:
         """指定されたインデックスにあるキーの前駆者を取得します。
 
@@ -213,7 +292,7 @@ class Node(Generic[T]):
         while not current.is_leaf:
             current = current.children[-1]
         return current.items[-1]
-    
+
     def _get_successor(self, idx: int) -> KeyValuePair:
         """指定されたインデックスにあるキーの後継者を取得します。
 
@@ -229,28 +308,30 @@ class Node(Generic[T]):
         while not current.is_leaf:
             current = current.children[0]
         return current.items[0]
-    
+
     def _merge_children(self, idx: int) -> None:
         """idx 番目の子と idx+1 番目の子をマージします。
 
         Args:
             idx: マージする最初の子のインデックス。
         """
-        child = self.children[idx]
+        if Node._counters is not None:
+            Node._counters._add("merges")
+        child = self._writable_child(idx)
         sibling = self.children[idx + 1]
-        
+
         # idx 番目のキーを子ノードに移動
         child.items.append(self.items[idx])
-        
+
         # 兄弟のすべてのキーと子を子ノードにコピー
         child.items.extend(sibling.items)
         if not sibling.is_leaf:
             child.children.extend(sibling.children)
-        
+
         # idx 番目のキーと idx+1 番目の子を削除
         del self.items[idx]
         del self.children[idx + 1]
-    
+
     def _ensure_child_has_enough_keys_and_delete(self, idx: int, key: T) -> bool:
         """指定された子ノードが最低 t 個のキーを持つようにしてから、削除を続行します。
 
@@ -266,7 +347,10 @@ class Node(Generic[T]):
             # ケース 1: 隣接する兄弟が t 個以上のキーを持つ場合は、キーを借りる
             if idx > 0 and len(self.children[idx - 1].items) >= self.t:
                 self._borrow_from_prev(idx)
-            elif idx < len(self.children) - 1 and len(self.children[idx + 1].items) >= self.t:
+            elif (
+                idx < len(self.children) - 1
+                and len(self.children[idx + 1].items) >= self.t
+            ):
                 self._borrow_from_next(idx)
             # ケース 2: 両方の隣接する兄弟が t-1 個のキーしかない場合は、マージする
             else:
@@ -276,44 +360,337 @@ class Node(Generic[T]):
                     idx = idx - 1
                 else:
                     self._merge_children(idx)
-        
+
         # 子ノードでの削除を続行
-        return self.children[idx].delete(key)
-    
+        return self._writable_child(idx).delete(key)
+
     def _borrow_from_prev(self, idx: int) -> None:
         """前の兄弟からキーを借りて、子ノードに追加します。
 
         Args:
             idx: 子ノードのインデックス。
         """
-        child = self.children[idx]
-        sibling = self.children[idx - 1]
-        
+        if Node._counters is not None:
+            Node._counters._add("borrows_from_prev")
+        child = self._writable_child(idx)
+        sibling = self._writable_child(idx - 1)
+
         # 親のキーを子に移動
         child.items.insert(0, self.items[idx - 1])
-        
+
         # 兄弟の最後のキーを親に移動
         self.items[idx - 1] = sibling.items.pop()
-        
+
         # 兄弟が葉ノードでない場合、最後の子を子ノードに移動
         if not sibling.is_leaf:
             child.children.insert(0, sibling.children.pop())
-    
+
     def _borrow_from_next(self, idx: int) -> None:
         """次の兄弟からキーを借りて、子ノードに追加します。
 
         Args:
             idx: 子ノードのインデックス。
         """
-        child = self.children[idx]
-        sibling = self.children[idx + 1]
-        
+        if Node._counters is not None:
+            Node._counters._add("borrows_from_next")
+        child = self._writable_child(idx)
+        sibling = self._writable_child(idx + 1)
+
         # 親のキーを子に移動
         child.items.append(self.items[idx])
-        
+
         # 兄弟の最初のキーを親に移動
         self.items[idx] = sibling.items.pop(0)
-        
+
         # 兄弟が葉ノードでない場合、最初の子を子ノードに移動
         if not sibling.is_leaf:
             child.children.append(sibling.children.pop(0))
+
+    def _rebalance_children(self, indices: list[int] | None = None) -> None:
+        """キー数が B木の制約から外れた子ノードを、分割またはマージによって修正します。
+
+        一括操作では子ノードを一時的に満杯以上にしたり t-1 個未満にしたりするため、
+        サブツリーの処理を終えた後にこのメソッドでまとめて修正します。
+        子ノードは右から順に修正するため、分割やマージで子ノードの数が変わっても、
+        まだ確認していない左側の子ノードのインデックスは変わりません。
+        マージした子ノードの境界にある孫ノードも制約を満たさない可能性があるため、再帰的に修正します。
+
+        Args:
+            indices: 制約から外れている可能性のある子ノードのインデックスの昇順のリスト。
+                None の場合はすべての子ノードを確認します。
+                ディスク上のノードでは、確認しない子ノードは読み込まれません。
+        """
+        for i in reversed(range(len(self.children)) if indices is None else indices):
+            if i >= len(self.children):
+                # 右側の子ノードが左の兄弟と続けてマージされ、この位置の子ノードは確認済み
+                continue
+            while True:
+                child = self.children[i]
+                if len(child.items) > 2 * self.t - 1:
+                    child = self._writable_child(i)
+                    pieces, separators = child._split_overflowing()
+                    self.children[i : i + 1] = pieces
+                    self.items[i:i] = separators
+                    break
+                if len(child.items) >= self.t - 1 or len(self.children) == 1:
+                    break
+                # 右の兄弟 (最後の子の場合は左の兄弟) とマージし、同じ位置を再確認する
+                if i == len(self.children) - 1:
+                    i -= 1
+                seam = len(self.children[i].children)
+                self._merge_children(i)
+                if not self.children[i].is_leaf:
+                    self.children[i]._rebalance_children([seam - 1, seam])
+
+    def _split_overflowing(self) -> tuple[list["Node[T]"], list[KeyValuePair]]:
+        """2t-1 個より多いキーを持つノードを、制約を満たす複数のノードに分割します。
+
+        Returns:
+            分割後のノードのリストと、それらの間に入る区切りのキーと値のペアのリスト。
+        """
+        t = self.t
+        m = len(self.items)
+        k = (m + 2 * t) // (2 * t)
+        base, extra = divmod(m - (k - 1), k)
+
+        items, children = self.items, self.children
+        pieces: list[Node[T]] = []
+        separators: list[KeyValuePair] = []
+        pos = 0
+        for p in range(k):
+            size = base + (1 if p < extra else 0)
+            piece = self if p == 0 else self._new_node(self.is_leaf)
+            piece.items = items[pos : pos + size]
+            if not self.is_leaf:
+                piece.children = children[pos : pos + size + 1]
+            pieces.append(piece)
+            if p < k - 1:
+                separators.append(items[pos + size])
+            pos += size + 1
+        return pieces, separators
+
+    def _insert_batch(self, batch: list[KeyValuePair[T]]) -> None:
+        """キーでソート済みのペアのリストを、このノードのサブツリーに一括で挿入します。
+
+        各子ノードには、そこへ挿入されるペアをまとめて 1 回だけ降ります。
+        挿入後にこのノードが満杯を超えることがあるため、呼び出し側で分割する必要があります。
+
+        Args:
+            batch: キーでソートされた、挿入するキーと値のペアのリスト。
+        """
+        if self.is_leaf:
+            # 同じキーは既存のペアの後ろに入るよう、安定なマージを使う
+            self.items = list(merge(self.items, batch, key=_get_key))
+            return
+
+        touched: list[int] = []
+        start = 0
+        while start < len(batch):
+            child_index = self.__find_insert_index(batch[start].key)
+            end = start + 1
+            while (
+                end < len(batch)
+                and self.__find_insert_index(batch[end].key) == child_index
+            ):
+                end += 1
+            self._writable_child(child_index)._insert_batch(batch[start:end])
+            touched.append(child_index)
+            start = end
+
+        self._rebalance_children(touched)
+
+    def _delete_batch(self, batch: list[tuple[T, int]], results: list[bool]) -> None:
+        """キーでソート済みのキーのリストを、このノードのサブツリーから一括で削除します。
+
+        各子ノードには、そこから削除されるキーをまとめて 1 回だけ降ります。
+        このノードにあるキーは、両隣の子ノードを連結することで取り除きます。
+        削除後にこのノードのキー数が t-1 未満になることがあるため、呼び出し側で修正する必要があります。
+
+        Args:
+            batch: キーでソートされた、(削除するキー, 入力での位置) のリスト。キーは重複しません。
+            results: 入力での位置ごとに、削除が成功したかを書き込むリスト。
+        """
+        if self.is_leaf:
+            for key, pos in batch:
+                idx = self._find_key(key)
+                if idx < len(self.items) and self.items[idx].key == key:
+                    del self.items[idx]
+                    results[pos] = True
+            return
+
+        matched: list[int] = []
+        groups: dict[int, list[tuple[T, int]]] = {}
+        for key, pos in batch:
+            idx = self._find_key(key)
+            if idx < len(self.items) and self.items[idx].key == key:
+                matched.append(idx)
+                results[pos] = True
+                continue
+            groups.setdefault(idx, []).append((key, pos))
+
+        touched: set[int] = set()
+        for child_index, group in groups.items():
+            child = self._writable_child(child_index)
+            child._delete_batch(group, results)
+            touched.add(id(child))
+
+        # インデックスがずれないよう、右側から順にキーを取り除く
+        for idx in reversed(matched):
+            del self.items[idx]
+            right = self.children.pop(idx + 1)
+            child = self._writable_child(idx)
+            child._join(right)
+            touched.add(id(child))
+
+        self._rebalance_children(
+            [i for i, child in enumerate(self.children) if id(child) in touched]
+        )
+
+    def _join(self, right: "Node[T]") -> None:
+        """同じ高さのノード right の内容を、区切りのキーなしでこのノードの右側に連結します。
+
+        連結後のノードは満杯を超えたり t-1 個未満になったりすることがあるため、
+        呼び出し側で修正する必要があります。
+
+        Args:
+            right: 連結するノード。すべてのキーがこのノードのキーより大きい必要があります。
+        """
+        if self.is_leaf:
+            self.items.extend(right.items)
+            return
+
+        # 境界で隣り合う子ノード同士も再帰的に連結する
+        seam = len(self.children) - 1
+        self._writable_child(seam)._join(right.children[0])
+        self.items.extend(right.items)
+        self.children.extend(right.children[1:])
+        self._rebalance_children([seam])
+
+    def _delete_range(
+        self, lo: T | None, hi: T | None, inclusive: tuple[bool, bool]
+    ) -> int:
+        """キーが lo から hi の範囲にあるペアを、このノードのサブツリーから削除します。
+
+        範囲に完全に含まれる子ノードはサブツリーごと切り離し、範囲の両端を含む子ノードにだけ降ります。
+        両端の子ノードは区切りのキーなしで連結するため、各レベルで変更するノードは高々 2 つです。
+        切り離したサブツリーは `_discard_subtree` に渡し、そのキー数を削除した数に加えます。
+        削除後にこのノードのキー数が t-1 未満になることがあるため、呼び出し側で修正する必要があります。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+
+        Returns:
+            削除したペアの数。
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        # bisect に渡すため、比較できる型として扱う
+        lo_key: Any = lo
+        hi_key: Any = hi
+        if lo is None:
+            a = 0
+        elif lo_inclusive:
+            a = bisect_left(self.items, lo_key, key=_get_key)
+        else:
+            a = bisect_right(self.items, lo_key, key=_get_key)
+        if hi is None:
+            b = len(self.items)
+        elif hi_inclusive:
+            b = bisect_right(self.items, hi_key, key=_get_key)
+        else:
+            b = bisect_left(self.items, hi_key, key=_get_key)
+        b = max(a, b)
+
+        if self.is_leaf:
+            del self.items[a:b]
+            return b - a
+
+        if a == b:
+            # 範囲全体が 1 つの子ノードに収まっている
+            removed = self._writable_child(a)._delete_range(lo, hi, inclusive)
+        else:
+            removed = b - a
+            for child in self.children[a + 1 : b]:
+                removed += self._discard_subtree(child)
+            # 左端の子は lo より右側がすべて範囲に含まれ、右端の子は hi より左側がすべて含まれる。
+            # 下限 (上限) がなければ、その子もサブツリーごと範囲に含まれる
+            kept: list[Node[T]] = []
+            if lo is None:
+                removed += self._discard_subtree(self.children[a])
+            else:
+                left = self._writable_child(a)
+                removed += left._delete_range(lo, None, inclusive)
+                kept.append(left)
+            if hi is None:
+                removed += self._discard_subtree(self.children[b])
+            else:
+                right = self._writable_child(b)
+                removed += right._delete_range(None, hi, inclusive)
+                kept.append(right)
+            if len(kept) == 2:
+                left._join(right)
+                kept.pop()
+            del self.items[a:b]
+            self.children[a : b + 1] = kept
+            if not self.children:
+                # 範囲がサブツリー全体を覆っていた (下限も上限もない) ので、空の葉になる
+                self.is_leaf = True
+
+        self._rebalance_children()
+        return removed
+
+    def _discard_subtree(self, node: "Node[T]") -> int:
+        """`_delete_range` で切り離したサブツリーのキーの数を返します。
+
+        サブツリーのノードを 1 回ずつたどるため、ノード数に比例する時間がかかります。
+        サブツリーのキー数を保持しているサブクラスや、ノードの格納方法を変えるサブクラスは、
+        このメソッドを上書きします。
+
+        Args:
+            node: 切り離したサブツリーのルート。
+
+        Returns:
+            サブツリーに含まれていたキーの数。
+        """
+        count = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            count += len(node.items)
+            stack.extend(node.children)
+        return count
+
+    def _split_at(
+        self, key: T, left_owner: object, right_owner: object
+    ) -> tuple["Node[T]", "Node[T]"]:
+        """このノードのサブツリーを、key より小さいキーと key 以上のキーの 2 つに分けます。
+
+        key へ向かうパス上のノードだけを新しく作り、それ以外の子ノードは元のサブツリーと共有します。
+        分けた 2 つのノードは元のノードと同じ高さで、キーを持たないことがあります。
+
+        Args:
+            key: 分割するキー。
+            left_owner: 前半のノードの世代を表すトークン。
+            right_owner: 後半のノードの世代を表すトークン。
+
+        Returns:
+            (key より小さいキーのノード, key 以上のキーのノード) のタプル。
+        """
+        i = self._find_key(key)
+        left = self._new_node(self.is_leaf)
+        right = self._new_node(self.is_leaf)
+        left.owner = left_owner
+        right.owner = right_owner
+        left.items = self.items[:i]
+        right.items = self.items[i:]
+        if not self.is_leaf:
+            inner_left, inner_right = self.children[i]._split_at(
+                key, left_owner, right_owner
+            )
+            left.children = self.children[:i] + [inner_left]
+            right.children = [inner_right] + self.children[i + 1 :]
+            # 分けた子ノードのキーが t-1 未満になっている場合は、隣の兄弟とマージする
+            left._rebalance_children()
+            right._rebalance_children()
+        return left, right
@@ -0,0 +1,285 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from typing import cast
+
+from .b_tree import BTree
+from .node import KeyValuePair, Node, _get_key
+
+
+class SizedNode[T](Node[T]):
+    """サブツリーのキー数を保持する B木のノード。
+
+    分割・マージ・兄弟からの借用・挿入・削除のたびに、変化したキー数だけ size を更新します。
+
+    Attributes:
+        size (int): このノードをルートとするサブツリーに含まれるキーの数。
+    """
+
+    def __init__(self, t: int, is_leaf: bool):
+        super().__init__(t, is_leaf)
+        self.size = 0
+
+    def _new_node(self, is_leaf: bool) -> "SizedNode[T]":
+        """サブツリーのキー数を保持する新しいノードを作成します。"""
+        node: SizedNode[T] = SizedNode(self.t, is_leaf)
+        if self.owner is not None:
+            node.owner = self.owner
+        return node
+
+    def _clone(self, owner: object | None) -> "SizedNode[T]":
+        """サブツリーのキー数も引き継いだ、このノードの浅い複製を作成します。"""
+        node: SizedNode[T] = SizedNode(self.t, self.is_leaf)
+        node.items = list(self.items)
+        node.children = list(self.children)
+        node.owner = owner
+        node.size = self.size
+        return node
+
+    def _child(self, i: int) -> "SizedNode[T]":
+        """i 番目の子ノードを返します。子ノードはすべて `SizedNode` です。"""
+        return cast("SizedNode[T]", self.children[i])
+
+    def _sized_children(self) -> list["SizedNode[T]"]:
+        """子ノードのリストを返します。子ノードはすべて `SizedNode` です。"""
+        return cast("list[SizedNode[T]]", self.children)
+
+    def _recount(self) -> None:
+        """自身のキー数と子ノードの size から、size を計算し直します。"""
+        self.size = len(self.items) + sum(
+            child.size for child in self._sized_children()
+        )
+
+    def split_child(self, i: int, y: Node[T]) -> None:
+        super().split_child(i, y)
+        z = self._child(i + 1)
+        z._recount()
+        cast("SizedNode[T]", y).size -= z.size + 1
+
+    def insert(self, kv_pair: KeyValuePair[T]) -> None:
+        self.size += 1
+        super().insert(kv_pair)
+
+    def delete(self, key: T) -> bool:
+        if super().delete(key):
+            self.size -= 1
+            return True
+        return False
+
+    def _merge_children(self, idx: int) -> None:
+        sibling = self._child(idx + 1)
+        super()._merge_children(idx)
+        self._child(idx).size += 1 + sibling.size
+
+    def _borrow_from_prev(self, idx: int) -> None:
+        sibling = self._child(idx - 1)
+        moved = 1 if sibling.is_leaf else 1 + sibling._child(-1).size
+        super()._borrow_from_prev(idx)
+        self._child(idx).size += moved
+        self._child(idx - 1).size -= moved
+
+    def _borrow_from_next(self, idx: int) -> None:
+        sibling = self._child(idx + 1)
+        moved = 1 if sibling.is_leaf else 1 + sibling._child(0).size
+        super()._borrow_from_next(idx)
+        self._child(idx).size += moved
+        self._child(idx + 1).size -= moved
+
+    def _split_overflowing(self) -> tuple[list[Node[T]], list[KeyValuePair]]:
+        pieces, separators = super()._split_overflowing()
+        for piece in pieces:
+            cast("SizedNode[T]", piece)._recount()
+        return pieces, separators
+
+    # 一括操作では子ノードが先に自身の size を計算し直すため、最後に自身を計算し直せばよい
+    def _insert_batch(self, batch: list[KeyValuePair[T]]) -> None:
+        super()._insert_batch(batch)
+        self._recount()
+
+    def _delete_batch(self, batch: list[tuple[T, int]], results: list[bool]) -> None:
+        super()._delete_batch(batch, results)
+        self._recount()
+
+    def _join(self, right: Node[T]) -> None:
+        super()._join(right)
+        self._recount()
+
+    def _delete_range(
+        self, lo: T | None, hi: T | None, inclusive: tuple[bool, bool]
+    ) -> int:
+        removed: int = super()._delete_range(lo, hi, inclusive)
+        self._recount()
+        return removed
+
+    def _split_at(
+        self, key: T, left_owner: object, right_owner: object
+    ) -> tuple[Node[T], Node[T]]:
+        left, right = super()._split_at(key, left_owner, right_owner)
+        cast("SizedNode[T]", left)._recount()
+        cast("SizedNode[T]", right)._recount()
+        return left, right
+
+    def _discard_subtree(self, node: Node[T]) -> int:
+        """切り離したサブツリーのキー数を、たどらずに size から求めます。"""
+        return cast("SizedNode[T]", node).size
+
+
+def _to_sized[T](node: Node[T]) -> SizedNode[T]:
+    """ノードとそのサブツリーを、items のリストを共有したまま `SizedNode` に置き換えます。"""
+    sized: SizedNode[T] = SizedNode(node.t, node.is_leaf)
+    sized.items = node.items
+    sized.children = [_to_sized(child) for child in node.children]
+    sized._recount()
+    return sized
+
+
+class OrderStatisticBTree[T](BTree[T]):
+    """各ノードにサブツリーのキー数を持たせ、順位に関する問い合わせを O(log n) で行う B木。
+
+    `len`、キーの順位 (`rank`)、k 番目のキー (`select`)、範囲内のキー数 (`count_range`) を
+    ルートから葉への 1 回の降下で求めます。キー数の更新のため、挿入と削除のたびに
+    降下したパス上のノードの size を書き換えます。
+    """
+
+    root: SizedNode[T]
+
+    def __init__(self, t: int):
+        super().__init__(t)
+        self.root = SizedNode(t, True)
+
+    @classmethod
+    def from_sorted(
+        cls, iterable: Iterable[tuple[T, int]], t: int, fill_factor: float = 1.0
+    ) -> "OrderStatisticBTree[T]":
+        """キーでソート済みの (キー, 値) の列から B木を構築します。`BTree.from_sorted` と同じです。"""
+        tree: OrderStatisticBTree[T] = cls(t)
+        tree.root = _to_sized(BTree.from_sorted(iterable, t, fill_factor).root)
+        return tree
+
+    def __len__(self) -> int:
+        """B木に格納されているキーの数を返します。"""
+        return self.root.size
+
+    def insert(self, key: T, value: int) -> None:
+        root = self.root
+        super().insert(key, value)
+        # ルートの分割で作られた新しいルート (または複製したルート) の size を求める
+        if self.root is not root:
+            self.root._recount()
+
+    def _try_append(self, kv_pair: KeyValuePair[T]) -> bool:
+        spine = self._spine
+        if not super()._try_append(kv_pair):
+            return False
+        assert self._spine is not None
+        if self._spine is spine:
+            # 右端の葉に追加しただけなので、パス上の各ノードのサブツリーが 1 件ずつ増える
+            for node in cast("list[SizedNode[T]]", spine):
+                node.size += 1
+        else:
+            # 右端のパスを作り直したか、右寄りに分割したので、パス上の size を下から求め直す
+            for node in reversed(cast("list[SizedNode[T]]", self._spine)):
+                node._recount()
+        return True
+
+    def _fix_right_edge(self) -> None:
+        super()._fix_right_edge()
+        # マージと再分配は右端のパス上のノードとその左隣の兄弟だけを変更する
+        path = [self.root]
+        while not path[-1].is_leaf:
+            path.append(path[-1]._child(-1))
+        for node in reversed(path):
+            if len(node.children) > 1:
+                node._child(-2)._recount()
+            node._recount()
+
+    def _split_overflowing_root(self) -> None:
+        while len(self.root.items) > 2 * self.t - 1:
+            new_root = cast("SizedNode[T]", self._writable_root()._new_node(False))
+            new_root.children, new_root.items = self.root._split_overflowing()
+            new_root._recount()
+            self._replace_root(new_root, 1)
+
+    def rank(self, key: T) -> int:
+        """key より小さいキーの数を返します。
+
+        Args:
+            key: 順位を求めるキー。B木に含まれていなくても構いません。
+
+        Returns:
+            key より小さいキーの数。key が含まれている場合は、その (最初の) キーの 0 始まりの順位です。
+        """
+        return self._count_before(key, bisect_left)
+
+    def _count_before(self, key: T, bisect: Callable[..., int]) -> int:
+        """bisect_left なら key 未満、bisect_right なら key 以下のキーの数を返します。"""
+        count = 0
+        node = self.root
+        while True:
+            i = bisect(node.items, key, key=_get_key)
+            count += i
+            if node.is_leaf:
+                return count
+            for child in node._sized_children()[:i]:
+                count += child.size
+            node = node._child(i)
+
+    def select(self, k: int) -> tuple[T, int]:
+        """キーの昇順で k 番目 (0 始まり) の (キー, 値) のペアを返します。
+
+        Args:
+            k: 順位。負の値は末尾から数えます。
+
+        Returns:
+            k 番目の (キー, 値) のタプル。
+
+        Raises:
+            IndexError: k が範囲外の場合。
+        """
+        n = len(self)
+        if k < 0:
+            k += n
+        if not 0 <= k < n:
+            raise IndexError("select の順位が範囲外です。")
+
+        node = self.root
+        while not node.is_leaf:
+            for i, child in enumerate(node._sized_children()):
+                size = child.size
+                if k < size:
+                    node = child
+                    break
+                k -= size
+                if k == 0:
+                    kv_pair = node.items[i]
+                    return kv_pair.key, kv_pair.value
+                k -= 1
+        kv_pair = node.items[k]
+        return kv_pair.key, kv_pair.value
+
+    def count_range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+    ) -> int:
+        """範囲内のキーの数を返します。範囲の指定は `range` と同じです。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+
+        Returns:
+            範囲内のキーの数。
+        """
+        if hi is None:
+            end = len(self)
+        else:
+            end = self._count_before(hi, bisect_right if inclusive[1] else bisect_left)
+        if lo is None:
+            start = 0
+        else:
+            start = self._count_before(
+                lo, bisect_left if inclusive[0] else bisect_right
+            )
+        return max(0, end - start)
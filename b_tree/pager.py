@@ -0,0 +1,296 @@
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+from weakref import WeakValueDictionary
+
+# ヘッダーページ (ページ 0) の形式: マジック, ページサイズ, 最小次数, ルートページ, ページ数, 空きリストの先頭
+_HEADER = struct.Struct("<8sIIQQQ")
+_MAGIC = b"BTREEPG1"
+
+# 空きページを表すページヘッダーと、次の空きページ番号
+_FREE_PAGE = struct.Struct("<B7xQ")
+_FREE_MARK = 0xFF
+
+# 空きリストの終端を表すページ番号 (ページ 0 はヘッダーなので、データページには使われない)
+NO_PAGE = 0
+
+
+class Pager:
+    """1 つのファイルを固定サイズのページの配列として読み書きするクラス。
+
+    ページ 0 はヘッダーで、ページサイズや最小次数、ルートページの番号などを保持します。
+    解放されたページは空きリストでつながれ、次のページ割り当てで再利用されます。
+    読み込みには mmap を使うことができ、大きなファイルでも開くコストはほとんどかかりません。
+
+    Attributes:
+        path (str): ファイルのパス。
+        page_size (int): 1 ページのバイト数。
+        t (int): ファイルに格納されている B木の最小次数。
+        root_page (int): ルートノードのページ番号。ルートがまだない場合は NO_PAGE。
+        page_count (int): ヘッダーを含むページ数。
+    """
+
+    def __init__(self, path: str, page_size: int, t: int, use_mmap: bool = True):
+        """ファイルを開きます。ファイルが存在しない場合は新しく作成します。
+
+        既存のファイルを開く場合、ページサイズと最小次数はヘッダーの値が使われます。
+
+        Args:
+            path: ファイルのパス。
+            page_size: 新しく作成する場合の 1 ページのバイト数。
+            t: 新しく作成する場合の B木の最小次数。
+            use_mmap: 読み込みに mmap を使うかどうか。
+
+        Raises:
+            ValueError: 既存のファイルがこの形式でない場合。
+        """
+        self.path = path
+        self.use_mmap = use_mmap
+        self._mmap: mmap.mmap | None = None
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if exists:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            magic, page_size, t, root_page, page_count, free_head = _HEADER.unpack(
+                header
+            )
+            if magic != _MAGIC:
+                os.close(self._fd)
+                raise ValueError(f"{path} は B木のページファイルではありません。")
+        else:
+            root_page, page_count, free_head = NO_PAGE, 1, NO_PAGE
+
+        self.page_size: int = page_size
+        self.t: int = t
+        self.root_page: int = root_page
+        self.page_count: int = page_count
+        self._free_head: int = free_head
+        if not exists:
+            self.write_header()
+
+    def write_header(self) -> None:
+        """ヘッダーページを書き込みます。"""
+        header = _HEADER.pack(
+            _MAGIC,
+            self.page_size,
+            self.t,
+            self.root_page,
+            self.page_count,
+            self._free_head,
+        )
+        self.write_page(0, header)
+
+    def read_page(self, page_id: int) -> bytes:
+        """ページの内容を読み込みます。
+
+        mmap を使う場合は、システムコールを発行せずにマップされた領域から読み込みます。
+
+        Args:
+            page_id: 読み込むページの番号。
+
+        Returns:
+            ページの内容。
+        """
+        offset = page_id * self.page_size
+        if self.use_mmap:
+            if self._mmap is None or len(self._mmap) < offset + self.page_size:
+                self._remap()
+            assert self._mmap is not None
+            return self._mmap[offset : offset + self.page_size]
+        return os.pread(self._fd, self.page_size, offset)
+
+    def _remap(self) -> None:
+        """ファイル全体を読み込み専用で mmap し直します。"""
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+
+    def write_page(self, page_id: int, data: bytes | bytearray) -> None:
+        """ページに内容を書き込みます。ページサイズに満たない部分は 0 で埋めます。
+
+        Args:
+            page_id: 書き込むページの番号。
+            data: 書き込む内容。ページサイズ以下である必要があります。
+        """
+        if len(data) > self.page_size:
+            raise ValueError("ページサイズを超える内容は書き込めません。")
+        padded = bytes(data) + b"\0" * (self.page_size - len(data))
+        os.pwrite(self._fd, padded, page_id * self.page_size)
+
+    def allocate(self) -> int:
+        """新しいページを割り当てます。空きページがあれば再利用します。
+
+        Returns:
+            割り当てたページの番号。
+        """
+        if self._free_head != NO_PAGE:
+            page_id = self._free_head
+            _, next_free = _FREE_PAGE.unpack_from(self.read_page(page_id))
+            self._free_head = int(next_free)
+            return page_id
+        page_id = self.page_count
+        self.page_count += 1
+        # ファイルを伸ばしておき、mmap での読み込みがページの範囲を超えないようにする
+        self.write_page(page_id, b"")
+        return page_id
+
+    def free(self, page_id: int) -> None:
+        """ページを解放し、空きリストに追加します。
+
+        Args:
+            page_id: 解放するページの番号。
+        """
+        self.write_page(page_id, _FREE_PAGE.pack(_FREE_MARK, self._free_head))
+        self._free_head = page_id
+
+    def sync(self) -> None:
+        """ヘッダーを書き込み、ファイルの内容をディスクに同期します。"""
+        self.write_header()
+        os.fsync(self._fd)
+
+    def close(self) -> None:
+        """ファイルを閉じます。"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class BufferPool:
+    """ページから読み込んだノードをキャッシュするバッファプール。
+
+    読み込まれているノードの数が上限を超えると、最も長く使われていないノードから追い出します。
+    変更されたノードは追い出すときにページへ書き戻されます。
+    追い出されたノードのオブジェクトは、親ノードから参照されている間は中身のないスタブとして残り、
+    次にアクセスされたときにページから読み込み直されます。
+
+    ノードは page_id / loaded 属性と、load(data) / dump() / unload() メソッドを持つ必要があります。
+
+    Attributes:
+        pager (Pager): ページの読み書きに使うページャ。
+        capacity (int): メモリ上に保持するノードの最大数。
+        writing (bool): 変更操作の実行中かどうか。実行中にアクセスされたノードは変更済みとして扱います。
+    """
+
+    def __init__(self, pager: Pager, capacity: int, stub: Callable[[int], Any]):
+        """バッファプールを初期化します。
+
+        Args:
+            pager: ページの読み書きに使うページャ。
+            capacity: メモリ上に保持するノードの最大数。
+            stub: ページ番号から、まだ読み込まれていないノードを作成する関数。
+        """
+        if capacity < 1:
+            raise ValueError("バッファプールの容量は 1 以上である必要があります。")
+        self.pager = pager
+        self.capacity = capacity
+        self.writing = False
+        self._stub = stub
+        self._nodes: WeakValueDictionary[int, Any] = WeakValueDictionary()
+        self._resident: OrderedDict[int, Any] = OrderedDict()
+        self._dirty: set[int] = set()
+        self._pin_depth = 0
+
+    def __len__(self) -> int:
+        """メモリ上に読み込まれているノードの数を返します。"""
+        return len(self._resident)
+
+    def get(self, page_id: int) -> Any:
+        """ページ番号に対応するノードのオブジェクトを返します。
+
+        同じページに対しては常に同じオブジェクトを返します。ページの内容は読み込みません。
+
+        Args:
+            page_id: ページ番号。
+
+        Returns:
+            ページに対応するノード。
+        """
+        node = self._nodes.get(page_id)
+        if node is None:
+            node = self._stub(page_id)
+            self._nodes[page_id] = node
+        return node
+
+    def access(self, node: Any) -> None:
+        """ノードへのアクセスを記録し、必要であればページから読み込みます。
+
+        Args:
+            node: アクセスするノード。
+        """
+        page_id = node.page_id
+        if not node.loaded:
+            node.load(self.pager.read_page(page_id))
+            self._resident[page_id] = node
+            if self._pin_depth == 0:
+                self._evict()
+        elif page_id in self._resident:
+            self._resident.move_to_end(page_id)
+        if self.writing:
+            self._dirty.add(page_id)
+
+    def add(self, node: Any) -> None:
+        """新しいページを割り当てたノードをプールに追加し、変更済みとして扱います。
+
+        Args:
+            node: 追加するノード。
+        """
+        node.page_id = self.pager.allocate()
+        self._nodes[node.page_id] = node
+        self._resident[node.page_id] = node
+        self._dirty.add(node.page_id)
+
+    def discard(self, node: Any) -> None:
+        """不要になったノードをプールから取り除き、そのページを解放します。
+
+        Args:
+            node: 取り除くノード。
+        """
+        self._nodes.pop(node.page_id, None)
+        self._resident.pop(node.page_id, None)
+        self._dirty.discard(node.page_id)
+        self.pager.free(node.page_id)
+
+    @contextmanager
+    def pin(self, writing: bool) -> Iterator[None]:
+        """ブロックの実行中はノードを追い出さないようにします。
+
+        変更操作では、ノードのリストへの参照を保持したまま処理が進むため、
+        途中で追い出されると変更が失われます。ブロックを抜けたときにまとめて追い出します。
+
+        Args:
+            writing: ブロック内でアクセスしたノードを変更済みとして扱うかどうか。
+        """
+        self._pin_depth += 1
+        previous, self.writing = self.writing, self.writing or writing
+        try:
+            yield
+        finally:
+            self.writing = previous
+            self._pin_depth -= 1
+            if self._pin_depth == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        """ノードの数が上限以下になるまで、最も長く使われていないノードを追い出します。"""
+        while len(self._resident) > self.capacity:
+            # ページに書き込めた後で取り除き、失敗してもノードを失わないようにする
+            page_id, node = next(iter(self._resident.items()))
+            if page_id in self._dirty:
+                self.pager.write_page(page_id, node.dump())
+                self._dirty.discard(page_id)
+            del self._resident[page_id]
+            node.unload()
+
+    def flush(self) -> None:
+        """変更されたすべてのノードをページに書き戻します。"""
+        for page_id in sorted(self._dirty):
+            self.pager.write_page(page_id, self._resident[page_id].dump())
+        self._dirty.clear()
@@ -0,0 +1,370 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from typing import Any, cast
+
+from .bplus_tree import BPlusNode, BPlusTree
+
+
+def _common_prefix_length[K: (str, bytes)](a: K, b: K) -> int:
+    """2 つのキーの共通接頭辞の長さを、スライスの比較による二分探索で求めます。"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _shortest_separator[K: (str, bytes)](left: K, right: K) -> K:
+    """left < s <= right を満たす最も短い区切りキー s を返します。
+
+    right のうち、left との共通接頭辞に 1 文字加えた部分が最も短い区切りです。
+    left と right が等しい場合は right を返します。
+    """
+    return right[: _common_prefix_length(left, right) + 1]
+
+
+class PrefixNode[K: (str, bytes)](BPlusNode[K]):
+    """ノード内のキーの共通接頭辞を 1 つだけ持ち、キーを接尾辞で格納する B+木のノード。
+
+    keys[i] はキーから prefix を取り除いた接尾辞で、キーは prefix + keys[i] です。
+    キーを探すときは探すキーから prefix を取り除き、接尾辞と比較します。
+    prefix はノードのすべてのキーの共通接頭辞で、接頭辞を共有しないキーを挿入すると短くし、
+    分割・マージ・借用で組み替えたノードでは、そのノードのキーの最長の共通接頭辞にします。
+
+    Attributes:
+        prefix (str | bytes | None): ノードのキーの共通接頭辞。キーを持たないノードでは意味を持ちません。
+    """
+
+    keys: list[K]
+
+    def __init__(self, t: int, is_leaf: bool):
+        super().__init__(t, is_leaf)
+        self.prefix: K | None = None
+
+    def _new_node(self, is_leaf: bool) -> "PrefixNode[K]":
+        """接頭辞を持つ新しいノードを作成します。"""
+        return PrefixNode(self.t, is_leaf)
+
+    def _child(self, i: int) -> "PrefixNode[K]":
+        """i 番目の子ノードを返します。子ノードはすべて `PrefixNode` です。"""
+        return cast("PrefixNode[K]", self.children[i])
+
+    def _locate(self, key: K, right: bool) -> int:
+        """key を keys に挿入できる位置を、bisect_right (right が True) または bisect_left で求めます。"""
+        keys = self.keys
+        if not keys:
+            return 0
+        prefix = self.prefix
+        assert prefix is not None
+        if key.startswith(prefix):
+            suffix = key[len(prefix) :]
+            return bisect_right(keys, suffix) if right else bisect_left(keys, suffix)
+        # 接頭辞を共有しないキーは、ノードのすべてのキーより小さいか大きい
+        return 0 if key < prefix else len(keys)
+
+    def _full_key(self, i: int) -> K:
+        """i 番目のキーを、接頭辞を付けて返します。"""
+        prefix = self.prefix
+        assert prefix is not None
+        return prefix + self.keys[i]
+
+    def _full_keys(self) -> list[K]:
+        """すべてのキーを、接頭辞を付けて返します。"""
+        prefix = self.prefix
+        if prefix is None:
+            return []
+        return [prefix + suffix for suffix in self.keys]
+
+    def _set_keys(self, keys: list[K]) -> None:
+        """ソート済みのキーのリストを、最長の共通接頭辞と接尾辞に分けて格納します。"""
+        if not keys:
+            self.keys = []
+            return
+        n = _common_prefix_length(keys[0], keys[-1])
+        self.prefix = keys[0][:n]
+        self.keys = [key[n:] for key in keys]
+
+    def _tighten(self) -> None:
+        """接尾辞に共通する先頭の部分を、接頭辞へ移します。"""
+        keys = self.keys
+        if keys:
+            n = _common_prefix_length(keys[0], keys[-1])
+            prefix = self.prefix
+            assert prefix is not None
+            if n:
+                self.prefix = prefix + keys[0][:n]
+                self.keys = [suffix[n:] for suffix in keys]
+
+    def _insert_key(self, i: int, key: K) -> None:
+        """キーを i 番目に挿入します。接頭辞を共有しない場合は接頭辞を短くします。"""
+        keys = self.keys
+        if not keys:
+            self.prefix = key
+            keys.append(key[len(key) :])
+            return
+        prefix = self.prefix
+        assert prefix is not None
+        if not key.startswith(prefix):
+            n = _common_prefix_length(prefix, key)
+            extra = prefix[n:]
+            self.prefix = prefix = prefix[:n]
+            self.keys = keys = [extra + suffix for suffix in keys]
+        keys.insert(i, key[len(prefix) :])
+
+    def _replace_key(self, i: int, key: K) -> None:
+        """i 番目のキーを置き換えます。"""
+        del self.keys[i]
+        self._insert_key(i, key)
+
+    def split_child(self, i: int, y: BPlusNode[K]) -> None:
+        """満杯の子ノード y を分割します。`BPlusNode.split_child` と同じです。
+
+        葉ノードを分割する場合は、z の最初のキーではなく、y の最後のキーより大きく
+        z の最初のキー以下の最も短いキーを区切りキーにします。
+        分割した 2 つのノードは、それぞれのキーの共通接頭辞まで接頭辞を伸ばします。
+        """
+        t = self.t
+        child = cast("PrefixNode[K]", y)
+        z = child._new_node(child.is_leaf)
+        z.prefix = child.prefix
+        suffixes = child.keys
+
+        if child.is_leaf:
+            separator = _shortest_separator(child._full_key(t - 1), child._full_key(t))
+            z.keys = suffixes[t:]
+            z.values = child.values[t:]
+            child.keys = suffixes[:t]
+            child.values = child.values[:t]
+
+            z.next = child.next
+            z.prev = child
+            if child.next is not None:
+                child.next.prev = z
+            child.next = z
+        else:
+            separator = child._full_key(t - 1)
+            z.keys = suffixes[t:]
+            z.children = child.children[t:]
+            child.keys = suffixes[: t - 1]
+            child.children = child.children[:t]
+        child._tighten()
+        z._tighten()
+
+        self.children.insert(i + 1, z)
+        self._insert_key(i, separator)
+
+    def insert(self, key: K, value: int) -> None:
+        if self.is_leaf:
+            i = self._locate(key, right=True)
+            self._insert_key(i, key)
+            self.values.insert(i, value)
+            return
+
+        child_index = self._locate(key, right=True)
+        child = self.children[child_index]
+        if len(child.keys) == (2 * self.t - 1):
+            self.split_child(child_index, child)
+
+            if key >= self._full_key(child_index):
+                child_index += 1
+
+        self.children[child_index].insert(key, value)
+
+    def delete(self, key: K) -> bool:
+        if self.is_leaf:
+            idx = self._locate(key, right=False)
+            if idx < len(self.keys) and self._full_key(idx) == key:
+                del self.keys[idx]
+                del self.values[idx]
+                return True
+            return False
+
+        idx = self._locate(key, right=True)
+        deleted: bool = self._ensure_child_has_enough_keys_and_delete(idx, key)
+        return deleted
+
+    def _merge_children(self, idx: int) -> None:
+        child = self._child(idx)
+        sibling = self._child(idx + 1)
+
+        if child.is_leaf:
+            child._set_keys(child._full_keys() + sibling._full_keys())
+            child.values.extend(sibling.values)
+            child.next = sibling.next
+            if sibling.next is not None:
+                sibling.next.prev = child
+        else:
+            child._set_keys(
+                child._full_keys() + [self._full_key(idx)] + sibling._full_keys()
+            )
+            child.children.extend(sibling.children)
+
+        del self.keys[idx]
+        del self.children[idx + 1]
+
+    def _borrow_from_prev(self, idx: int) -> None:
+        child = self._child(idx)
+        sibling = self._child(idx - 1)
+
+        if child.is_leaf:
+            moved = sibling._full_key(-1)
+            sibling.keys.pop()
+            child._insert_key(0, moved)
+            child.values.insert(0, sibling.values.pop())
+            self._replace_key(
+                idx - 1, _shortest_separator(sibling._full_key(-1), moved)
+            )
+        else:
+            child._insert_key(0, self._full_key(idx - 1))
+            self._replace_key(idx - 1, sibling._full_key(-1))
+            sibling.keys.pop()
+            child.children.insert(0, sibling.children.pop())
+
+    def _borrow_from_next(self, idx: int) -> None:
+        child = self._child(idx)
+        sibling = self._child(idx + 1)
+
+        if child.is_leaf:
+            child._insert_key(len(child.keys), sibling._full_key(0))
+            sibling.keys.pop(0)
+            child.values.append(sibling.values.pop(0))
+            self._replace_key(
+                idx, _shortest_separator(child._full_key(-1), sibling._full_key(0))
+            )
+        else:
+            child._insert_key(len(child.keys), self._full_key(idx))
+            self._replace_key(idx, sibling._full_key(0))
+            sibling.keys.pop(0)
+            child.children.append(sibling.children.pop(0))
+
+
+class PrefixBPlusTree[K: (str, bytes)](BPlusTree[K]):
+    """`PrefixNode` で構成される、str または bytes のキーのための B+木。
+
+    URL やパスのように接頭辞を共有するキーでは、各ノードがキー全体ではなく 1 つの接頭辞と
+    短い接尾辞だけを持つため、ノードが小さくなります。葉ノードを分割するときは、
+    両側のキーを区別できる最も短いキーを区切りキーにするため、非葉ノードのキーも短くなります。
+    挿入・検索・更新・削除・走査は `BPlusTree` と同じですが、`search` が返す葉ノードの
+    keys は接尾辞です。1 つの B木には str と bytes のどちらか一方のキーだけを格納できます。
+    """
+
+    root: PrefixNode[K]
+
+    def __init__(self, t: int):
+        """B+木を初期化します。
+
+        Args:
+            t: B+木の最小次数。t >= 2 である必要があります。
+        """
+        super().__init__(t)
+        self.root = PrefixNode(t, True)
+
+    def insert(self, key: K, value: int) -> None:
+        """B+木に新しいキーと値のペアを挿入します。
+
+        Args:
+            key: 挿入するキー。
+            value: 挿入する値。
+
+        Raises:
+            TypeError: キーが str または bytes でない場合。
+        """
+        if not isinstance(key, (str, bytes)):
+            raise TypeError("キーは str または bytes である必要があります。")
+        # isinstance で絞り込んだキーは super() 経由では K として扱われないため、基底クラスを直接呼ぶ
+        BPlusTree.insert(self, key, value)
+
+    def _find_leaf(self, key: K, right: bool = True) -> PrefixNode[K]:
+        find = bisect_right if right else bisect_left
+        node = self.root
+        while not node.is_leaf:
+            # `PrefixNode._locate` と同じ。非葉ノードは常にキーを持つ
+            prefix = node.prefix
+            assert prefix is not None
+            if key.startswith(prefix):
+                i = find(node.keys, key[len(prefix) :])
+            else:
+                i = 0 if key < prefix else len(node.keys)
+            # 探索の経路では cast の呼び出しを避ける。子ノードはすべて `PrefixNode`
+            child: Any = node.children[i]
+            node = child
+        return node
+
+    def search(self, key: K) -> tuple[BPlusNode[K], int] | None:
+        """キーを検索します。`BPlusTree.search` と同じです。
+
+        葉ノードの keys[i] はキーから葉ノードの prefix を取り除いた接尾辞です。
+        """
+        leaf = self._find_leaf(key, right=False)
+        i = leaf._locate(key, False)
+        if i == len(leaf.keys) and leaf.next is not None:
+            # key 未満のキーしか持たない葉ノードでは、key は右隣の葉ノードの先頭にありうる
+            leaf, i = cast("PrefixNode[K]", leaf.next), 0
+        if i < len(leaf.keys) and leaf._full_key(i) == key:
+            return (leaf, i)
+        return None
+
+    def range(
+        self,
+        lo: K | None = None,
+        hi: K | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[K, int]]:
+        """キーが lo から hi の範囲にある (キー, 値) のペアを遅延評価で返します。
+
+        `BPlusTree.range` と同じく葉の連結リストをたどり、各葉ノードのキーに接頭辞を付けて返します。
+        """
+        lo_inclusive, hi_inclusive = inclusive
+        leaf: PrefixNode[K] | None
+        if not reverse:
+            start = lo
+            if lo is None:
+                leaf = self.root
+                while not leaf.is_leaf:
+                    leaf = leaf._child(0)
+            else:
+                leaf = self._find_leaf(lo, right=not lo_inclusive)
+
+            while leaf is not None:
+                keys = leaf._full_keys()
+                i = 0
+                if start is not None:
+                    find = bisect_left if lo_inclusive else bisect_right
+                    i = find(keys, start)
+                    start = None
+                for j in range(i, len(keys)):
+                    key = keys[j]
+                    if hi is not None and (
+                        key > hi or (not hi_inclusive and key == hi)
+                    ):
+                        return
+                    yield (key, leaf.values[j])
+                leaf = cast("PrefixNode[K] | None", leaf.next)
+        else:
+            start = hi
+            if hi is None:
+                leaf = self.root
+                while not leaf.is_leaf:
+                    leaf = leaf._child(-1)
+            else:
+                leaf = self._find_leaf(hi, right=hi_inclusive)
+
+            while leaf is not None:
+                keys = leaf._full_keys()
+                i = len(keys)
+                if start is not None:
+                    find = bisect_right if hi_inclusive else bisect_left
+                    i = find(keys, start)
+                    start = None
+                for j in range(i - 1, -1, -1):
+                    key = keys[j]
+                    if lo is not None and (
+                        key < lo or (not lo_inclusive and key == lo)
+                    ):
+                        return
+                    yield (key, leaf.values[j])
+                leaf = cast("PrefixNode[K] | None", leaf.prev)
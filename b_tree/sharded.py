@@ -0,0 +1,449 @@
+import multiprocessing
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+from multiprocessing.connection import Connection
+from typing import Any
+
+from .b_tree import BTree
+
+# ワーカーで呼び出せる B木のメソッド
+_METHODS = frozenset(
+    [
+        "insert",
+        "update",
+        "delete",
+        "insert_many",
+        "get_many",
+        "delete_many",
+        "delete_range",
+    ]
+)
+
+
+def _serve(conn: Connection, t: int) -> None:
+    """ワーカープロセスで 1 つのシャードの B木を持ち、要求を順に処理します。
+
+    要求は (メソッド名, 引数のタプル) で、None を受け取ると終了します。
+    応答は (成功したかどうか, 戻り値または例外) です。
+    範囲の走査は、開始時のスナップショットをチャンクに分けて返します。
+
+    Args:
+        conn: 親プロセスとつながったパイプ。
+        t: B木の最小次数。
+    """
+    tree: BTree[Any] = BTree(t)
+    scans: dict[int, Iterator[tuple[Any, int]]] = {}
+    next_scan = 0
+    while True:
+        request = conn.recv()
+        if request is None:
+            return
+        method, args = request
+        try:
+            if method == "load":
+                tree = BTree.from_sorted(args[0], t)
+                result: Any = None
+            elif method == "scan":
+                lo, hi, inclusive, reverse, chunk_size = args
+                # 走査の途中で B木が変更されても、開始時の内容を返すようスナップショットを走査する
+                scans[next_scan] = tree.snapshot().range(lo, hi, inclusive, reverse)
+                result = next_scan
+                next_scan += 1
+            elif method == "scan_next":
+                scan_id, chunk_size = args
+                result = list(islice(scans[scan_id], chunk_size))
+                if len(result) < chunk_size:
+                    del scans[scan_id]
+            elif method == "scan_close":
+                scans.pop(args[0], None)
+                result = None
+            elif method == "size":
+                result = tree.stats()["entries"]
+            elif method in _METHODS:
+                result = getattr(tree, method)(*args)
+            else:
+                raise AttributeError(f"シャードは {method} をサポートしていません。")
+        except Exception as exc:
+            conn.send((False, exc))
+        else:
+            conn.send((True, result))
+
+
+class _Shard:
+    """1 つのシャードのワーカープロセスと、そのパイプ。
+
+    要求を送った順に応答が返るため、要求ごとに番号を付け、先に届いた他の要求への応答は
+    取り出されるまで保持します。これにより、走査の途中で他の操作を行っても応答が混ざりません。
+    """
+
+    def __init__(self, context: Any, t: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn, t), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self._sent = 0
+        self._received = 0
+        self._replies: dict[int, tuple[bool, Any]] = {}
+
+    def send(self, method: str, *args: Any) -> int:
+        """要求を送り、応答を受け取るための番号を返します。"""
+        self.conn.send((method, args))
+        ticket = self._sent
+        self._sent += 1
+        return ticket
+
+    def receive(self, ticket: int) -> Any:
+        """番号の要求への応答を受け取ります。ワーカーで発生した例外はここで送出します。"""
+        while ticket not in self._replies:
+            self._replies[self._received] = self.conn.recv()
+            self._received += 1
+        ok, result = self._replies.pop(ticket)
+        if not ok:
+            raise result
+        return result
+
+    def close(self) -> None:
+        """ワーカープロセスを終了します。"""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+class ShardedBTree[T]:
+    """キー空間を範囲で分割し、各範囲を別のワーカープロセスの `BTree` が持つ B木。
+
+    boundaries[i] は i+1 番目のシャードの最小のキーで、キーは bisect_right で
+    シャードに振り分けます。一括操作は入力をシャードごとに分けてすべてのシャードへ
+    先に送ってから応答を待つため、各シャードの処理は別々のコアで並列に進みます。
+    範囲の走査は、範囲に重なるすべてのシャードで同時に走査を始め、シャードの順に
+    チャンクを受け取りながら返すため、キーの順に並びます。
+
+    キーと値は pickle でプロセス間を受け渡すため、pickle できる型である必要があります。
+    使い終わったら `close` を呼ぶか、with 文で使用してください。
+
+    Attributes:
+        t (int): 各シャードの B木の最小次数。
+        boundaries (list[T]): シャードの境界のキーのリスト。シャード数より 1 つ少ない数です。
+        chunk_size (int): 範囲の走査で、1 回に受け取るペアの数。
+    """
+
+    def __init__(
+        self,
+        t: int,
+        boundaries: Sequence[T] = (),
+        mp_context: Any = None,
+        chunk_size: int = 4096,
+    ):
+        """シャードのワーカープロセスを起動します。
+
+        Args:
+            t: 各シャードの B木の最小次数。
+            boundaries: シャードの境界のキーの、昇順で重複のない列。空の場合はシャードが 1 つです。
+            mp_context: ワーカープロセスの起動に使う multiprocessing のコンテキスト。
+                None の場合は既定のコンテキストを使います。
+            chunk_size: 範囲の走査で、1 回に受け取るペアの数。
+
+        Raises:
+            ValueError: t・chunk_size が範囲外の場合、または boundaries が昇順で重複がない列でない場合。
+        """
+        if t < 2:
+            raise ValueError("B木の最小次数 t は 2 以上である必要があります。")
+        if chunk_size < 1:
+            raise ValueError("chunk_size は 1 以上である必要があります。")
+        bounds: list[Any] = list(boundaries)
+        if any(b >= a for a, b in zip(bounds[1:], bounds, strict=False)):
+            raise ValueError("boundaries は昇順で重複がない必要があります。")
+        self.t = t
+        self.boundaries: list[T] = bounds
+        self.chunk_size = chunk_size
+        context = mp_context or multiprocessing.get_context()
+        self._shards: list[_Shard] = []
+        try:
+            for _ in range(len(bounds) + 1):
+                self._shards.append(_Shard(context, t))
+        except BaseException:
+            self.close()
+            raise
+
+    @classmethod
+    def from_sorted(
+        cls,
+        iterable: Iterable[tuple[T, int]],
+        t: int,
+        shards: int | None = None,
+        mp_context: Any = None,
+    ) -> "ShardedBTree[T]":
+        """キーでソート済みの (キー, 値) の列を、ペアの数が均等なシャードに分けて並列に構築します。
+
+        各シャードは `BTree.from_sorted` で構築します。同じキーのペアは同じシャードに入ります。
+
+        Args:
+            iterable: キーの昇順に並んだ (キー, 値) のペアの列。
+            t: 各シャードの B木の最小次数。
+            shards: シャードの数。None の場合は CPU の数です。
+            mp_context: ワーカープロセスの起動に使う multiprocessing のコンテキスト。
+
+        Returns:
+            構築した B木。
+
+        Raises:
+            ValueError: shards が 1 未満の場合、または入力がソートされていない場合。
+        """
+        if shards is None:
+            shards = multiprocessing.cpu_count()
+        if shards < 1:
+            raise ValueError("shards は 1 以上である必要があります。")
+        pairs = list(iterable)
+        keys: list[Any] = [key for key, _ in pairs]
+        if any(b < a for a, b in zip(keys, keys[1:], strict=False)):
+            raise ValueError("from_sorted の入力はキーの昇順である必要があります。")
+
+        # 同じキーのペアが 2 つのシャードに分かれないよう、境界はそのキーの最初のペアにそろえる
+        starts = [0]
+        for s in range(1, shards):
+            start = bisect_left(keys, keys[len(keys) * s // shards]) if keys else 0
+            if start > starts[-1]:
+                starts.append(start)
+        tree: ShardedBTree[T] = cls(
+            t, [keys[start] for start in starts[1:]], mp_context
+        )
+        ends = starts[1:] + [len(pairs)]
+        tree._call_each(
+            {
+                i: ("load", pairs[start:end])
+                for i, (start, end) in enumerate(zip(starts, ends, strict=True))
+            }
+        )
+        return tree
+
+    def _shard_of(self, key: T) -> int:
+        """キーを持つシャードのインデックスを返します。"""
+        bounds: list[Any] = self.boundaries
+        index: int = bisect_right(bounds, key)
+        return index
+
+    def _call_each(self, requests: dict[int, tuple[Any, ...]]) -> dict[int, Any]:
+        """シャードごとの要求をすべて送ってから、応答を受け取ります。
+
+        Args:
+            requests: シャードのインデックスから (メソッド名, 引数...) のタプルへの辞書。
+
+        Returns:
+            シャードのインデックスから戻り値への辞書。
+        """
+        tickets = {
+            i: self._shards[i].send(method, *args)
+            for i, (method, *args) in requests.items()
+        }
+        results: dict[int, Any] = {}
+        error: BaseException | None = None
+        # 例外が発生しても、他のシャードの応答は受け取っておく
+        for i, ticket in tickets.items():
+            try:
+                results[i] = self._shards[i].receive(ticket)
+            except Exception as exc:
+                error = error or exc
+        if error is not None:
+            raise error
+        return results
+
+    def _group(self, keys: list[T]) -> dict[int, list[int]]:
+        """入力の位置を、キーを持つシャードごとにまとめます。"""
+        groups: dict[int, list[int]] = {}
+        for pos, key in enumerate(keys):
+            groups.setdefault(self._shard_of(key), []).append(pos)
+        return groups
+
+    def insert(self, key: T, value: int) -> None:
+        """キーと値のペアを、キーを持つシャードに挿入します。"""
+        self._call_each({self._shard_of(key): ("insert", key, value)})
+
+    def update(self, key: T, value: int) -> bool:
+        """既存のキーの値を更新します。`BTree.update` と同じです。"""
+        shard = self._shard_of(key)
+        updated: bool = self._call_each({shard: ("update", key, value)})[shard]
+        return updated
+
+    def delete(self, key: T) -> bool:
+        """キーを削除します。`BTree.delete` と同じです。"""
+        shard = self._shard_of(key)
+        deleted: bool = self._call_each({shard: ("delete", key)})[shard]
+        return deleted
+
+    def get(self, key: T) -> int | None:
+        """キーに対応する値を返します。キーが見つからなかった場合は None。"""
+        shard = self._shard_of(key)
+        value: int | None = self._call_each({shard: ("get_many", [key])})[shard][0]
+        return value
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """複数のペアをシャードごとに分け、各シャードの `BTree.insert_many` で並列に挿入します。"""
+        batches: dict[int, list[tuple[T, int]]] = {}
+        for pair in pairs:
+            batches.setdefault(self._shard_of(pair[0]), []).append(pair)
+        self._call_each({i: ("insert_many", batch) for i, batch in batches.items()})
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        """複数のキーをシャードごとに分け、各シャードの `BTree.get_many` で並列に検索します。
+
+        Args:
+            keys: 検索するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの値のリスト。キーが見つからなかった場合は None。
+        """
+        key_list = list(keys)
+        groups = self._group(key_list)
+        replies = self._call_each(
+            {
+                i: ("get_many", [key_list[pos] for pos in group])
+                for i, group in groups.items()
+            }
+        )
+        results: list[int | None] = [None] * len(key_list)
+        for i, group in groups.items():
+            for pos, value in zip(group, replies[i], strict=True):
+                results[pos] = value
+        return results
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        """複数のキーをシャードごとに分け、各シャードの `BTree.delete_many` で並列に削除します。
+
+        Args:
+            keys: 削除するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの削除が成功したかどうかのリスト。
+        """
+        key_list = list(keys)
+        groups = self._group(key_list)
+        replies = self._call_each(
+            {
+                i: ("delete_many", [key_list[pos] for pos in group])
+                for i, group in groups.items()
+            }
+        )
+        results = [False] * len(key_list)
+        for i, group in groups.items():
+            for pos, deleted in zip(group, replies[i], strict=True):
+                results[pos] = deleted
+        return results
+
+    def delete_range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+    ) -> int:
+        """範囲内のペアを、範囲に重なるシャードで並列に削除します。`BTree.delete_range` と同じです。"""
+        replies = self._call_each(
+            dict.fromkeys(
+                self._overlapping(lo, hi), ("delete_range", lo, hi, inclusive)
+            )
+        )
+        return sum(replies.values())
+
+    def _overlapping(self, lo: T | None, hi: T | None) -> range:
+        """キーの範囲に重なるシャードのインデックスを返します。"""
+        first = 0 if lo is None else self._shard_of(lo)
+        last = len(self._shards) - 1 if hi is None else self._shard_of(hi)
+        return range(first, max(first, last) + 1)
+
+    def __len__(self) -> int:
+        """すべてのシャードのペアの数の合計を返します。"""
+        return sum(self.shard_sizes())
+
+    def shard_sizes(self) -> list[int]:
+        """各シャードのペアの数を、シャードの順に返します。"""
+        replies = self._call_each(dict.fromkeys(range(len(self._shards)), ("size",)))
+        return [replies[i] for i in range(len(self._shards))]
+
+    def __iter__(self) -> Iterator[T]:
+        """キーを昇順に返すイテレータを返します。"""
+        return (key for key, _ in self.range())
+
+    def items(self) -> Iterator[tuple[T, int]]:
+        """(キー, 値) のペアをキーの昇順に遅延評価で返します。"""
+        return self.range()
+
+    def range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[T, int]]:
+        """キーが lo から hi の範囲にある (キー, 値) のペアを遅延評価で返します。
+
+        範囲に重なるすべてのシャードで同時に最初のチャンクを用意させ、シャードの順
+        (reverse の場合は逆順) に返します。あるシャードのチャンクを返している間に、
+        そのシャードの次のチャンクを先に要求します。各シャードは走査を開始した時点の
+        スナップショットを走査します。
+
+        Args:
+            lo: 範囲の下限。None の場合は下限なし。
+            hi: 範囲の上限。None の場合は上限なし。
+            inclusive: (下限を含むか, 上限を含むか) のタプル。
+            reverse: True の場合はキーの降順に返します。
+
+        Yields:
+            範囲内の (キー, 値) のタプル。
+        """
+        order = list(self._overlapping(lo, hi))
+        if reverse:
+            order.reverse()
+        size = self.chunk_size
+        scans = self._call_each(
+            dict.fromkeys(order, ("scan", lo, hi, inclusive, reverse, size))
+        )
+        # 各シャードの最初のチャンクを先に要求し、並列に用意させる
+        pending = {i: self._shards[i].send("scan_next", scans[i], size) for i in order}
+        # 最後のチャンクまで受け取っておらず、ワーカーで走査が開いているシャード
+        unfinished = set(order)
+        try:
+            for i in order:
+                shard = self._shards[i]
+                while True:
+                    chunk = shard.receive(pending.pop(i))
+                    if len(chunk) == size:
+                        pending[i] = shard.send("scan_next", scans[i], size)
+                    else:
+                        unfinished.discard(i)
+                    yield from chunk
+                    if len(chunk) < size:
+                        break
+        finally:
+            # 途中で走査をやめた場合は、受け取っていない応答を捨て、ワーカーの走査を閉じる。
+            # 例外が発生しても、残りのシャードの走査は閉じておく
+            error: BaseException | None = None
+            for i in order:
+                if i not in unfinished:
+                    continue
+                shard = self._shards[i]
+                try:
+                    if i in pending:
+                        shard.receive(pending[i])
+                except Exception as exc:
+                    error = error or exc
+                try:
+                    shard.receive(shard.send("scan_close", scans[i]))
+                except Exception as exc:
+                    error = error or exc
+            if error is not None:
+                raise error
+
+    def close(self) -> None:
+        """すべてのワーカープロセスを終了します。"""
+        for shard in self._shards:
+            shard.close()
+        self._shards = []
+
+    def __enter__(self) -> "ShardedBTree[T]":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
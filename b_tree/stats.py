@@ -0,0 +1,94 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from .node import Node, _get_key
+
+
+class OperationCounters:
+    """`count_operations` が集計する、B木の内部の操作の回数。
+
+    Attributes:
+        comparisons (int): ノード内の探索の二分探索で、キーを取り出して比較した回数。
+        node_visits (int): ノード内で挿入位置またはキーの位置を探した回数。
+        splits (int): `Node.split_child` の呼び出し回数。
+        right_splits (int): 追記の高速化で、満杯のノードを残して右に空のノードを作った回数。
+            1 回の追記で複数のレベルを分割した場合は、レベルごとに数えます。
+        appends (int): 追記の高速化によって、ルートから降りずに右端の葉へ挿入した回数。
+        merges (int): `Node._merge_children` の呼び出し回数。
+        borrows_from_prev (int): `Node._borrow_from_prev` の呼び出し回数。
+        borrows_from_next (int): `Node._borrow_from_next` の呼び出し回数。
+        root_grows (int): 変更操作によって木の高さが増えた回数。
+        root_shrinks (int): 変更操作によって木の高さが減った回数。
+    """
+
+    def __init__(self) -> None:
+        self.comparisons = 0
+        self.node_visits = 0
+        self.splits = 0
+        self.right_splits = 0
+        self.appends = 0
+        self.merges = 0
+        self.borrows_from_prev = 0
+        self.borrows_from_next = 0
+        self.root_grows = 0
+        self.root_shrinks = 0
+        # `count_operations` を開始したスレッド。他のスレッドの操作は数えない
+        self._thread = threading.get_ident()
+
+    def as_dict(self) -> dict[str, int]:
+        """各カウンタの値を辞書で返します。"""
+        return {
+            name: value
+            for name, value in vars(self).items()
+            if not name.startswith("_")
+        }
+
+    def _add(self, counter: str, amount: int = 1) -> None:
+        """`Node` と `BTree` のフックから呼ばれ、counter の値を amount だけ増やします。"""
+        if threading.get_ident() == self._thread:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _counting_key(self, kv_pair: Any) -> Any:
+        """比較の回数を数える、`Node` の二分探索のキー関数。"""
+        if threading.get_ident() == self._thread:
+            self.comparisons += 1
+        return _get_key(kv_pair)
+
+    def _count_height_change(self, height_change: int) -> None:
+        """`BTree._replace_root` のフックから呼ばれ、木の高さの変化を数えます。"""
+        if threading.get_ident() != self._thread:
+            return
+        if height_change > 0:
+            self.root_grows += height_change
+        else:
+            self.root_shrinks -= height_change
+
+
+@contextmanager
+def count_operations() -> Iterator[OperationCounters]:
+    """ブロックの実行中に、このスレッドが行った B木の内部の操作の回数を数えます。
+
+    ブロックの間だけ `Node._counters` にカウンタを設定し、抜けるときに None に戻します。
+    `Node` の探索・分割・マージ・借用と `BTree._replace_root` は、カウンタが None のときは
+    属性を 1 つ確認するだけで何もしないため、カウンタを使っていないときの性能にはほとんど影響しません。
+    カウンタは同じプロセスのすべての B木に対して有効ですが、ブロックを開始したスレッド以外の操作は数えません。
+    比較の回数は `Node` のノード内の探索 (キーの位置と挿入位置) で数え、一括操作のソートや範囲の走査の
+    二分探索は含みません。`BTree.append_optimized` による追記はルートから降りないため、
+    node_visits と splits ではなく appends と right_splits で数えます。`BPlusTree` / `CompactBTree` のように `Node` を使わない実装は数えられません。
+
+    Yields:
+        ブロックの実行中に値が増えていくカウンタ。
+
+    Raises:
+        RuntimeError: すでに別の `count_operations` のブロックを実行中の場合。
+    """
+    if Node._counters is not None:
+        raise RuntimeError("count_operations は入れ子にできません。")
+    counters = OperationCounters()
+    Node._counters = counters
+    try:
+        yield counters
+    finally:
+        Node._counters = None
@@ -0,0 +1,293 @@
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from typing import Any, TypeVar
+
+from .b_tree import BTree, BTreeSnapshot
+from .node import KeyValuePair, Node, _get_key
+
+T = TypeVar("T")
+
+# 削除済みのペアの値。削除したペアは、この値を持つ同じキーのペアに置き換える
+_DEAD: Any = object()
+
+
+class TombstoneBTree(BTree[T]):
+    """削除したペアを墓標 (tombstone) として残し、まとめて取り除く B木。
+
+    `delete` はキーを検索してペアを墓標に置き換えるだけで、先行者・後続者との交換や
+    兄弟からの借用・マージを行いません。検索と走査は墓標を読み飛ばします。
+    墓標の数がペア全体の compact_ratio 倍を超えると、生きているペアだけで
+    ツリーを組み直す (`compact`) ため、削除 1 回あたりの再構築のコストは O(1/compact_ratio) です。
+
+    Attributes:
+        compact_ratio (float): `compact` を実行する、墓標の数のペア全体に対する割合。
+    """
+
+    def __init__(self, t: int, compact_ratio: float = 0.25):
+        """B木を初期化します。
+
+        Args:
+            t: B木の最小次数。
+            compact_ratio: `compact` を実行する、墓標の数のペア全体に対する割合。0 < compact_ratio <= 1。
+
+        Raises:
+            ValueError: t または compact_ratio が範囲外の場合。
+        """
+        super().__init__(t)
+        if not 0 < compact_ratio <= 1:
+            raise ValueError(
+                "compact_ratio は 0 より大きく 1 以下である必要があります。"
+            )
+        self.compact_ratio = compact_ratio
+        self._dead = 0
+        # 墓標を含むペアの数。分割・連結・一括構築の後は不明 (None) で、必要になったときに数える
+        self._entries: int | None = None
+
+    @property
+    def dead_entries(self) -> int:
+        """まだ取り除かれていない墓標の数。"""
+        return self._dead
+
+    def _find_live(self, key: T, writable: bool) -> tuple[Node[T], int] | None:
+        """key を持つ生きているペアを探します。
+
+        重複したキーの墓標に当たるまでは、`BTree.search` と同じく 1 本のパスを下るだけです。
+
+        Args:
+            key: 探すキー。
+            writable: True の場合、ペアを置き換えられるよう、たどったノードを変更してよい状態にします。
+
+        Returns:
+            見つかった場合は (ノード, ペアのインデックス) のタプル、見つからなかった場合は None。
+        """
+        # T は比較の型を持たないため、bisect には Any として渡す
+        probe: Any = key
+        node = self._writable_root() if writable else self.root
+        while True:
+            items = node.items
+            i = bisect_left(items, probe, key=_get_key)
+            if i < len(items) and items[i].key == key:
+                if items[i].value is not _DEAD:
+                    return node, i
+                # 同じキーの墓標に当たった場合は、重複したキーを前後の子ノードまで探す
+                return self._find_live_in(node, key, i, writable)
+            if node.is_leaf:
+                return None
+            node = node._writable_child(i) if writable else node.children[i]
+
+    def _find_live_in(
+        self, node: Node[T], key: T, i: int, writable: bool
+    ) -> tuple[Node[T], int] | None:
+        """node の i 番目以降の key と同じキーのペアと、その間の子ノードから生きているペアを探します。"""
+        items = node.items
+        j = i
+        while j < len(items) and items[j].key == key:
+            if items[j].value is not _DEAD:
+                return node, j
+            j += 1
+        if node.is_leaf:
+            return None
+        probe: Any = key
+        for c in range(i, j + 1):
+            child = node._writable_child(c) if writable else node.children[c]
+            c_items = child.items
+            found = self._find_live_in(
+                child,
+                key,
+                bisect_left(c_items, probe, key=_get_key),
+                writable,
+            )
+            if found is not None:
+                return found
+        return None
+
+    def search(self, key: T) -> tuple[Node[T], int] | None:
+        """キーを検索します。墓標は見つかりません。`BTree.search` と同じです。"""
+        return self._find_live(key, writable=False)
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        key_list = list(keys)
+        results: list[int | None] = super().get_many(key_list)
+        for pos, value in enumerate(results):
+            # 最初に見つかったペアが墓標の場合は、重複した生きているペアを探し直す
+            if value is _DEAD:
+                found = self._find_live(key_list[pos], writable=False)
+                results[pos] = None if found is None else found[0].items[found[1]].value
+        return results
+
+    def update(self, key: T, value: int) -> bool:
+        found = self._find_live(key, writable=self._owner is not None)
+        if found is None:
+            return False
+        node, idx = found
+        if self._owner is None:
+            node.items[idx].value = value
+        else:
+            # スナップショットとペアを共有している可能性があるため、ペアを置き換える
+            node.items[idx] = KeyValuePair(key, value)
+        return True
+
+    def insert(self, key: T, value: int) -> None:
+        super().insert(key, value)
+        if self._entries is not None:
+            self._entries += 1
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        pair_list = list(pairs)
+        super().insert_many(pair_list)
+        if self._entries is not None:
+            self._entries += len(pair_list)
+
+    def delete(self, key: T) -> bool:
+        """キーを持つペアを墓標に置き換えます。
+
+        墓標の割合が compact_ratio を超えた場合は `compact` を実行します。
+
+        Args:
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+        """
+        deleted = self._mark_dead(key)
+        if deleted:
+            self._compact_if_needed()
+        return deleted
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        """複数のキーを墓標に置き換え、最後に 1 回だけ `compact` が必要かを確認します。"""
+        results = [self._mark_dead(key) for key in keys]
+        self._compact_if_needed()
+        return results
+
+    def _mark_dead(self, key: T) -> bool:
+        """key を持つ生きているペアを墓標に置き換えます。"""
+        owned = self._owner is not None
+        found = self._find_live(key, writable=owned)
+        if found is None:
+            return False
+        node, idx = found
+        if owned:
+            # スナップショットとペアを共有している可能性があるため、ペアを置き換える
+            node.items[idx] = KeyValuePair(key, _DEAD)
+        else:
+            node.items[idx].value = _DEAD
+        self._dead += 1
+        return True
+
+    def _compact_if_needed(self) -> None:
+        """墓標の割合が compact_ratio を超えていれば `compact` を実行します。"""
+        if not self._dead:
+            return
+        if self._entries is None:
+            self._entries = super()._count_entries()
+        if self._dead > self.compact_ratio * self._entries:
+            self.compact()
+
+    def compact(self) -> None:
+        """墓標を取り除き、生きているペアだけでツリーを組み直します。
+
+        ペアを昇順に 1 回走査して、`load` と同じレベルごとの一括構築で O(n) で組み直します。
+        """
+        self._settle()
+        live = list(self._iter_range(None, None, (True, True), False))
+        self.root = BTree._from_sorted_pairs(live, self.t).root
+        if self._owner is not None:
+            # ペアはスナップショットと共有しているため、update がペアを置き換えるよう世代を保つ
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                node.owner = self._owner
+                stack.extend(node.children)
+        self._dead = 0
+        self._entries = len(live)
+
+    def delete_range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+    ) -> int:
+        """範囲内のペアを取り除きます。`BTree.delete_range` と同じです。
+
+        削除した数に墓標を含めないよう、墓標がある場合は先に `compact` を実行します。
+        """
+        if self._dead:
+            self.compact()
+        removed: int = super().delete_range(lo, hi, inclusive)
+        if self._entries is not None:
+            self._entries -= removed
+        return removed
+
+    def split_at(self, key: T) -> tuple["BTree[T]", "BTree[T]"]:
+        """キーで 2 つの B木に分割します。`BTree.split_at` と同じです。
+
+        分割後の墓標の数を数えずに済むよう、墓標がある場合は先に、この B木自身に対して
+        `compact` を実行します。内容は変わりませんが、この B木はツリーを組み直し、
+        `dead_entries` は 0 になります。
+        """
+        if self._dead:
+            self.compact()
+        left, right = super().split_at(key)
+        for part in (left, right):
+            if isinstance(part, TombstoneBTree):
+                part.compact_ratio = self.compact_ratio
+        return left, right
+
+    @staticmethod
+    def join(left: "BTree[T]", right: "BTree[T]") -> "BTree[T]":
+        """2 つの B木を連結します。`BTree.join` と同じです。
+
+        連結後の墓標の数を数えずに済むよう、墓標がある入力の B木は先にその B木自身に対して
+        `compact` を実行します。入力の内容は変わりませんが、ツリーを組み直し、`dead_entries` は 0 になります。
+        """
+        for tree in (left, right):
+            if isinstance(tree, TombstoneBTree) and tree._dead:
+                tree.compact()
+        return BTree.join(left, right)
+
+    def snapshot(self) -> "TombstoneSnapshot[T]":
+        """墓標を読み飛ばす、読み込み専用のスナップショットを作成します。`BTree.snapshot` と同じです。"""
+        self._settle()
+        view: TombstoneSnapshot[T] = TombstoneSnapshot.__new__(TombstoneSnapshot)
+        view.root = self.root
+        view.t = self.t
+        view.compact_ratio = self.compact_ratio
+        view._dead = self._dead
+        view._entries = self._entries
+        self._share()
+        return view
+
+    def _iter_range(
+        self,
+        lo: T | None,
+        hi: T | None,
+        inclusive: tuple[bool, bool],
+        reverse: bool,
+    ) -> Iterator[KeyValuePair[T]]:
+        for kv_pair in super()._iter_range(lo, hi, inclusive, reverse):
+            if kv_pair.value is not _DEAD:
+                yield kv_pair
+
+    def _count_entries(self) -> int:
+        """墓標を除いたペアの数を数えます。"""
+        return sum(1 for _ in self._iter_range(None, None, (True, True), False))
+
+    def stats(self) -> dict[str, Any]:
+        """`BTree.stats` に、墓標の数 (dead_entries) を加えた統計を返します。
+
+        entries とレベルごとの統計は、墓標を含むペアの数です。
+        """
+        stats: dict[str, Any] = super().stats()
+        stats["dead_entries"] = self._dead
+        return stats
+
+
+class TombstoneSnapshot(BTreeSnapshot[T], TombstoneBTree[T]):
+    """`TombstoneBTree.snapshot` が返す、墓標を読み飛ばす読み込み専用のビュー。"""
+
+    compact = BTreeSnapshot._read_only
+
+    def snapshot(self) -> "TombstoneSnapshot[T]":
+        """スナップショットは変更されないため、自分自身を返します。"""
+        return self
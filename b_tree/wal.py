@@ -0,0 +1,433 @@
+import os
+import struct
+import zlib
+from collections.abc import Iterable, Iterator
+from types import TracebackType
+from typing import Any, BinaryIO
+
+from .b_tree import BTree
+from .codec import decode_key, encode_key
+from .node import Node
+
+# ログの操作の種類
+OP_INSERT = 1
+OP_UPDATE = 2
+OP_DELETE = 3
+
+# ログレコードの形式: 本体の長さ, 本体の CRC32, 本体 (LSN, 操作, キー, 値)
+_RECORD_HEADER = struct.Struct("<II")
+_RECORD_PREFIX = struct.Struct("<QB")
+_VALUE = struct.Struct("<q")
+
+# スナップショットの形式: マジック, 含まれる最後の LSN。続いて `BTree.dump` の内容が並ぶ
+_SNAPSHOT_HEADER = struct.Struct("<8sQ")
+_SNAPSHOT_MAGIC = b"BTSNAP01"
+
+SNAPSHOT_FILE = "snapshot.bin"
+LOG_FILE = "wal.log"
+
+
+class WriteAheadLog:
+    """変更操作を追記していくログファイル。
+
+    各レコードは LSN (ログシーケンス番号) と操作、キー、値を持ち、CRC32 で保護されます。
+    レコードはメモリ上にためておき、group_size 件ごとにまとめて書き込んで fsync します (グループコミット)。
+    クラッシュで末尾のレコードが途中までしか書かれていない場合、開くときにその手前で切り詰めます。
+
+    Attributes:
+        path (str): ログファイルのパス。
+        group_size (int): まとめて fsync するレコード数。
+        last_lsn (int): 最後に追加したレコードの LSN。
+    """
+
+    def __init__(self, path: str, group_size: int = 1):
+        """ログファイルを開きます。ファイルが存在しない場合は新しく作成します。
+
+        Args:
+            path: ログファイルのパス。
+            group_size: まとめて fsync するレコード数。1 の場合は毎回 fsync します。
+        """
+        if group_size < 1:
+            raise ValueError("group_size は 1 以上である必要があります。")
+        self.path = path
+        self.group_size = group_size
+        self.last_lsn = 0
+        self._pending: list[bytes] = []
+        self._file = open(path, "a+b")
+
+    def replay(self) -> Iterator[tuple[int, int, Any, int | None]]:
+        """ログファイル内の有効なレコードを先頭から順に返します。
+
+        壊れたレコードや途中までしか書かれていないレコードが見つかった場合は、
+        その位置でファイルを切り詰めて終了します。
+
+        Yields:
+            (LSN, 操作, キー, 値) のタプル。削除の場合、値は None。
+        """
+        self._file.seek(0)
+        data = self._file.read()
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, crc = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            body = data[start : start + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break
+            lsn, op = _RECORD_PREFIX.unpack_from(body)
+            key, pos = decode_key(body, _RECORD_PREFIX.size)
+            value = _VALUE.unpack_from(body, pos)[0] if op != OP_DELETE else None
+            self.last_lsn = lsn
+            yield lsn, op, key, value
+            offset = start + length
+
+        if offset < len(data):
+            self._file.truncate(offset)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    @staticmethod
+    def encode(key: Any, value: int | None = None) -> bytes:
+        """レコードのキーと値の部分をバイト列に変換します。
+
+        Args:
+            key: 操作の対象のキー。
+            value: 挿入・更新する値。削除の場合は None。
+
+        Returns:
+            `append_encoded` に渡すバイト列。
+
+        Raises:
+            TypeError: キーが対応していない型の場合、または値が 64 ビットに収まる int でない場合。
+        """
+        payload: bytes = encode_key(key)
+        if value is None:
+            return payload
+        try:
+            return payload + _VALUE.pack(value)
+        except struct.error:
+            raise TypeError("値は 64 ビットに収まる int である必要があります。")
+
+    def append(self, op: int, key: Any, value: int | None = None) -> int:
+        """レコードを追加します。group_size 件たまった場合はファイルに書き込んで fsync します。
+
+        Args:
+            op: 操作の種類。
+            key: 操作の対象のキー。
+            value: 挿入・更新する値。削除の場合は None。
+
+        Returns:
+            追加したレコードの LSN。
+
+        Raises:
+            TypeError: キーが対応していない型の場合、または値が 64 ビットに収まる int でない場合。
+        """
+        return self.append_encoded(op, self.encode(key, value))
+
+    def append_encoded(self, op: int, payload: bytes) -> int:
+        """`encode` で変換したキーと値の部分からレコードを作成して追加します。
+
+        Args:
+            op: 操作の種類。
+            payload: `encode` で変換したバイト列。
+
+        Returns:
+            追加したレコードの LSN。
+        """
+        self.last_lsn += 1
+        body = _RECORD_PREFIX.pack(self.last_lsn, op) + payload
+        self._pending.append(_RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body)
+        if len(self._pending) >= self.group_size:
+            self.commit()
+        return self.last_lsn
+
+    def commit(self) -> None:
+        """ためているレコードをファイルに書き込み、fsync します。"""
+        if not self._pending:
+            return
+        self._file.write(b"".join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending.clear()
+
+    def reset(self) -> None:
+        """ログファイルを空にします。LSN は引き続き増加します。"""
+        self.commit()
+        self._file.truncate(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def size(self) -> int:
+        """ファイルに書き込まれたログのバイト数を返します。"""
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self) -> None:
+        """ためているレコードを書き込んでファイルを閉じます。"""
+        self.commit()
+        self._file.close()
+
+
+def _fsync_directory(path: str) -> None:
+    """ディレクトリのエントリの変更 (リネームなど) をディスクに同期します。"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DurableBTree[T]:
+    """変更を先行書き込みログで永続化する B木。
+
+    B木自体はメモリ上にあり、insert / update / delete のたびにログへ小さなレコードを追記します。
+    レコードは B木に適用する前に変換するため、ログに書けないキーや値の操作は B木を変更せずに
+    TypeError になります。変換したレコードは、B木への適用が成功してからログに追加します
+    (比較できない型のキーなどで適用に失敗した操作をログに残すと、復元のたびに同じ例外が起きるため)。
+    group_size が 1 の場合、各操作はログが fsync されてから戻ります。
+    ログが checkpoint_every 件を超えると、木全体をスナップショットに書き出してログを空にします (チェックポイント)。
+    開くときはスナップショットを一括構築で読み込み、スナップショットより新しいログのレコードを再適用します。
+
+    キーは int (64 ビット)、str、bytes のいずれかである必要があります。
+
+    Attributes:
+        directory (str): スナップショットとログを格納するディレクトリ。
+        tree (BTree[T]): メモリ上の B木。
+        log (WriteAheadLog): 先行書き込みログ。
+        checkpoint_every (int): チェックポイントを行うまでのログのレコード数。
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        t: int,
+        group_size: int = 1,
+        checkpoint_every: int = 100_000,
+    ):
+        """ディレクトリ内のスナップショットとログから B木を復元します。
+
+        Args:
+            directory: スナップショットとログを格納するディレクトリ。存在しない場合は作成します。
+            t: B木の最小次数。
+            group_size: まとめて fsync するログのレコード数。
+            checkpoint_every: チェックポイントを行うまでのログのレコード数。
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+
+        snapshot_lsn = 0
+        if os.path.exists(self._snapshot_path):
+            self.tree, snapshot_lsn = self._read_snapshot(t)
+        else:
+            self.tree = BTree(t)
+
+        self.log = WriteAheadLog(os.path.join(directory, LOG_FILE), group_size)
+        self._records_since_checkpoint = 0
+        for lsn, op, key, value in self.log.replay():
+            # チェックポイントの直後にクラッシュした場合、スナップショットに含まれるレコードが残っている
+            if lsn <= snapshot_lsn:
+                continue
+            self._apply(op, key, value)
+            self._records_since_checkpoint += 1
+        self.log.last_lsn = max(self.log.last_lsn, snapshot_lsn)
+
+    def _apply(self, op: int, key: Any, value: int | None) -> None:
+        """ログのレコードを B木に適用します。"""
+        if op == OP_INSERT:
+            assert value is not None
+            self.tree.insert(key, value)
+        elif op == OP_UPDATE:
+            assert value is not None
+            self.tree.update(key, value)
+        elif op == OP_DELETE:
+            self.tree.delete(key)
+        else:
+            raise ValueError(f"不明なログの操作です: {op}")
+
+    def _log(self, op: int, payloads: list[bytes]) -> None:
+        """B木に適用した操作のレコードをログに追加し、必要であればチェックポイントを行います。
+
+        チェックポイントはすべてのレコードを追加した後に行うため、
+        スナップショットに含まれる操作がチェックポイントの後のログに残ることはありません。
+
+        Args:
+            op: 操作の種類。
+            payloads: `WriteAheadLog.encode` で変換した、各レコードのキーと値の部分。
+        """
+        for payload in payloads:
+            self.log.append_encoded(op, payload)
+        self._records_since_checkpoint += len(payloads)
+        if self._records_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def insert(self, key: T, value: int) -> None:
+        """キーと値のペアを挿入し、ログに記録します。
+
+        Args:
+            key: 挿入するキー。
+            value: 挿入する値。
+
+        Raises:
+            TypeError: キーが対応していない型の場合、または値が 64 ビットに収まる int でない場合。
+        """
+        payload = self.log.encode(key, value)
+        self.tree.insert(key, value)
+        self._log(OP_INSERT, [payload])
+
+    def update(self, key: T, value: int) -> bool:
+        """既存のキーの値を更新し、ログに記録します。
+
+        Args:
+            key: 更新するキー。
+            value: 新しい値。
+
+        Returns:
+            更新が成功した場合はTrue、キーが見つからなかった場合はFalse。
+
+        Raises:
+            TypeError: キーが対応していない型の場合、または値が 64 ビットに収まる int でない場合。
+        """
+        payload = self.log.encode(key, value)
+        if not self.tree.update(key, value):
+            return False
+        self._log(OP_UPDATE, [payload])
+        return True
+
+    def delete(self, key: T) -> bool:
+        """キーを削除し、ログに記録します。
+
+        Args:
+            key: 削除するキー。
+
+        Returns:
+            削除が成功した場合は True、キーが見つからなかった場合は False。
+
+        Raises:
+            TypeError: キーが対応していない型の場合。
+        """
+        payload = self.log.encode(key)
+        if not self.tree.delete(key):
+            return False
+        self._log(OP_DELETE, [payload])
+        return True
+
+    def insert_many(self, pairs: Iterable[tuple[T, int]]) -> None:
+        """複数のキーと値のペアを一括で挿入し、ログに記録します。
+
+        すべてのペアをレコードに変換してから挿入するため、変換できないペアがある場合は何も挿入しません。
+
+        Args:
+            pairs: 挿入する (キー, 値) のペアの列。
+
+        Raises:
+            TypeError: キーが対応していない型の場合、または値が 64 ビットに収まる int でない場合。
+        """
+        batch = list(pairs)
+        payloads = [self.log.encode(key, value) for key, value in batch]
+        self.tree.insert_many(batch)
+        self._log(OP_INSERT, payloads)
+
+    def delete_many(self, keys: Iterable[T]) -> list[bool]:
+        """複数のキーを一括で削除し、削除できたキーをログに記録します。
+
+        Args:
+            keys: 削除するキーの列。
+
+        Returns:
+            入力の順序で並んだ、各キーの削除が成功したかどうかのリスト。
+
+        Raises:
+            TypeError: キーが対応していない型の場合。
+        """
+        key_list = list(keys)
+        payloads = [self.log.encode(key) for key in key_list]
+        results: list[bool] = self.tree.delete_many(key_list)
+        self._log(
+            OP_DELETE,
+            [
+                payload
+                for payload, deleted in zip(payloads, results, strict=True)
+                if deleted
+            ],
+        )
+        return results
+
+    def search(self, key: T) -> tuple[Node[T], int] | None:
+        """キーを検索します。`BTree.search` と同じです。"""
+        found: tuple[Node[T], int] | None = self.tree.search(key)
+        return found
+
+    def get_many(self, keys: Iterable[T]) -> list[int | None]:
+        """複数のキーを一括で検索します。`BTree.get_many` と同じです。"""
+        values: list[int | None] = self.tree.get_many(keys)
+        return values
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.tree)
+
+    def items(self) -> Iterator[tuple[T, int]]:
+        """(キー, 値) のペアをキーの昇順に返します。`BTree.items` と同じです。"""
+        pairs: Iterator[tuple[T, int]] = self.tree.items()
+        return pairs
+
+    def range(
+        self,
+        lo: T | None = None,
+        hi: T | None = None,
+        inclusive: tuple[bool, bool] = (True, True),
+        reverse: bool = False,
+    ) -> Iterator[tuple[T, int]]:
+        """範囲内の (キー, 値) のペアを返します。`BTree.range` と同じです。"""
+        pairs: Iterator[tuple[T, int]] = self.tree.range(lo, hi, inclusive, reverse)
+        return pairs
+
+    def commit(self) -> None:
+        """ためているログのレコードをディスクに書き込み、それまでの変更を永続化します。"""
+        self.log.commit()
+
+    def checkpoint(self) -> None:
+        """木全体をスナップショットに書き出し、ログを空にします。
+
+        スナップショットは一時ファイルに書いてからリネームで置き換えるため、
+        途中でクラッシュしても以前のスナップショットとログから復元できます。
+        """
+        self.log.commit()
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            self._write_snapshot(f, self.log.last_lsn)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        _fsync_directory(self.directory)
+        self.log.reset()
+        self._records_since_checkpoint = 0
+
+    def _write_snapshot(self, f: BinaryIO, lsn: int) -> None:
+        """スナップショットのヘッダーに続いて、`BTree.dump` で木全体を書き出します。"""
+        f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, lsn))
+        self.tree.dump(f)
+
+    def _read_snapshot(self, t: int) -> tuple[BTree[T], int]:
+        """スナップショットを読み込み、一括構築した B木と含まれる最後の LSN を返します。"""
+        with open(self._snapshot_path, "rb") as f:
+            magic, lsn = _SNAPSHOT_HEADER.unpack(f.read(_SNAPSHOT_HEADER.size))
+            if magic != _SNAPSHOT_MAGIC:
+                raise ValueError(
+                    f"{self._snapshot_path} はスナップショットではありません。"
+                )
+            return BTree.load(f, t), lsn
+
+    def close(self) -> None:
+        """ためているログのレコードを書き込んでファイルを閉じます。"""
+        self.log.close()
+
+    def __enter__(self) -> "DurableBTree[T]":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
@@ -0,0 +1,62 @@
+"""単調増加するキーの挿入について、追記の高速化と右寄りの分割の効果を測るベンチマーク。
+
+`BTree.append_optimized` を有効にした場合と無効にした場合で、挿入のスループットと
+構築後のノード数を比較します。比較のため、ランダムな順序での挿入も計測します。
+
+使い方:
+    python -m benchmarks.append [エントリ数] [最小次数 t]
+"""
+
+import random
+import sys
+import time
+
+from b_tree.b_tree import BTree
+
+
+def count_nodes(tree: BTree[int]) -> int:
+    """ツリーのノード数を数えます。"""
+    count = 0
+    stack = [tree.root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def ingest(keys: list[int], t: int, append_optimized: bool) -> tuple[float, int]:
+    """keys を順に挿入し、スループット (件/秒) とノード数を返します。"""
+    tree: BTree[int] = BTree(t, append_optimized=append_optimized)
+    start = time.perf_counter()
+    for k in keys:
+        tree.insert(k, k)
+    elapsed = time.perf_counter() - start
+    return len(keys) / elapsed, count_nodes(tree)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    t = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    sequential = list(range(n))
+    rng = random.Random(0)
+    # タイムスタンプのように、ほとんど昇順で小さな乱れを含むキー
+    near_sorted = [k * 4 + rng.randrange(8) for k in range(n)]
+    shuffled = sequential[:]
+    rng.shuffle(shuffled)
+
+    print(f"entries={n} t={t}")
+    print(f"{'workload':>12} {'optimized':>10} {'ops/s':>12} {'nodes':>10}")
+    for name, keys in [
+        ("sequential", sequential),
+        ("near-sorted", near_sorted),
+        ("random", shuffled),
+    ]:
+        for optimized in (False, True):
+            ops, nodes = ingest(keys, t, optimized)
+            print(f"{name:>12} {optimized!s:>10} {ops:>12,.0f} {nodes:>10,d}")
+
+
+if __name__ == "__main__":
+    main()
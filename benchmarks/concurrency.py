@@ -0,0 +1,92 @@
+"""`ConcurrentBTree` と、グローバルロックで保護した `BTree` のスループットを比較するベンチマーク。
+
+読み込み (get) と書き込み (insert / delete) を指定した比率で混ぜた操作を、
+複数のスレッドから同時に実行します。
+GIL が有効な Python ではスレッドが並列に動かないため、ラッチの取得コストの分だけ
+グローバルロックより遅くなります。読み込みが並列に進む効果は GIL を無効にしたビルドで現れます。
+
+使い方:
+    python -m benchmarks.concurrency [スレッド数] [スレッドあたりの操作数] [最小次数 t]
+"""
+
+import random
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+from b_tree.b_tree import BTree
+from b_tree.concurrent import ConcurrentBTree
+
+KEY_SPACE = 1_000_000
+
+
+class GlobalLockBTree:
+    """すべての操作を 1 つのロックで直列化する `BTree` のラッパー。"""
+
+    def __init__(self, tree: BTree[int]):
+        self.tree = tree
+        self.lock = threading.Lock()
+
+    def get(self, key: int) -> int | None:
+        with self.lock:
+            result = self.tree.search(key)
+            return None if result is None else result[0].items[result[1]].value
+
+    def insert(self, key: int, value: int) -> None:
+        with self.lock:
+            self.tree.insert(key, value)
+
+    def delete(self, key: int) -> bool:
+        with self.lock:
+            return self.tree.delete(key)
+
+
+def run(
+    tree: GlobalLockBTree | ConcurrentBTree[int],
+    threads: int,
+    ops: int,
+    read_ratio: float,
+) -> float:
+    """各スレッドで ops 回の操作を実行し、全体のスループット (操作/秒) を返します。"""
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        get: Callable[[int], int | None] = tree.get
+        for _ in range(ops):
+            key = rng.randrange(KEY_SPACE)
+            if rng.random() < read_ratio:
+                get(key)
+            elif rng.random() < 0.5:
+                tree.insert(key, key)
+            else:
+                tree.delete(key)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def main() -> None:
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    t = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    initial = [(k, k) for k in range(0, KEY_SPACE, 4)]
+    gil = "有効" if getattr(sys, "_is_gil_enabled", lambda: True)() else "無効"
+    print(f"threads={threads} ops/thread={ops} t={t} GIL={gil}")
+    print(f"{'read ratio':>10} {'global lock':>14} {'latch crabbing':>16}")
+    for read_ratio in [0.5, 0.9, 0.99]:
+        locked = GlobalLockBTree(BTree.from_sorted(initial, t))
+        latched: ConcurrentBTree[int] = ConcurrentBTree.from_sorted(initial, t)
+        locked_ops = run(locked, threads, ops, read_ratio)
+        latched_ops = run(latched, threads, ops, read_ratio)
+        print(f"{read_ratio:>10.2f} {locked_ops:>14,.0f} {latched_ops:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""`BTree` と `BTree.freeze` で作成した `FrozenBTree` の検索と起動の時間を比較するベンチマーク。
+
+起動の時間は、`BTree.dump` したファイルを `BTree.load` で読み込む時間と、
+`FrozenBTree.save` したファイルを `FrozenBTree.open` で mmap する時間を比較します。
+
+使い方:
+    python -m benchmarks.frozen [エントリ数] [最小次数 t]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+from b_tree.b_tree import BTree
+from b_tree.frozen import FrozenBTree
+from b_tree.int_tree import IntBTree
+
+
+def timed(func: Callable[[], Any]) -> tuple[Any, float]:
+    """func を 1 回実行し、戻り値と経過秒数を返します。"""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    t = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    pairs = [(k * 2, k) for k in range(n)]
+    probes = [random.randrange(2 * n) for _ in range(200_000)]
+    tree = BTree.from_sorted(pairs, t)
+    int_tree = IntBTree.from_sorted(pairs, t)
+    frozen, freeze = timed(tree.freeze)
+
+    with tempfile.TemporaryDirectory() as directory:
+        dump_path = os.path.join(directory, "tree.dump")
+        frozen_path = os.path.join(directory, "tree.frozen")
+        with open(dump_path, "wb") as file:
+            tree.dump(file)
+        with open(frozen_path, "wb") as file:
+            frozen.save(file)
+
+        def load() -> BTree[int]:
+            with open(dump_path, "rb") as file:
+                return BTree.load(file)
+
+        _, load_time = timed(load)
+        opened, open_time = timed(lambda: FrozenBTree.open(frozen_path))
+        with opened:
+            _, search = timed(lambda: [tree.search(k) for k in probes])
+            expected, get_many = timed(lambda: tree.get_many(probes))
+            _, int_get_many = timed(lambda: int_tree.get_many(probes))
+            found, get = timed(lambda: [opened.get(k) for k in probes])
+            assert found == expected
+            found, frozen_get_many = timed(lambda: opened.get_many(probes))
+            assert found == expected
+
+    print(f"entries={n} t={t} probes={len(probes)} freeze={freeze:.3f}s")
+    print(f"{'BTree.load':>24} {load_time:>8.3f} s")
+    print(f"{'FrozenBTree.open':>24} {open_time:>8.3f} s")
+    print(f"{'BTree.search':>24} {search:>8.3f} s")
+    print(f"{'BTree.get_many':>24} {get_many:>8.3f} s")
+    print(f"{'IntBTree.get_many':>24} {int_get_many:>8.3f} s")
+    print(f"{'FrozenBTree.get':>24} {get:>8.3f} s")
+    print(f"{'FrozenBTree.get_many':>24} {frozen_get_many:>8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""`Node`/`KeyValuePair`、`CompactNode`、`IntNode` のメモリ使用量を比較するベンチマーク。
+
+使い方:
+    python -m benchmarks.memory_layout [エントリ数] [最小次数 t]
+"""
+
+import random
+import sys
+import tracemalloc
+from collections.abc import Callable
+
+from b_tree.b_tree import BTree
+from b_tree.compact import CompactBTree
+from b_tree.int_tree import IntBTree
+
+
+def measure(build: Callable[[], object]) -> int:
+    """build が確保したメモリのうち、構築後も残っているバイト数を返します。"""
+    tracemalloc.start()
+    tree = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return current
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    t = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    # 挿入時に新しい int オブジェクトを作り、ツリーが保持するキーと値のオブジェクトも計測に含める
+    keys = list(range(n))
+    random.Random(0).shuffle(keys)
+
+    def build_btree() -> BTree[int]:
+        tree: BTree[int] = BTree(t)
+        for k in keys:
+            tree.insert(k + 1_000_000, k + 2_000_000)
+        return tree
+
+    def build_compact() -> CompactBTree[int]:
+        tree: CompactBTree[int] = CompactBTree(t)
+        for k in keys:
+            tree.insert(k + 1_000_000, k + 2_000_000)
+        return tree
+
+    def build_int() -> IntBTree:
+        tree = IntBTree(t)
+        for k in keys:
+            tree.insert(k + 1_000_000, k + 2_000_000)
+        return tree
+
+    results = {
+        "Node/KeyValuePair": measure(build_btree),
+        "CompactNode": measure(build_compact),
+        "IntNode": measure(build_int),
+    }
+    print(f"entries={n} t={t}")
+    for name, size in results.items():
+        print(f"{name:>20}: {size:>12,d} bytes  {size / n:7.2f} bytes/entry")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""`BTree` と、ワーカープロセスに分割した `ShardedBTree` の一括構築・一括検索・範囲の走査の時間を比較するベンチマーク。
+
+シャードの処理は別々のプロセスで並列に進むため、CPU のコア数に近いシャード数で効果が現れます。
+プロセス間で入力と結果を pickle で受け渡すコストがあるため、コアが 1 つの環境では `BTree` より遅くなります。
+
+使い方:
+    python -m benchmarks.sharded [エントリ数] [シャード数] [最小次数 t]
+"""
+
+import os
+import random
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+from b_tree.b_tree import BTree
+from b_tree.sharded import ShardedBTree
+
+
+def timed(func: Callable[[], Any]) -> tuple[Any, float]:
+    """func を 1 回実行し、戻り値と経過秒数を返します。"""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    shards = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    t = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    pairs = [(k * 2, k) for k in range(n)]
+    probes = [random.randrange(2 * n) for _ in range(n)]
+
+    tree, tree_load = timed(lambda: BTree.from_sorted(pairs, t))
+    sharded, sharded_load = timed(lambda: ShardedBTree.from_sorted(pairs, t, shards))
+    with sharded:
+        expected, tree_get = timed(lambda: tree.get_many(probes))
+        found, sharded_get = timed(lambda: sharded.get_many(probes))
+        assert found == expected
+        _, tree_scan = timed(lambda: sum(1 for _ in tree.range(0, n)))
+        _, sharded_scan = timed(lambda: sum(1 for _ in sharded.range(0, n)))
+
+    print(f"entries={n} shards={shards} t={t} cpus={os.cpu_count()}")
+    print(f"{'':>10} {'load (s)':>10} {'get_many (s)':>13} {'range (s)':>10}")
+    for name, load, get, scan in [
+        ("BTree", tree_load, tree_get, tree_scan),
+        ("sharded", sharded_load, sharded_get, sharded_scan),
+    ]:
+        print(f"{name:>10} {load:>10.3f} {get:>13.3f} {scan:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
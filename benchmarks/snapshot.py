@@ -0,0 +1,54 @@
+"""`BTree.dump` / `BTree.load` と pickle の保存・復元のサイズと時間を比較するベンチマーク。
+
+使い方:
+    python -m benchmarks.snapshot [エントリ数] [最小次数 t]
+"""
+
+import io
+import pickle
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+from b_tree.b_tree import BTree
+
+
+def timed(func: Callable[[], Any]) -> tuple[Any, float]:
+    """func を 1 回実行し、戻り値と経過秒数を返します。"""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    t = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    tree: BTree[int] = BTree.from_sorted(((k * 2, k) for k in range(n)), t)
+
+    def dump() -> bytes:
+        buf = io.BytesIO()
+        tree.dump(buf)
+        return buf.getvalue()
+
+    dumped, dump_time = timed(dump)
+    loaded, load_time = timed(lambda: BTree.load(io.BytesIO(dumped)))
+    assert next(loaded.keys()) == 0
+
+    pickled, pickle_time = timed(
+        lambda: pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+    _, unpickle_time = timed(lambda: pickle.loads(pickled))
+
+    print(f"entries={n} t={t}")
+    print(f"{'':>12} {'size (bytes)':>14} {'save (s)':>10} {'restore (s)':>12}")
+    for name, size, save, restore in [
+        ("dump/load", len(dumped), dump_time, load_time),
+        ("pickle", len(pickled), pickle_time, unpickle_time),
+    ]:
+        print(f"{name:>12} {size:>14,d} {save:>10.3f} {restore:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
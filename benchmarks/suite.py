@@ -0,0 +1,242 @@
+"""ワークロード・最小次数 t・ツリーの大きさを変えて `BTree` の性能を測るベンチマークスイート。
+
+各組み合わせについて、スループット (操作/秒)、1 操作あたりのレイテンシのパーセンタイル、
+tracemalloc で測ったピークメモリを計測します。
+`--json` で結果を書き出し、`--compare` で以前に書き出した結果と比較できます。
+
+ワークロード:
+    sequential: 昇順のキーを空のツリーに挿入します。
+    random: ランダムな順序のキーを空のツリーに挿入します。
+    search: 構築済みのツリーで、一様にランダムなキーを検索します (半分は存在しないキー)。
+    zipf: 構築済みのツリーで、ジップ分布に偏ったキーを検索します。
+    mixed: ジップ分布に偏ったキーで、検索 90%、挿入 5%、削除 5% を混ぜて実行します。
+
+時間の計測は --repeat 回繰り返して最も速かった回を使います。
+レイテンシは 1 操作ごとに `time.perf_counter_ns` で計測するため、
+スループットには時刻の取得にかかる時間も含まれます。
+ピークメモリは計測のオーバーヘッドが大きいため、時間の計測とは別に実行します。
+
+使い方:
+    python -m benchmarks.suite [--t T ...] [--sizes N ...] [--ops OPS]
+        [--repeat R] [--workloads NAME ...] [--json PATH] [--compare PATH] [--no-memory]
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from itertools import accumulate
+from typing import Any
+
+from b_tree.b_tree import BTree
+
+SEARCH, INSERT, DELETE = 0, 1, 2
+WORKLOADS = ("sequential", "random", "search", "zipf", "mixed")
+ZIPF_EXPONENT = 1.1
+
+Operations = list[tuple[int, int]]
+
+
+def zipf_ranks(n: int, count: int, rng: random.Random) -> list[int]:
+    """0 から n-1 の順位を、順位 r の出現確率が 1/(r+1)^s に比例するように count 個選びます。"""
+    weights = accumulate(1 / rank**ZIPF_EXPONENT for rank in range(1, n + 1))
+    return rng.choices(range(n), cum_weights=list(weights), k=count)
+
+
+def prepare(
+    workload: str, t: int, n: int, ops: int, seed: int
+) -> tuple[Callable[[], BTree[int]], Operations]:
+    """ワークロードの初期状態のツリーを作る関数と、実行する操作の列を返します。
+
+    構築済みのツリーを使うワークロードでは、0 から 2n-2 までの偶数のキーを持つツリーを作ります。
+
+    Args:
+        workload: ワークロードの名前。
+        t: B木の最小次数。
+        n: ツリーの大きさ。
+        ops: 構築済みのツリーに対して実行する操作の数。
+        seed: 乱数のシード。
+
+    Returns:
+        (初期状態のツリーを作る関数, (操作の種類, キー) のリスト) のタプル。
+    """
+    rng = random.Random(seed)
+
+    def empty() -> BTree[int]:
+        return BTree(t)
+
+    def prebuilt() -> BTree[int]:
+        return BTree.from_sorted(((k * 2, k) for k in range(n)), t)
+
+    if workload == "sequential":
+        return empty, [(INSERT, k) for k in range(n)]
+    if workload == "random":
+        keys = list(range(n))
+        rng.shuffle(keys)
+        return empty, [(INSERT, k) for k in keys]
+    if workload == "search":
+        return prebuilt, [(SEARCH, rng.randrange(2 * n)) for _ in range(ops)]
+
+    # よく使われるキーがツリーの一部に固まらないよう、順位とキーの対応をシャッフルする
+    hot = list(range(n))
+    rng.shuffle(hot)
+    ranks = zipf_ranks(n, ops, rng)
+    if workload == "zipf":
+        return prebuilt, [(SEARCH, hot[r] * 2) for r in ranks]
+    if workload == "mixed":
+        operations: Operations = []
+        for r in ranks:
+            p = rng.random()
+            if p < 0.9:
+                operations.append((SEARCH, hot[r] * 2))
+            elif p < 0.95:
+                operations.append((INSERT, hot[r] * 2 + 1))
+            else:
+                operations.append((DELETE, hot[r] * 2 + 1))
+        return prebuilt, operations
+    raise ValueError(f"不明なワークロードです: {workload}")
+
+
+def run_timed(tree: BTree[int], operations: Operations) -> tuple[float, list[int]]:
+    """操作を 1 つずつ実行し、全体の経過秒数と各操作のレイテンシ (ナノ秒) を返します。"""
+    search, insert, delete = tree.search, tree.insert, tree.delete
+    clock = time.perf_counter_ns
+    latencies = []
+    start = time.perf_counter()
+    for op, key in operations:
+        begin = clock()
+        if op == SEARCH:
+            search(key)
+        elif op == INSERT:
+            insert(key, key)
+        else:
+            delete(key)
+        latencies.append(clock() - begin)
+    return time.perf_counter() - start, latencies
+
+
+def peak_memory(build: Callable[[], BTree[int]], operations: Operations) -> int:
+    """初期状態のツリーの構築から操作の実行までに確保されたメモリのピーク (バイト) を返します。"""
+    tracemalloc.start()
+    try:
+        tree = build()
+        for op, key in operations:
+            if op == SEARCH:
+                tree.search(key)
+            elif op == INSERT:
+                tree.insert(key, key)
+            else:
+                tree.delete(key)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(sorted_values: list[int], p: float) -> int:
+    """ソート済みの値の p パーセンタイルを返します。"""
+    index = min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))
+    return sorted_values[index]
+
+
+def measure(
+    workload: str,
+    t: int,
+    n: int,
+    ops: int,
+    repeat: int = 1,
+    memory: bool = True,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """1 つの組み合わせを計測し、JSON に書き出せる形の結果を返します。
+
+    時間の計測は repeat 回繰り返し、最も速かった回の結果を使います。
+    """
+    build, operations = prepare(workload, t, n, ops, seed)
+    elapsed, latencies = min(
+        (run_timed(build(), operations) for _ in range(repeat)),
+        key=lambda run: run[0],
+    )
+    latencies.sort()
+    return {
+        "workload": workload,
+        "t": t,
+        "size": n,
+        "ops": len(operations),
+        "ops_per_sec": len(operations) / elapsed,
+        "latency_ns": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1],
+        },
+        "peak_memory_bytes": peak_memory(build, operations) if memory else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--t", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--ops", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS)
+    )
+    parser.add_argument("--json", help="結果を書き出す JSON ファイルのパス")
+    parser.add_argument("--compare", help="比較する以前の結果の JSON ファイルのパス")
+    parser.add_argument(
+        "--no-memory", action="store_true", help="ピークメモリを計測しない"
+    )
+    args = parser.parse_args()
+
+    baseline: dict[tuple[str, int, int], dict[str, Any]] = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            for record in json.load(f)["results"]:
+                baseline[record["workload"], record["t"], record["size"]] = record
+
+    header = (
+        f"{'workload':>10} {'t':>5} {'size':>9} {'ops/s':>11} "
+        f"{'p50 us':>8} {'p99 us':>8} {'peak MB':>8}"
+    )
+    print(header + (f" {'vs base':>8}" if baseline else ""))
+    results = []
+    for workload in args.workloads:
+        for n in args.sizes:
+            for t in args.t:
+                record = measure(
+                    workload, t, n, args.ops, args.repeat, not args.no_memory
+                )
+                results.append(record)
+                latency = record["latency_ns"]
+                peak = record["peak_memory_bytes"]
+                line = (
+                    f"{workload:>10} {t:>5} {n:>9,d} {record['ops_per_sec']:>11,.0f} "
+                    f"{latency['p50'] / 1000:>8.2f} {latency['p99'] / 1000:>8.2f} "
+                    + (f"{peak / 2**20:>8.1f}" if peak is not None else f"{'-':>8}")
+                )
+                base = baseline.get((workload, t, n))
+                if base is not None:
+                    line += f" {record['ops_per_sec'] / base['ops_per_sec']:>7.2f}x"
+                print(line, flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": sys.version,
+                    "platform": platform.platform(),
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import pytest
+
+
+def _check_sizes(node, t, is_root=True, check_node=None):
+    """各ノードのキー数と葉の深さが B木の制約を満たしているかを確認し、高さを返します。
+
+    `Node` のようにペアを items に持つノードと、`CompactNode` のようにキーと値を
+    keys と values の並列の配列に持つノードのどちらも確認できます。
+
+    Args:
+        node: 確認するサブツリーのルート。
+        t: B木の最小次数。
+        is_root: node が B木のルートかどうか。ルートはキー数の下限を確認しません。
+        check_node: 指定した場合、各ノードを渡して実装ごとの追加の確認を行う関数。
+
+    Returns:
+        サブツリーの高さ。葉は 1 です。
+    """
+    if check_node is not None:
+        check_node(node)
+    if hasattr(node, "items"):
+        n = len(node.items)
+    else:
+        assert len(node.keys) == len(node.values)
+        n = len(node.keys)
+    assert n <= 2 * t - 1
+    if not is_root:
+        assert n >= t - 1
+    if node.is_leaf:
+        assert not node.children
+        return 1
+    assert len(node.children) == n + 1
+    heights = {_check_sizes(child, t, False, check_node) for child in node.children}
+    assert len(heights) == 1
+    return heights.pop() + 1
+
+
+@pytest.fixture
+def check_sizes():
+    """各ノードのキー数と葉の深さを確認する関数 (`_check_sizes`) を返します。"""
+    return _check_sizes
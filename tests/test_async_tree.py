@@ -0,0 +1,134 @@
+import asyncio
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from b_tree.async_tree import AsyncBTree
+from b_tree.b_tree import BTree
+from b_tree.concurrent import ConcurrentBTree
+from b_tree.order_stat import OrderStatisticBTree
+
+
+def test_async_btree_basic_operations():
+    """1 件ずつの操作と一括操作の結果が BTree と一致することをテストします。"""
+
+    async def main():
+        tree = AsyncBTree(BTree(3), yield_every=16)
+        await tree.insert(5, 50)
+        assert await tree.update(5, 55) is True
+        assert await tree.update(6, 0) is False
+        node, idx = await tree.search(5)
+        assert node.items[idx].value == 55
+
+        rng = random.Random(0)
+        keys = rng.sample(range(10000), 2000)
+        await tree.insert_many((k, k * 2) for k in keys)
+        assert await tree.get_many([keys[0], -1, 5]) == [keys[0] * 2, None, 55]
+        assert await tree.delete_many([keys[1], keys[1], -1]) == [True, False, False]
+        assert await tree.delete(5) is True
+
+        expected = sorted((k, k * 2) for k in keys[:1] + keys[2:])
+        assert [pair async for pair in tree.items()] == expected
+        assert [k async for k in tree] == [k for k, _ in expected]
+        assert [pair async for pair in tree.range(100, 500, reverse=True)] == [
+            pair for pair in reversed(expected) if 100 <= pair[0] <= 500
+        ]
+
+    asyncio.run(main())
+
+
+def test_async_btree_yields_to_event_loop():
+    """一括操作と走査の途中で、他のコルーチンが実行されることをテストします。"""
+
+    async def main():
+        tree = AsyncBTree(BTree(4), yield_every=64)
+        ticks = 0
+        done = False
+
+        async def ticker():
+            nonlocal ticks
+            while not done:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        await tree.insert_many((k, k) for k in range(20000))
+        after_insert = ticks
+        assert after_insert > 100
+
+        count = 0
+        async for _ in tree.items():
+            count += 1
+        assert count == 20000
+        assert ticks > after_insert + 100
+        done = True
+        await task
+
+    asyncio.run(main())
+
+
+def test_async_btree_scan_sees_snapshot():
+    """走査の途中で変更しても、走査は開始時点の内容を返すことをテストします。"""
+
+    async def main():
+        tree = AsyncBTree(
+            BTree.from_sorted(((k, k) for k in range(1000)), 3), yield_every=10
+        )
+        seen = []
+        async for key in tree.keys():
+            seen.append(key)
+            if key % 100 == 0:
+                await tree.delete(key + 1)
+                await tree.insert(key + 1000, 0)
+        assert seen == list(range(1000))
+        assert len([k async for k in tree]) == 1000
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("executor_class", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_async_btree_offloads_large_batches(executor_class):
+    """大きな一括操作をエグゼキュータで実行できることをテストします。"""
+
+    async def main(executor):
+        base = BTree(3)
+        tree = AsyncBTree(base, executor=executor, offload_threshold=100)
+        await tree.insert_many((k, k) for k in reversed(range(500)))
+        await tree.insert_many([(1000, 1)])
+        assert (
+            await tree.get_many(range(0, 1000, 5))
+            == list(range(0, 500, 5)) + [None] * 100
+        )
+        assert await tree.delete_many(range(0, 1000, 2)) == [
+            k < 500 for k in range(0, 1000, 2)
+        ]
+        assert [k async for k in tree] == [*range(1, 500, 2), 1000]
+        # 結果は同じ B木のオブジェクトに反映される
+        assert tree.tree is base
+        assert list(base) == [*range(1, 500, 2), 1000]
+
+    # ダンプと読み込みはスレッドで行うため、プロセスは fork 以外の方法で起動する
+    options = {}
+    if executor_class is ProcessPoolExecutor:
+        options["mp_context"] = multiprocessing.get_context("forkserver")
+    with executor_class(max_workers=1, **options) as executor:
+        asyncio.run(main(executor))
+        if executor_class is ProcessPoolExecutor:
+            with pytest.raises(TypeError):
+                AsyncBTree(OrderStatisticBTree(3), executor=executor)
+
+
+def test_async_btree_scan_without_snapshot():
+    """スナップショットを作成できない B木も、ロックを保持したまま走査できることをテストします。"""
+
+    async def main():
+        tree = AsyncBTree(ConcurrentBTree(2), yield_every=7)
+        await tree.insert_many((k, -k) for k in range(100))
+        assert [pair async for pair in tree.range(10, 20, reverse=True)] == [
+            (k, -k) for k in range(20, 9, -1)
+        ]
+
+    asyncio.run(main())
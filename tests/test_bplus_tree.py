@@ -0,0 +1,178 @@
+import random
+
+import pytest
+
+from b_tree.bplus_tree import BPlusNode, BPlusTree
+
+
+def _check_tree(tree):
+    """B+木の制約と葉の連結リストを確認し、葉を順にたどったキーを返します。"""
+    t = tree.t
+
+    def walk(node, is_root, lo, hi):
+        assert len(node.keys) <= 2 * t - 1
+        if not is_root:
+            assert len(node.keys) >= t - 1
+        for key in node.keys:
+            # 同じキーが複数ある場合、区切りキーと等しいキーは左側の子ノードにも残る
+            assert (lo is None or key >= lo) and (hi is None or key <= hi)
+        if node.is_leaf:
+            assert len(node.values) == len(node.keys)
+            return 1
+        assert node.values == []
+        assert len(node.children) == len(node.keys) + 1
+        bounds = [lo] + node.keys + [hi]
+        heights = {
+            walk(child, False, bounds[i], bounds[i + 1])
+            for i, child in enumerate(node.children)
+        }
+        assert len(heights) == 1
+        return heights.pop() + 1
+
+    walk(tree.root, True, None, None)
+
+    leaf = tree.root
+    while not leaf.is_leaf:
+        leaf = leaf.children[0]
+    assert leaf.prev is None
+    keys = []
+    while leaf is not None:
+        keys.extend(leaf.keys)
+        if leaf.next is not None:
+            assert leaf.next.prev is leaf
+        leaf = leaf.next
+    return keys
+
+
+def test_bplus_node_init():
+    node = BPlusNode(2, True)
+    assert node.is_leaf is True
+    assert node.keys == []
+    assert node.values == []
+    assert node.next is None
+    assert node.prev is None
+
+
+def test_bplus_tree_init_invalid():
+    with pytest.raises(ValueError):
+        BPlusTree(1)
+
+
+def test_bplus_tree_leaf_split():
+    """葉ノードの分割で区切りキーがコピーされ、葉が連結されることをテストします。"""
+    tree = BPlusTree(2)
+    for k in [10, 20, 30, 40]:
+        tree.insert(k, k * 10)
+    assert tree.root.keys == [30]
+    left, right = tree.root.children
+    assert left.keys == [10, 20]
+    assert right.keys == [30, 40]
+    assert right.values == [300, 400]
+    assert left.next is right
+    assert right.prev is left
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_bplus_tree_random_operations(t):
+    """ランダムな挿入・検索・更新・削除の結果が辞書と一致することをテストします。"""
+    rng = random.Random(t)
+    keys = rng.sample(range(10000), 2000)
+    tree = BPlusTree(t)
+    expected = {}
+    for k in keys:
+        tree.insert(k, k * 10)
+        expected[k] = k * 10
+    assert _check_tree(tree) == sorted(expected)
+    assert list(tree.items()) == sorted(expected.items())
+
+    for k in range(0, 10000, 7):
+        result = tree.search(k)
+        if k in expected:
+            leaf, idx = result
+            assert leaf.values[idx] == expected[k]
+        else:
+            assert result is None
+
+    assert tree.update(keys[0], -1) is True
+    assert tree.update(-1, 0) is False
+    expected[keys[0]] = -1
+
+    rng.shuffle(keys)
+    for k in keys[:1500]:
+        assert tree.delete(k) is True
+        del expected[k]
+        assert tree.search(k) is None
+    assert tree.delete(-1) is False
+    assert _check_tree(tree) == sorted(expected)
+    assert list(tree.items()) == sorted(expected.items())
+
+    for k in keys[1500:]:
+        assert tree.delete(k) is True
+    assert tree.root.is_leaf
+    assert list(tree) == []
+
+
+def test_bplus_tree_duplicate_keys():
+    """同じキーが左右の葉に分かれても、検索・更新・削除・範囲の走査で見つかることをテストします。"""
+    tree = BPlusTree(2)
+    for k in [1, 1, 0, 2, 2]:
+        tree.insert(k, k)
+    assert tree.delete(1) is True
+    tree.insert(0, 0)
+    assert list(tree.keys()) == [0, 0, 1, 2, 2]
+    assert tree.search(1) is not None
+    assert tree.update(1, 5) is True
+    assert list(tree.range(1, 1)) == [(1, 5)]
+    assert tree.delete(1) is True
+    assert tree.search(1) is None
+
+    rng = random.Random(0)
+    for t in [2, 3]:
+        tree = BPlusTree(t)
+        model = []
+        for step in range(2000):
+            k = rng.randrange(30)
+            if rng.random() < 0.55:
+                tree.insert(k, step)
+                model.append(k)
+            else:
+                assert (tree.search(k) is not None) == (k in model)
+                assert tree.delete(k) == (k in model)
+                if k in model:
+                    model.remove(k)
+        assert _check_tree(tree) == sorted(model)
+        for inclusive in [(True, True), (False, False)]:
+            expected = [
+                k
+                for k in sorted(model)
+                if (10 < k < 20) or (inclusive[0] and k in (10, 20))
+            ]
+            assert [k for k, _ in tree.range(10, 20, inclusive)] == expected
+            assert [k for k, _ in tree.range(10, 20, inclusive, True)] == expected[::-1]
+
+
+def test_bplus_tree_range():
+    """range が範囲内のペアを正しい順序で返すことをテストします。"""
+    tree = BPlusTree(2)
+    all_keys = list(range(0, 200, 2))
+    for k in all_keys:
+        tree.insert(k, k)
+    bounds = [None, -5, 0, 1, 2, 57, 58, 150, 198, 199, 400]
+    for lo in bounds:
+        for hi in bounds:
+            for inclusive in [
+                (True, True),
+                (True, False),
+                (False, True),
+                (False, False),
+            ]:
+                expected = [
+                    k
+                    for k in all_keys
+                    if (lo is None or k > lo or (inclusive[0] and k == lo))
+                    and (hi is None or k < hi or (inclusive[1] and k == hi))
+                ]
+                forward = [k for k, _ in tree.range(lo, hi, inclusive)]
+                assert forward == expected
+                backward = [k for k, _ in tree.range(lo, hi, inclusive, reverse=True)]
+                assert backward == expected[::-1]
@@ -1,3 +1,6 @@
+import io
+import random
+
 import pytest
 
 from b_tree.b_tree import BTree
@@ -83,3 +86,678 @@ def test_btree_insert_full_root_leaf_split_revised():
     )  # 分割による 10 以上のキー + 挿入されたキーを持つべき
     assert right_child.items[0].key == 15  # 挿入されたキー
     assert right_child.items[1].key == 20
+
+
+def _collect_keys(node):
+    """ノード以下のキーを中間順に集めるヘルパー関数。"""
+    keys = []
+    for i, item in enumerate(node.items):
+        if not node.is_leaf:
+            keys.extend(_collect_keys(node.children[i]))
+        keys.append(item.key)
+    if not node.is_leaf:
+        keys.extend(_collect_keys(node.children[-1]))
+    return keys
+
+
+@pytest.mark.parametrize("t", [2, 3, 64])
+def test_btree_insert_search_delete_random(t):
+    """ランダムな挿入・検索・削除の結果が辞書と一致することをテストします。"""
+    import random
+
+    rng = random.Random(t)
+    keys = rng.sample(range(10000), 2000)
+    tree = BTree(t)
+    expected = {}
+    for k in keys:
+        tree.insert(k, k * 10)
+        expected[k] = k * 10
+    assert _collect_keys(tree.root) == sorted(expected)
+
+    for k in range(-5, 10005, 7):
+        result = tree.search(k)
+        if k in expected:
+            assert result is not None
+            node, idx = result
+            assert node.items[idx].value == expected[k]
+        else:
+            assert result is None
+
+    for k in keys[:1000]:
+        assert tree.delete(k) is True
+        del expected[k]
+    assert tree.delete(-1) is False
+    assert _collect_keys(tree.root) == sorted(expected)
+    assert tree.update(keys[1500], 1) is True
+    node, idx = tree.search(keys[1500])
+    assert node.items[idx].value == 1
+
+
+@pytest.mark.parametrize("t", [2, 3, 5])
+@pytest.mark.parametrize("fill_factor", [1.0, 0.7, 0.01])
+def test_btree_from_sorted(t, fill_factor, check_sizes):
+    """ソート済みの列からの一括構築が有効な B木を作ることをテストします。"""
+    for n in list(range(0, 60)) + [500, 1234]:
+        tree = BTree.from_sorted(((k, k * 2) for k in range(n)), t, fill_factor)
+        check_sizes(tree.root, t)
+        assert _collect_keys(tree.root) == list(range(n))
+        for k in range(0, n, 5):
+            node, idx = tree.search(k)
+            assert node.items[idx].value == k * 2
+
+        # 構築後も通常の挿入・削除が行えること
+        tree.insert(n, 0)
+        for k in range(0, n, 2):
+            assert tree.delete(k) is True
+        check_sizes(tree.root, t)
+        assert _collect_keys(tree.root) == list(range(1, n, 2)) + [n]
+
+
+def test_btree_from_sorted_invalid():
+    """from_sorted の不正な入力をテストします。"""
+    with pytest.raises(ValueError):
+        BTree.from_sorted([(2, 0), (1, 0)], 2)
+    with pytest.raises(ValueError):
+        BTree.from_sorted([], 2, fill_factor=0)
+    with pytest.raises(ValueError):
+        BTree.from_sorted([], 1)
+
+
+@pytest.mark.parametrize("t", [2, 4])
+def test_btree_iteration(t):
+    """items / keys / __iter__ がキーの昇順に返すことをテストします。"""
+    import random
+
+    keys = list(range(0, 600, 3))
+    random.Random(0).shuffle(keys)
+    tree = BTree(t)
+    assert list(tree) == []
+    for k in keys:
+        tree.insert(k, -k)
+    assert list(tree) == sorted(keys)
+    assert list(tree.keys()) == sorted(keys)
+    assert list(tree.items()) == [(k, -k) for k in sorted(keys)]
+
+
+@pytest.mark.parametrize("t", [2, 3])
+def test_btree_range(t):
+    """range が範囲内のペアを正しい順序で返すことをテストします。"""
+    tree = BTree.from_sorted(((k, k) for k in range(0, 300, 2)), t)
+    all_keys = list(range(0, 300, 2))
+    bounds = [None, -5, 0, 1, 2, 57, 58, 150, 298, 299, 400]
+    for lo in bounds:
+        for hi in bounds:
+            for inclusive in [
+                (True, True),
+                (True, False),
+                (False, True),
+                (False, False),
+            ]:
+                expected = [
+                    k
+                    for k in all_keys
+                    if (lo is None or k > lo or (inclusive[0] and k == lo))
+                    and (hi is None or k < hi or (inclusive[1] and k == hi))
+                ]
+                forward = [k for k, _ in tree.range(lo, hi, inclusive)]
+                assert forward == expected
+                backward = [k for k, _ in tree.range(lo, hi, inclusive, reverse=True)]
+                assert backward == expected[::-1]
+
+
+def test_btree_range_is_lazy():
+    """range が途中で打ち切れる遅延評価のイテレータであることをテストします。"""
+    tree = BTree.from_sorted(((k, k) for k in range(10000)), 3)
+    it = tree.range(5000)
+    assert next(it) == (5000, 5000)
+    assert next(it) == (5001, 5001)
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_btree_insert_many(t, check_sizes):
+    """insert_many の結果が逐次挿入と同じ内容の有効な B木になることをテストします。"""
+    import random
+
+    rng = random.Random(t)
+    tree = BTree(t)
+    expected = {}
+    for _ in range(5):
+        batch = [(k, k * 3) for k in rng.sample(range(5000), 400)]
+        batch = [(k, v) for k, v in batch if k not in expected]
+        tree.insert_many(batch)
+        expected.update(batch)
+        check_sizes(tree.root, t)
+        assert list(tree.items()) == sorted(expected.items())
+
+    tree.insert_many([])
+    tree.insert_many([(1, 1)])
+    assert 1 in set(tree)
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_btree_get_many(t):
+    """get_many が入力順に 1 件ずつ結果を返すことをテストします。"""
+    tree = BTree.from_sorted(((k, k * 2) for k in range(0, 1000, 2)), t)
+    probes = [999, 4, 3, 4, -1, 0, 998, 500]
+    assert tree.get_many(probes) == [None, 8, None, 8, None, 0, 1996, 1000]
+    assert tree.get_many([]) == []
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_btree_delete_many(t, check_sizes):
+    """delete_many の結果が逐次削除と一致し、有効な B木が残ることをテストします。"""
+    import random
+
+    rng = random.Random(t)
+    keys = list(range(3000))
+    tree = BTree.from_sorted(((k, k) for k in keys), t)
+    remaining = set(keys)
+    for size in [1, 10, 300, 1000, 2000]:
+        batch = rng.sample(range(-10, 3010), size)
+        results = tree.delete_many(batch)
+        assert results == [k in remaining for k in batch]
+        remaining.difference_update(batch)
+        check_sizes(tree.root, t)
+        assert list(tree) == sorted(remaining)
+
+    # 残りをすべて削除する
+    assert all(tree.delete_many(list(remaining)))
+    assert list(tree) == []
+    assert tree.root.is_leaf
+
+
+def test_btree_delete_many_duplicate_keys(check_sizes):
+    """入力や木に同じキーが複数ある場合も、delete_many の結果が逐次削除と一致することをテストします。"""
+    import random
+
+    tree = BTree(3)
+    for _ in range(6):
+        tree.insert(5, 1)
+    assert tree.delete_many([5] * 6) == [True] * 6
+    assert list(tree) == []
+
+    rng = random.Random(0)
+    for t in [2, 3]:
+        batched, sequential = BTree(t), BTree(t)
+        for step in range(1000):
+            key = rng.randrange(40)
+            batched.insert(key, step)
+            sequential.insert(key, step)
+        for _ in range(5):
+            keys = [rng.randrange(42) for _ in range(100)]
+            assert batched.delete_many(keys) == [sequential.delete(k) for k in keys]
+            check_sizes(batched.root, t)
+            assert list(batched) == list(sequential)
+
+
+def test_btree_delete_many_contiguous(check_sizes):
+    """連続したキーの一括削除で内部ノードのキーも正しく削除されることをテストします。"""
+    for t in [2, 3]:
+        for lo, hi in [(0, 500), (100, 900), (250, 260), (1, 999)]:
+            tree = BTree.from_sorted(((k, k) for k in range(1000)), t)
+            assert all(tree.delete_many(range(lo, hi)))
+            check_sizes(tree.root, t)
+            assert list(tree) == [k for k in range(1000) if not lo <= k < hi]
+
+
+def test_btree_get_many_visits_each_node_once(monkeypatch):
+    """get_many が同じサブツリーへの降下をまとめ、訪問するノードを減らすことをテストします。"""
+    from b_tree.node import Node
+
+    tree = BTree.from_sorted(((k, k) for k in range(10000)), 4)
+    visits = []
+    original = Node._find_key
+
+    def counting_find_key(self, key):
+        visits.append(self)
+        return original(self, key)
+
+    monkeypatch.setattr(Node, "_find_key", counting_find_key)
+    tree.get_many(range(5000, 5100))
+    batched = len({id(node) for node in visits})
+
+    visits.clear()
+    for k in range(5000, 5100):
+        tree.search(k)
+    sequential = len(visits)
+    assert batched * 5 < sequential
+
+
+@pytest.mark.parametrize(
+    "keys",
+    [
+        list(range(-500, 1500, 3)),
+        [f"キー{i:05d}" for i in range(700)],
+        [i.to_bytes(4, "big") for i in range(700)],
+        [],
+    ],
+)
+def test_btree_dump_load(keys, monkeypatch, check_sizes):
+    """dump で書き出した内容を load で復元できることをテストします。"""
+    monkeypatch.setattr("b_tree.b_tree.DUMP_BLOCK_SIZE", 100)
+    tree = BTree(3)
+    for i, k in enumerate(keys):
+        tree.insert(k, i * 10 - 7)
+    buf = io.BytesIO()
+    tree.dump(buf)
+
+    buf.seek(0)
+    loaded = BTree.load(buf)
+    assert loaded.t == 3
+    assert list(loaded.items()) == list(tree.items())
+    check_sizes(loaded.root, 3)
+
+    buf.seek(0)
+    assert BTree.load(buf, t=5).t == 5
+
+
+def test_btree_load_streams_blocks(monkeypatch):
+    """load がファイル全体をリストに展開せず、ブロックごとに from_sorted へ渡すことをテストします。"""
+    monkeypatch.setattr("b_tree.b_tree.DUMP_BLOCK_SIZE", 10)
+    buf = io.BytesIO()
+    BTree.from_sorted(((k, k) for k in range(100)), 3).dump(buf)
+    header_size = 24
+    block_size = (len(buf.getvalue()) - header_size) // 10
+    buf.seek(0)
+
+    consumed = []
+    original = BTree.from_sorted.__func__
+
+    def from_sorted(cls, iterable, t, fill_factor=1.0):
+        assert not isinstance(iterable, list)
+
+        def tracking():
+            for pair in iterable:
+                # 1 ブロック (10 件) より先のペアはまだ読み込まれていない
+                assert (
+                    buf.tell() == header_size + (len(consumed) // 10 + 1) * block_size
+                )
+                consumed.append(pair)
+                yield pair
+
+        return original(cls, tracking(), t, fill_factor)
+
+    monkeypatch.setattr(BTree, "from_sorted", classmethod(from_sorted))
+    loaded = BTree.load(buf)
+    assert consumed == [(k, k) for k in range(100)]
+    assert list(loaded.items()) == consumed
+
+
+def test_btree_dump_load_invalid():
+    """不正な入力に対する dump と load のエラーをテストします。"""
+    tree = BTree(2)
+    tree.insert(1, 1)
+    tree.insert(2, 2)
+    buf = io.BytesIO()
+    tree.dump(buf)
+    with pytest.raises(ValueError):
+        BTree.load(io.BytesIO(buf.getvalue()[:-1]))
+    with pytest.raises(ValueError):
+        BTree.load(io.BytesIO(b"x" * 64))
+
+    mixed = BTree(2)
+    mixed.insert(1, 1)
+    mixed.insert(1.5, 2)
+    with pytest.raises(TypeError):
+        mixed.dump(io.BytesIO())
+    for key, value in [(2**63, 0), (0, -(2**63) - 1)]:
+        wide = BTree(2)
+        wide.insert(key, value)
+        with pytest.raises(TypeError):
+            wide.dump(io.BytesIO())
+
+
+def test_btree_dump_is_little_endian(monkeypatch):
+    """ダンプファイルの数値がリトルエンディアンで、ブロックをまたいだ順序も確認されることをテストします。"""
+    monkeypatch.setattr("b_tree.b_tree.DUMP_BLOCK_SIZE", 2)
+    buf = io.BytesIO()
+    BTree.from_sorted([(1, -2), (3, 4), (5, 6)], 2).dump(buf)
+    data = buf.getvalue()
+    assert (1).to_bytes(8, "little") + (3).to_bytes(8, "little") in data
+    assert (-2).to_bytes(8, "little", signed=True) in data
+
+    # 2 つ目のブロックのキーを 1 つ目のブロックより小さくする
+    swapped = data.replace((5).to_bytes(8, "little"), (0).to_bytes(8, "little"))
+    with pytest.raises(ValueError):
+        BTree.load(io.BytesIO(swapped))
+
+
+def test_btree_snapshot_is_isolated(check_sizes):
+    """スナップショットの内容が、作成後の変更の影響を受けないことをテストします。"""
+    rng = random.Random(0)
+    tree = BTree.from_sorted(((k, k) for k in range(0, 2000, 2)), 3)
+    before = list(tree.items())
+    snap = tree.snapshot()
+
+    for _ in range(1500):
+        k = rng.randrange(2000)
+        op = rng.random()
+        if op < 0.4:
+            tree.insert(k, -k)
+        elif op < 0.7:
+            tree.delete(k)
+        else:
+            tree.update(k, k * 10)
+    tree.insert_many((k, k) for k in range(2000, 2100))
+    tree.delete_many(range(0, 300))
+    check_sizes(tree.root, 3)
+
+    assert list(snap.items()) == before
+    assert snap.get_many([4, 5]) == [4, None]
+    with pytest.raises(TypeError):
+        snap.insert(1, 1)
+    with pytest.raises(TypeError):
+        snap.delete(4)
+    with pytest.raises(TypeError):
+        snap.delete_range(0, 10)
+    assert snap.snapshot() is snap
+
+    # 2 つ目のスナップショットも、1 つ目と独立して保持される
+    middle = list(tree.items())
+    snap2 = tree.snapshot()
+    for k in range(2000, 2100):
+        tree.delete(k)
+        tree.update(k - 1000, 0)
+    assert list(snap2.items()) == middle
+    assert list(snap.items()) == before
+
+
+def test_btree_snapshot_copies_only_changed_path(check_sizes):
+    """スナップショットの作成後の変更で、変更したパス上のノードだけが複製されることをテストします。"""
+    tree = BTree.from_sorted(((k, k) for k in range(10000)), 4)
+    snap = tree.snapshot()
+    assert snap.root is tree.root
+
+    def nodes(node):
+        yield node
+        for child in node.children:
+            yield from nodes(child)
+
+    tree.update(5000, -1)
+    shared = {id(n) for n in nodes(snap.root)}
+    copied = [n for n in nodes(tree.root) if id(n) not in shared]
+    height = check_sizes(tree.root, 4)
+    assert len(copied) == height
+    assert tree.search(5000)[0].items[tree.search(5000)[1]].value == -1
+    snap_node, snap_idx = snap.search(5000)
+    assert snap_node.items[snap_idx].value == 5000
+
+
+def _count_nodes(node):
+    """ノード以下のノード数を数えるヘルパー関数。"""
+    return 1 + sum(_count_nodes(child) for child in node.children)
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_btree_append_fills_nodes(t, check_sizes):
+    """単調増加するキーの挿入で、ノードがほぼ満杯になることをテストします。"""
+    n = 5000
+    tree = BTree(t, append_optimized=True)
+    for k in range(n):
+        tree.insert(k, k)
+    half = BTree(t)
+    for k in range(n):
+        half.insert(k, k)
+
+    assert list(tree.items()) == [(k, k) for k in range(n)]
+    assert tree.get_many([0, n - 1, n]) == [0, n - 1, None]
+    # 通常の分割では各ノードがおよそ半分しか埋まらない
+    assert _count_nodes(tree.root) * 1.6 < _count_nodes(half.root)
+    tree._settle()
+    check_sizes(tree.root, t)
+
+
+def test_btree_append_skips_descent(monkeypatch):
+    """右端の葉に入るキーの挿入で、ルートから降りないことをテストします。"""
+    from b_tree.node import Node
+
+    tree = BTree.from_sorted(((k, k) for k in range(0, 1000, 2)), 4)
+    tree.append_optimized = True
+    calls = []
+    original = Node.insert
+    monkeypatch.setattr(
+        Node, "insert", lambda self, kv: (calls.append(self), original(self, kv))
+    )
+    k = 1000
+    while k < 3000 or len(tree._spine[-1].items) > 5:
+        tree.insert(k, k)
+        k += 2
+    # 右端の葉に入る少し順序の乱れたキーも、降りずに挿入される
+    tree.insert(k + 2, k + 2)
+    tree.insert(k + 1, k + 1)
+    assert calls == []
+    tree.insert(1, 1)
+    assert calls
+    assert tree.get_many([k + 1, 1, k + 2, k]) == [k + 1, 1, k + 2, None]
+
+
+def test_btree_append_mixed_operations(check_sizes):
+    """追記と通常の挿入・削除・スナップショットを混ぜても整合性が保たれることをテストします。"""
+    rng = random.Random(1)
+    tree = BTree(3, append_optimized=True)
+    expected = []
+    next_key = 0
+    snap, snap_items = None, None
+    for step in range(4000):
+        op = rng.random()
+        if op < 0.6:
+            # ほぼ単調増加するキー
+            k = next_key + rng.randrange(-3, 4)
+            next_key += 2
+            tree.insert(k, step)
+            expected.append((k, step))
+        elif op < 0.75:
+            k = rng.randrange(max(1, next_key))
+            tree.insert(k, step)
+            expected.append((k, step))
+        elif op < 0.97 and expected:
+            k, _ = expected[rng.randrange(len(expected))]
+            assert tree.delete(k) is True
+            expected.remove(next(p for p in expected if p[0] == k))
+        else:
+            snap, snap_items = tree.snapshot(), list(tree.items())
+    assert sorted(k for k, _ in tree.items()) == sorted(k for k, _ in expected)
+    assert list(snap.items()) == snap_items
+    tree._settle()
+    check_sizes(tree.root, 3)
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_btree_delete_range(t, check_sizes):
+    """delete_range が範囲内のキーだけを削除し、有効な B木が残ることをテストします。"""
+    rng = random.Random(t)
+    for _ in range(30):
+        keys = sorted(rng.choices(range(500), k=rng.randrange(0, 1500)))
+        tree = BTree.from_sorted(((k, k) for k in keys), t)
+        lo, hi = sorted(rng.randrange(-10, 510) for _ in range(2))
+        inclusive = (rng.random() < 0.5, rng.random() < 0.5)
+        expected = [
+            k
+            for k in keys
+            if not (
+                (lo < k or (inclusive[0] and k == lo))
+                and (k < hi or (inclusive[1] and k == hi))
+            )
+        ]
+        assert tree.delete_range(lo, hi, inclusive) == len(keys) - len(expected)
+        check_sizes(tree.root, t)
+        assert list(tree) == expected
+
+    tree = BTree.from_sorted(((k, k) for k in range(1000)), t)
+    assert tree.delete_range(hi=99) == 100
+    assert tree.delete_range(900) == 100
+    assert tree.delete_range(500, 400) == 0
+    assert list(tree) == list(range(100, 900))
+    assert tree.delete_range() == 800
+    assert list(tree) == []
+
+
+def test_btree_delete_range_detaches_subtrees(monkeypatch, check_sizes):
+    """delete_range が範囲の両端のパス上のノードだけを訪問することをテストします。"""
+    from b_tree.node import Node
+
+    tree = BTree.from_sorted(((k, k) for k in range(100_000)), 4)
+    visited = []
+    original = Node._delete_range
+
+    def counting(self, lo, hi, inclusive):
+        visited.append(self)
+        return original(self, lo, hi, inclusive)
+
+    monkeypatch.setattr(Node, "_delete_range", counting)
+    assert tree.delete_range(1000, 98_999) == 98_000
+    height = 1
+    node = tree.root
+    while not node.is_leaf:
+        node = node.children[0]
+        height += 1
+    assert len(visited) <= 2 * (height + 2)
+    check_sizes(tree.root, 4)
+    assert list(tree) == list(range(1000)) + list(range(99_000, 100_000))
+
+
+def test_btree_delete_range_keeps_snapshot():
+    """delete_range がスナップショットの内容を変更しないことをテストします。"""
+    tree = BTree.from_sorted(((k, k) for k in range(2000)), 3)
+    snap = tree.snapshot()
+    assert tree.delete_range(100, 1800) == 1701
+    assert list(tree) == list(range(100)) + list(range(1801, 2000))
+    assert list(snap) == list(range(2000))
+
+
+@pytest.mark.parametrize("t", [2, 3, 6])
+def test_btree_split_at(t, check_sizes):
+    """split_at が key の前後で有効な 2 つの B木に分け、元の B木を変更しないことをテストします。"""
+    rng = random.Random(t)
+    for _ in range(30):
+        keys = sorted(rng.choices(range(300), k=rng.randrange(0, 1200)))
+        tree = BTree.from_sorted(((k, k) for k in keys), t)
+        key = rng.randrange(-10, 310)
+        left, right = tree.split_at(key)
+        check_sizes(left.root, t)
+        check_sizes(right.root, t)
+        assert list(left) == [k for k in keys if k < key]
+        assert list(right) == [k for k in keys if k >= key]
+
+        # 分割後の B木と元の B木は、互いに影響せずに変更できる
+        left.insert(key - 1, 0)
+        right.delete_range()
+        tree.insert(key, 0)
+        assert list(tree) == sorted(keys + [key])
+        assert list(left) == sorted([k for k in keys if k < key] + [key - 1])
+        assert list(right) == []
+
+
+@pytest.mark.parametrize("t", [2, 3, 6])
+def test_btree_join(t, check_sizes):
+    """join が高さの異なる B木も連結し、元の B木を変更しないことをテストします。"""
+    rng = random.Random(t)
+    for _ in range(30):
+        left_keys = sorted(rng.choices(range(500), k=rng.randrange(0, 1500)))
+        floor = left_keys[-1] if left_keys else 0
+        right_keys = sorted(
+            rng.choices(range(floor, floor + 500), k=rng.randrange(0, 1500))
+        )
+        left = BTree.from_sorted(((k, k) for k in left_keys), t)
+        right = BTree(t)
+        right.insert_many((k, k) for k in right_keys)
+        joined = BTree.join(left, right)
+        check_sizes(joined.root, t)
+        assert list(joined) == left_keys + right_keys
+
+        joined.delete_range(hi=floor)
+        joined.insert(floor, 1)
+        if right_keys:
+            joined.update(right_keys[-1], -1)
+        assert list(left) == left_keys
+        assert list(right.items()) == [(k, k) for k in right_keys]
+        assert list(right) == right_keys
+
+
+def test_btree_split_join_round_trip(check_sizes):
+    """split_at と join を繰り返しても内容が変わらないことをテストします。"""
+    tree = BTree.from_sorted(((k, k * 2) for k in range(5000)), 4)
+    for key in [0, 1, 2500, 4999, 5000, 1234]:
+        left, right = tree.split_at(key)
+        tree = BTree.join(left, right)
+        check_sizes(tree.root, 4)
+    assert list(tree.items()) == [(k, k * 2) for k in range(5000)]
+
+
+def test_btree_join_invalid():
+    """キーの範囲が重なる場合や最小次数が異なる場合に join が失敗することをテストします。"""
+    left = BTree.from_sorted(((k, k) for k in range(10)), 2)
+    with pytest.raises(ValueError):
+        BTree.join(left, BTree.from_sorted(((k, k) for k in range(5, 20)), 2))
+    with pytest.raises(ValueError):
+        BTree.join(left, BTree(3))
+
+
+def test_btree_stats():
+    """stats がレベルごとのノード数・キー数・充填率のヒストグラムを返すことをテストします。"""
+    assert BTree(3).stats() == {
+        "height": 1,
+        "nodes": 1,
+        "entries": 0,
+        "fill_factor": 0.0,
+        "levels": [
+            {
+                "nodes": 1,
+                "entries": 0,
+                "min_keys": 0,
+                "max_keys": 0,
+                "fill_histogram": [1] + [0] * 9,
+            }
+        ],
+    }
+
+    tree = BTree.from_sorted(((k, k) for k in range(1000)), 3)
+    stats = tree.stats()
+    assert stats["height"] == len(stats["levels"])
+    assert stats["entries"] == 1000
+    assert stats["nodes"] == _count_nodes(tree.root)
+    assert stats["fill_factor"] == 1000 / (stats["nodes"] * 5)
+    assert stats["levels"][0]["nodes"] == 1
+    for level in stats["levels"]:
+        assert sum(level["fill_histogram"]) == level["nodes"]
+    # from_sorted は右端以外のノードを満杯にする
+    leaves = stats["levels"][-1]
+    assert leaves["max_keys"] == 5
+    assert leaves["fill_histogram"][9] >= leaves["nodes"] - 1
+
+
+def test_btree_append_then_share(check_sizes):
+    """追記の直後に、右端のパスを共有する操作をしても有効な B木になることをテストします。"""
+    a, b = BTree(2, append_optimized=True), BTree(2, append_optimized=True)
+    for k in range(20):
+        a.insert(k, k)
+        b.insert(k + 20, k)
+    joined = BTree.join(a.snapshot(), b.snapshot())
+    check_sizes(joined.root, 2)
+    assert list(joined) == list(range(40))
+
+    tree = BTree(2, append_optimized=True)
+    for k in range(82):
+        tree.insert(k, k)
+    left, right = tree.snapshot().split_at(40)
+    for k in range(40, 82, 3):
+        assert right.delete(k) is True
+    check_sizes(left.root, 2)
+    check_sizes(right.root, 2)
+    assert list(left) == list(range(40))
+    assert list(right) == [k for k in range(40, 82) if (k - 40) % 3]
+    assert list(tree) == list(range(82))
+
+    tree = BTree(2, append_optimized=True)
+    for k in range(20):
+        tree.insert(k, k)
+    assert all(level["min_keys"] >= 1 for level in tree.stats()["levels"])
+
+
+def test_btree_append_optimized_default(check_sizes):
+    """追記の高速化は既定で無効で、単調増加するキーでも各ノードのキー数の下限が保たれることをテストします。"""
+    assert BTree(2).append_optimized is False
+    tree = BTree(2)
+    for k in range(20):
+        tree.insert(k, k)
+        check_sizes(tree.root, 2)
@@ -0,0 +1,114 @@
+import io
+import random
+
+import pytest
+
+from b_tree.b_tree import BTree
+from b_tree.buffered import BufferedBTree
+
+
+def _check_buffer(node):
+    """葉がバッファを持たず、非葉ノードのバッファのキーの配列がバッファと一致することを確認します。"""
+    if node.is_leaf:
+        assert node.buffer == []
+    else:
+        assert [m.key for m in node.buffer] == node.buffer_keys
+
+
+@pytest.mark.parametrize("t, buffer_size", [(2, 1), (2, 5), (3, 16), (8, 64)])
+def test_buffered_matches_model(t, buffer_size, check_sizes):
+    """ランダムな挿入・更新・削除の結果が、辞書と一致することをテストします。"""
+    rng = random.Random(t * 100 + buffer_size)
+    tree = BufferedBTree(t, buffer_size)
+    expected = {}
+    for step in range(4000):
+        key = rng.randrange(500)
+        op = rng.random()
+        if op < 0.5:
+            tree.insert(key, step)
+            expected[key] = step
+        elif op < 0.8:
+            assert tree.delete(key) is (key in expected)
+            expected.pop(key, None)
+        elif op < 0.9:
+            assert tree.update(key, -step) is (key in expected)
+            if key in expected:
+                expected[key] = -step
+        else:
+            batch = [(rng.randrange(500), step) for _ in range(20)]
+            tree.insert_many(batch)
+            expected.update(batch)
+        assert tree.get(key) == expected.get(key)
+        if step % 500 == 0:
+            check_sizes(tree.root, t, check_node=_check_buffer)
+
+    probes = list(range(500))
+    assert tree.get_many(probes) == [expected.get(k) for k in probes]
+    assert list(tree.items()) == sorted(expected.items())
+    assert tree.stats()["buffered_messages"] == 0
+    check_sizes(tree.root, t, check_node=_check_buffer)
+
+
+def test_buffered_search_applies_pending_message():
+    """search がバッファにある最新の値を、ペアに適用してから返すことをテストします。"""
+    tree = BufferedBTree.from_sorted(((k, k) for k in range(1000)), 3)
+    tree.buffer_size = 8
+    tree.insert(500, -1)
+    tree.insert(1000, 1000)
+    tree.delete(10)
+    assert tree.stats()["buffered_messages"] == 3
+
+    assert tree.get(500) == -1
+    found = tree.search(500)
+    assert found is not None
+    node, idx = found
+    assert node.items[idx].value == -1
+    assert tree.search(1000) is not None
+    assert tree.search(10) is None
+    assert tree.get(10) is None
+    assert tree.stats()["buffered_messages"] == 1
+    assert tree.stats()["entries"] >= 1000
+    assert list(tree) == [k for k in range(1001) if k != 10]
+    assert tree.stats()["buffered_messages"] == 0
+
+
+def test_buffered_bulk_operations_settle_buffers(check_sizes):
+    """範囲の削除・分割・連結・dump が、バッファを空にしてから行われることをテストします。"""
+    tree = BufferedBTree(2, buffer_size=4)
+    for k in random.Random(0).sample(range(300), 300):
+        tree.insert(k, k)
+    tree.delete_many(range(0, 300, 5))
+    remaining = [k for k in range(300) if k % 5]
+
+    assert tree.delete_range(100, 199) == sum(1 for k in remaining if 100 <= k <= 199)
+    remaining = [k for k in remaining if not 100 <= k <= 199]
+    assert list(tree) == remaining
+
+    buf = io.BytesIO()
+    tree.dump(buf)
+    buf.seek(0)
+    assert list(BTree.load(buf)) == remaining
+
+    left, right = tree.split_at(50)
+    assert isinstance(left, BufferedBTree)
+    assert left.buffer_size == right.buffer_size == 4
+    right.insert(50, 0)
+    joined = BufferedBTree.join(left, right)
+    assert isinstance(joined, BufferedBTree)
+    assert list(joined) == sorted(remaining + [50])
+    check_sizes(joined.root, 2, check_node=_check_buffer)
+
+
+def test_buffered_snapshot_and_invalid_size():
+    """スナップショットが作成時の状態を保つことと、不正な buffer_size をテストします。"""
+    tree = BufferedBTree(2, buffer_size=3)
+    tree.insert_many((k, k) for k in range(100))
+    snap = tree.snapshot()
+    for k in range(0, 100, 2):
+        tree.delete(k)
+    tree.insert(1, -1)
+    assert list(snap.items()) == [(k, k) for k in range(100)]
+    assert list(tree.items()) == [(1, -1)] + [(k, k) for k in range(3, 100, 2)]
+
+    with pytest.raises(ValueError):
+        BufferedBTree(3, buffer_size=0)
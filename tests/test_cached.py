@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from b_tree.cached import CachedBTree
+from b_tree.node import Node
+
+
+@pytest.mark.parametrize("admission", ["lru", "tinylfu"])
+@pytest.mark.parametrize("t", [2, 3])
+def test_cached_matches_search(t, admission):
+    """重複したキーを含むランダムな操作で、get が search と同じ値を返すことをテストします。"""
+    rng = random.Random(t)
+    tree = CachedBTree(t, cache_size=32, admission=admission)
+    present = {}
+    for step in range(4000):
+        key = rng.randrange(200)
+        op = rng.random()
+        if op < 0.3:
+            tree.insert(key, step)
+            present[key] = present.get(key, 0) + 1
+        elif op < 0.45:
+            assert tree.delete(key) is (present.get(key, 0) > 0)
+            if present.get(key):
+                present[key] -= 1
+        elif op < 0.55:
+            assert tree.update(key, -step) is (present.get(key, 0) > 0)
+        elif op < 0.58:
+            batch = [rng.randrange(200) for _ in range(8)]
+            for k, ok in zip(batch, tree.delete_many(batch), strict=True):
+                assert ok is (present.get(k, 0) > 0)
+                if ok:
+                    present[k] -= 1
+        elif op < 0.6:
+            lo = rng.randrange(200)
+            tree.delete_range(lo, lo + 10)
+            for k in range(lo, lo + 11):
+                present.pop(k, None)
+        # 読み込みは偏らせ、同じキーを何度も読む
+        for probe in (key, rng.randrange(10)):
+            found = tree.search(probe)
+            expected = None if found is None else found[0].items[found[1]].value
+            assert tree.get(probe) == expected
+    assert tree.cache_hits > 0
+    assert tree.cache_misses > 0
+
+
+def test_cached_hits_skip_descent(monkeypatch):
+    """キャッシュにあるキーの get と update がノードをたどらないことをテストします。"""
+    tree = CachedBTree.from_sorted(((k, k) for k in range(1000)), 3)
+    assert tree.get(500) == 500
+    assert tree.get(2000) is None
+    assert (tree.cache_hits, tree.cache_misses) == (0, 2)
+
+    monkeypatch.setattr(Node, "_find_key", lambda *args: pytest.fail("descended"))
+    monkeypatch.setattr(CachedBTree, "_load", lambda *args: pytest.fail("descended"))
+    assert tree.get(500) == 500
+    assert tree.update(500, -1) is True
+    assert tree.get(500) == -1
+    assert tree.stats()["cache_hits"] == 3
+    assert tree.stats()["cached_keys"] == 1
+
+
+def test_cached_invalidation_on_moves_and_duplicates():
+    """先行者との交換で移動したキーと、重複したキーが正しく扱われることをテストします。"""
+    tree = CachedBTree.from_sorted(((k, k) for k in range(100)), 2)
+    root_key = tree.root.items[0].key
+    for k in range(100):
+        tree.get(k)
+    # ルートのキーを削除すると、先行者または後続者のペアがルートへ移動する
+    tree.delete(root_key)
+    assert tree.get(root_key) is None
+    for k in range(100):
+        if k != root_key:
+            assert tree.get(k) == k
+            tree.update(k, k + 1)
+    assert list(tree.items()) == [(k, k + 1) for k in range(100) if k != root_key]
+
+    # 重複したキーはキャッシュに入れず、search と同じペアの値を返す
+    tree.insert(10, -10)
+    tree.get(10)
+    assert 10 not in tree._cache
+    found = tree.search(10)
+    assert tree.get(10) == found[0].items[found[1]].value
+    assert tree.delete(10) is True
+    assert tree.get(10) in (11, -10)
+
+
+def test_cached_snapshot_and_tinylfu():
+    """update がスナップショットを変えないことと、tinylfu がよく読まれるキーを残すことをテストします。"""
+    tree = CachedBTree(3, cache_size=4, admission="tinylfu")
+    tree.insert_many((k, k) for k in range(100))
+    for _ in range(5):
+        for k in range(4):
+            tree.get(k)
+    snap = tree.snapshot()
+    assert tree.update(0, -1) is True
+    assert tree.get(0) == -1
+    assert snap.get_many([0]) == [0]
+
+    # 一度しか読まれないキーの走査では、よく読まれるキーが追い出されない
+    for k in range(50, 100):
+        tree.get(k)
+    assert set(tree._cache) == {0, 1, 2, 3}
+
+    left, right = tree.split_at(50)
+    assert (left.cache_size, left.admission) == (4, "tinylfu")
+    assert CachedBTree.join(left, right).get(0) == -1
+
+    with pytest.raises(ValueError):
+        CachedBTree(3, cache_size=0)
+    with pytest.raises(ValueError):
+        CachedBTree(3, admission="fifo")
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from b_tree.compact import CompactBTree, CompactNode
+from b_tree.int_tree import IntBTree
+
+
+def _collect_keys(node):
+    """ノード以下のキーを中間順に集めるヘルパー関数。"""
+    if node.is_leaf:
+        return list(node.keys)
+    keys = []
+    for i, key in enumerate(node.keys):
+        keys.extend(_collect_keys(node.children[i]))
+        keys.append(key)
+    keys.extend(_collect_keys(node.children[-1]))
+    return keys
+
+
+def test_compact_node_has_no_dict():
+    """CompactNode がインスタンス辞書を持たないことをテストします。"""
+    node = CompactNode()
+    assert not hasattr(node, "__dict__")
+    assert node.is_leaf is True
+    assert CompactNode(children=[]).is_leaf is False
+
+
+def test_compact_btree_init_invalid():
+    with pytest.raises(ValueError):
+        CompactBTree(1)
+
+
+@pytest.mark.parametrize("t", [2, 3, 16])
+def test_compact_btree_random_operations(t, check_sizes):
+    """ランダムな挿入・検索・更新・削除の結果が辞書と一致することをテストします。"""
+    rng = random.Random(t)
+    keys = rng.sample(range(10000), 2000)
+    tree = CompactBTree(t)
+    expected = {}
+    for k in keys:
+        tree.insert(k, k * 10)
+        expected[k] = k * 10
+    check_sizes(tree.root, t)
+    assert _collect_keys(tree.root) == sorted(expected)
+
+    for k in range(0, 10000, 7):
+        result = tree.search(k)
+        if k in expected:
+            node, idx = result
+            assert node.values[idx] == expected[k]
+        else:
+            assert result is None
+        assert tree.get(k) == expected.get(k)
+
+    assert tree.update(keys[0], -1) is True
+    assert tree.update(-1, 0) is False
+    node, idx = tree.search(keys[0])
+    assert node.values[idx] == -1
+
+    rng.shuffle(keys)
+    for k in keys[:1500]:
+        assert tree.delete(k) is True
+        del expected[k]
+    assert tree.delete(-1) is False
+    check_sizes(tree.root, t)
+    assert _collect_keys(tree.root) == sorted(expected)
+
+    for k in keys[1500:]:
+        assert tree.delete(k) is True
+    assert tree.root.keys == []
+    assert tree.root.is_leaf
+
+
+def test_compact_btree_range():
+    """range が範囲内のペアを正しい順序で返すことをテストします。"""
+    tree = CompactBTree(2)
+    all_keys = list(range(0, 200, 2))
+    for k in reversed(all_keys):
+        tree.insert(k, k)
+    assert list(tree) == all_keys
+    assert list(tree.items()) == [(k, k) for k in all_keys]
+    bounds = [None, -5, 0, 1, 57, 58, 198, 400]
+    for lo in bounds:
+        for hi in bounds:
+            for inclusive in [(True, True), (False, False)]:
+                expected = [
+                    k
+                    for k in all_keys
+                    if (lo is None or k > lo or (inclusive[0] and k == lo))
+                    and (hi is None or k < hi or (inclusive[1] and k == hi))
+                ]
+                assert [k for k, _ in tree.range(lo, hi, inclusive)] == expected
+                assert [
+                    k for k, _ in tree.range(lo, hi, inclusive, reverse=True)
+                ] == expected[::-1]
+
+
+@pytest.mark.parametrize("t", [2, 3, 16])
+def test_compact_btree_batch_operations(t, check_sizes):
+    """insert_many と delete_many の結果が、1 件ずつの操作と一致することをテストします。"""
+    rng = random.Random(t)
+    tree = CompactBTree(t)
+    expected = []
+    for _ in range(20):
+        pairs = [(rng.randrange(500), rng.randrange(100)) for _ in range(150)]
+        tree.insert_many(pairs)
+        expected.extend(pairs)
+        check_sizes(tree.root, t)
+
+        keys = rng.sample(range(550), 60)
+        results = tree.delete_many(keys)
+        for key, ok in zip(keys, results, strict=True):
+            present = [k for k, _ in expected].count(key) > 0
+            assert ok is present
+            if ok:
+                expected.remove(next(p for p in expected if p[0] == key))
+        check_sizes(tree.root, t)
+        assert _collect_keys(tree.root) == sorted(k for k, _ in expected)
+
+    assert tree.delete_many([]) == []
+    tree.insert_many([])
+    # 重複したキーは 1 回の delete_many で 1 つずつ削除する
+    while expected:
+        keys = sorted({k for k, _ in expected})
+        assert tree.delete_many(keys) == [True] * len(keys)
+        for key in keys:
+            expected.remove(next(p for p in expected if p[0] == key))
+        check_sizes(tree.root, t)
+    assert tree.root.keys == []
+
+
+@pytest.mark.parametrize("cls", [CompactBTree, IntBTree])
+def test_compact_btree_delete_many_duplicate_keys(cls, check_sizes):
+    """入力や木に同じキーが複数ある場合も、delete_many の結果が逐次削除と一致することをテストします。"""
+    tree = cls(3)
+    for _ in range(6):
+        tree.insert(5, 1)
+    assert tree.delete_many([5] * 6) == [True] * 6
+    assert list(tree) == []
+
+    rng = random.Random(0)
+    for t in [2, 3]:
+        batched, sequential = cls(t), cls(t)
+        for step in range(1000):
+            key = rng.randrange(40)
+            batched.insert(key, step)
+            sequential.insert(key, step)
+        for _ in range(5):
+            keys = [rng.randrange(42) for _ in range(100)]
+            assert batched.delete_many(keys) == [sequential.delete(k) for k in keys]
+            check_sizes(batched.root, t)
+            assert list(batched) == list(sequential)
@@ -0,0 +1,169 @@
+import io
+import random
+import sys
+import threading
+
+import pytest
+
+from b_tree.b_tree import BTree
+from b_tree.concurrent import ConcurrentBTree, LatchedNode, RWLatch
+
+
+def _check_latched(node):
+    """ノードが `LatchedNode` であることを確認します。"""
+    assert isinstance(node, LatchedNode)
+
+
+@pytest.fixture
+def fast_switching():
+    """スレッドの切り替えを頻繁に起こして、競合が起きやすくします。"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_rw_latch_excludes_writers():
+    """排他ラッチの保持中は共有ラッチを取得できないことをテストします。"""
+    latch = RWLatch()
+    latch.acquire_shared()
+    latch.acquire_shared()
+    acquired = threading.Event()
+
+    def writer():
+        latch.acquire_exclusive()
+        acquired.set()
+        latch.release_exclusive()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert not acquired.wait(0.05)
+    latch.release_shared()
+    latch.release_shared()
+    thread.join(1)
+    assert acquired.is_set()
+
+
+@pytest.mark.parametrize("t", [2, 3, 5])
+def test_concurrent_btree_single_thread(t, check_sizes):
+    """単一スレッドでの操作結果が BTree と一致することをテストします。"""
+    rng = random.Random(t)
+    tree = ConcurrentBTree(t)
+    expected = {}
+    for _ in range(3000):
+        k = rng.randrange(500)
+        op = rng.random()
+        if op < 0.5:
+            if k not in expected:
+                tree.insert(k, k * 3)
+                expected[k] = k * 3
+        elif op < 0.8:
+            assert tree.delete(k) is (expected.pop(k, None) is not None)
+        else:
+            assert tree.update(k, -k) is (k in expected)
+            if k in expected:
+                expected[k] = -k
+        assert tree.get(k) == expected.get(k)
+    check_sizes(tree.root, t, check_node=_check_latched)
+    assert list(tree.items()) == sorted(expected.items())
+    assert list(tree.range(100, 200, (False, True), reverse=True)) == sorted(
+        ((k, v) for k, v in expected.items() if 100 < k <= 200), reverse=True
+    )
+
+    buf = io.BytesIO()
+    tree.dump(buf)
+    buf.seek(0)
+    loaded = ConcurrentBTree.load(buf)
+    check_sizes(loaded.root, t, check_node=_check_latched)
+    assert list(loaded.items()) == sorted(expected.items())
+    assert BTree.from_sorted(loaded.items(), t).get_many([1, 2]) == tree.get_many(
+        [1, 2]
+    )
+
+    removed = sum(1 for k in expected if 100 <= k <= 200)
+    assert tree.delete_range(100, 200) == removed
+    check_sizes(tree.root, t, check_node=_check_latched)
+    assert list(tree) == sorted(k for k in expected if not 100 <= k <= 200)
+
+
+@pytest.mark.parametrize("t", [2, 4])
+def test_concurrent_btree_stress(t, fast_switching, check_sizes):
+    """複数のスレッドから同時に挿入・削除・検索・走査しても整合性が保たれることをテストします。"""
+    tree = ConcurrentBTree.from_sorted(((k, k) for k in range(0, 4000, 4)), t)
+    errors = []
+
+    def writer(worker):
+        # 各スレッドは自分の担当するキー (k % 4 == worker) だけを変更する
+        rng = random.Random(worker)
+        mine = set(range(worker, 4000, 4)) if worker == 0 else set()
+        try:
+            for _ in range(1500):
+                k = rng.randrange(1000) * 4 + worker
+                if k in mine and rng.random() < 0.5:
+                    assert tree.delete(k) is True
+                    mine.discard(k)
+                elif k not in mine:
+                    tree.insert(k, k)
+                    mine.add(k)
+                assert tree.get(k) == (k if k in mine else None)
+            results[worker] = mine
+        except BaseException as e:  # noqa: BLE001
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(30):
+                keys = [k for k, _ in tree.range(1000, 3000)]
+                assert keys == sorted(keys)
+                assert all(1000 <= k <= 3000 for k in keys)
+        except BaseException as e:  # noqa: BLE001
+            errors.append(e)
+
+    results = {}
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    check_sizes(tree.root, t, check_node=_check_latched)
+    expected = sorted(set().union(*results.values()))
+    assert list(tree) == expected
+
+
+@pytest.mark.parametrize("t", [2, 3])
+def test_concurrent_btree_range_releases_latches(t, check_sizes):
+    """走査がラッチを保持したままにせず、重複するキーも BTree と同じ順に返すことをテストします。"""
+    rng = random.Random(t)
+    tree = ConcurrentBTree(t)
+    reference = BTree(t)
+    for _ in range(600):
+        k = rng.randrange(60)
+        tree.insert(k, k)
+        reference.insert(k, k)
+    for lo, hi in [(None, None), (10, 40), (25, 25)]:
+        for inclusive in [(True, True), (False, False)]:
+            for reverse in [False, True]:
+                assert sorted(tree.range(lo, hi, inclusive, reverse)) == sorted(
+                    reference.range(lo, hi, inclusive, reverse)
+                )
+                assert [k for k, _ in tree.range(lo, hi, inclusive, reverse)] == [
+                    k for k, _ in reference.range(lo, hi, inclusive, reverse)
+                ]
+
+    # 走査の途中で同じスレッドから変更してもデッドロックせず、先の変更が反映される
+    scan = tree.range(0, 100)
+    assert next(scan) == (0, 0)
+    tree.insert(99, -1)
+    assert tree.delete(59)
+    rest = [k for k, _ in scan]
+    assert rest == sorted(rest)
+    assert rest[-1] == 99
+    check_sizes(tree.root, t, check_node=_check_latched)
+
+    with pytest.raises(TypeError):
+        tree.snapshot()
+    with pytest.raises(TypeError):
+        tree.split_at(30)
@@ -0,0 +1,160 @@
+import random
+
+import pytest
+
+from b_tree.disk_tree import DiskBTree, degree_for_page_size
+from b_tree.pager import Pager
+
+
+def test_degree_for_page_size():
+    """ページサイズから決まる最小次数のノードが 1 ページに収まることをテストします。"""
+    for page_size in [128, 512, 4096, 8192]:
+        t = degree_for_page_size(page_size)
+        assert 8 + 16 * (2 * t - 1) + 8 * 2 * t <= page_size
+        assert 8 + 16 * (2 * t + 1) + 8 * 2 * (t + 1) > page_size
+    with pytest.raises(ValueError):
+        DiskBTree("unused", page_size=64)
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_disk_btree_persists_across_reopen(tmp_path, use_mmap, check_sizes):
+    """閉じて開き直した後も内容が保持されることをテストします。"""
+    path = str(tmp_path / "index.db")
+    rng = random.Random(0)
+    keys = rng.sample(range(100000), 3000)
+    expected = {}
+
+    with DiskBTree(path, page_size=256, cache_pages=16, use_mmap=use_mmap) as tree:
+        assert tree.t == degree_for_page_size(256)
+        for k in keys:
+            tree.insert(k, k * 7)
+            expected[k] = k * 7
+        # バッファプールはノード数の上限を超えない
+        assert len(tree.pool) <= 16
+
+    with DiskBTree(path, cache_pages=16, use_mmap=use_mmap) as tree:
+        assert tree.t == degree_for_page_size(256)
+        assert list(tree.items()) == sorted(expected.items())
+        for k in keys[:1500]:
+            assert tree.delete(k) is True
+            del expected[k]
+        assert tree.update(keys[2000], -1) is True
+        expected[keys[2000]] = -1
+
+    with DiskBTree(path, cache_pages=4, use_mmap=use_mmap) as tree:
+        check_sizes(tree.root, tree.t)
+        assert list(tree.items()) == sorted(expected.items())
+        node, idx = tree.search(keys[2000])
+        assert node.items[idx].value == -1
+        assert tree.search(keys[0]) is None
+        assert tree.get_many([keys[0], keys[2000]]) == [None, -1]
+
+
+def test_disk_btree_reuses_freed_pages(tmp_path):
+    """削除で解放されたページが再利用され、ファイルが増え続けないことをテストします。"""
+    path = str(tmp_path / "index.db")
+    with DiskBTree(path, page_size=256, cache_pages=8) as tree:
+        for _ in range(3):
+            tree.insert_many((k, k) for k in range(2000))
+            assert all(tree.delete_many(range(2000)))
+            assert list(tree) == []
+        page_count = tree.pager.page_count
+
+        tree.insert_many((k, k) for k in range(2000))
+        assert all(tree.delete_many(range(2000)))
+        assert tree.pager.page_count == page_count
+
+
+def test_pager_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a page file" * 100)
+    with pytest.raises(ValueError):
+        Pager(str(path), 4096, 2)
+
+
+def test_disk_btree_delete_range(tmp_path, check_sizes):
+    """delete_range で切り離したノードのページが解放され、再利用されることをテストします。"""
+    path = str(tmp_path / "index.db")
+    with DiskBTree(path, page_size=256, cache_pages=8) as tree:
+        tree.insert_many((k, k) for k in range(3000))
+        page_count = tree.pager.page_count
+        assert tree.delete_range(100, 2899) == 2800
+        check_sizes(tree.root, tree.t)
+        assert list(tree) == list(range(100)) + list(range(2900, 3000))
+
+        tree.insert_many((k, k) for k in range(100, 2900))
+        assert tree.pager.page_count <= page_count + 2
+
+    with DiskBTree(path) as tree:
+        assert list(tree) == list(range(3000))
+
+
+def test_disk_btree_batches_stay_within_cache(tmp_path, check_sizes):
+    """一括操作の途中でも、メモリ上のノード数がおよそ cache_pages に収まることをテストします。"""
+    path = str(tmp_path / "index.db")
+    with DiskBTree(path, page_size=256, cache_pages=16) as tree:
+        peak = 0
+        access = tree.pool.access
+
+        def tracking_access(node):
+            nonlocal peak
+            access(node)
+            peak = max(peak, len(tree.pool))
+
+        tree.pool.access = tracking_access
+        keys = random.Random(2).sample(range(100000), 5000)
+        tree.insert_many((k, -k) for k in keys)
+        assert all(tree.delete_many(keys[:2500]))
+        assert peak <= 2 * 16
+        check_sizes(tree.root, tree.t)
+        assert list(tree) == sorted(keys[2500:])
+
+
+def test_disk_btree_rejects_non_int64(tmp_path):
+    """64 ビットに収まらないキーや値が、ページに書き込む前に TypeError になることをテストします。"""
+    with DiskBTree(str(tmp_path / "index.db"), page_size=256, cache_pages=4) as tree:
+        tree.insert_many((k, k) for k in range(100))
+        with pytest.raises(TypeError):
+            tree.insert(101, 1 << 70)
+        with pytest.raises(TypeError):
+            tree.insert(1 << 63, 0)
+        with pytest.raises(TypeError):
+            tree.update(5, -(1 << 63) - 1)
+        with pytest.raises(TypeError):
+            tree.insert_many([(200, 0), (201, 1 << 64)])
+        for k in range(100, 200):
+            tree.insert(k, k)
+        tree.flush()
+        assert list(tree.items()) == [(k, k) for k in range(200)]
+
+
+def test_disk_btree_unsupported_operations(tmp_path):
+    """ページファイルのパスを必要とする B木を新しく作る操作が TypeError になることをテストします。"""
+    with DiskBTree(str(tmp_path / "index.db"), page_size=256) as tree:
+        tree.insert_many((k, k) for k in range(100))
+        with pytest.raises(TypeError):
+            tree.snapshot()
+        with pytest.raises(TypeError):
+            tree.split_at(50)
+        assert list(tree) == list(range(100))
+    with pytest.raises(TypeError):
+        DiskBTree.from_sorted([(1, 1)], 2)
+    with pytest.raises(TypeError):
+        DiskBTree.load(None)
+
+
+def test_disk_btree_append_then_reopen(tmp_path, check_sizes):
+    """追記の直後に閉じても、開き直した B木が有効であることをテストします。"""
+    path = str(tmp_path / "index.db")
+    with DiskBTree(path, page_size=120) as tree:
+        tree.append_optimized = True
+        for k in range(17):
+            tree.insert(k, k)
+
+    keys = list(range(17))
+    random.Random(3).shuffle(keys)
+    with DiskBTree(path) as tree:
+        check_sizes(tree.root, tree.t)
+        for i, k in enumerate(keys):
+            assert tree.delete(k) is True
+            assert list(tree) == sorted(keys[i + 1 :])
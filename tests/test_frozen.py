@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+import b_tree.frozen
+from b_tree.b_tree import BTree
+from b_tree.frozen import FrozenBTree
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_freeze_matches_tree(monkeypatch, use_numpy):
+    """freeze した木の検索と走査が、元の B木と一致することをテストします。"""
+    if not use_numpy:
+        monkeypatch.setattr(b_tree.frozen, "_HAS_NUMPY", False)
+    rng = random.Random(1)
+    tree = BTree(3)
+    for step in range(2000):
+        tree.insert(rng.randrange(1000), step)
+    frozen = tree.freeze()
+
+    probes = [rng.randrange(-10, 1010) for _ in range(500)] + [2**70]
+    expected = [dict(reversed(list(tree.items()))).get(k) for k in probes]
+    assert [frozen.get(k) for k in probes] == expected
+    assert frozen.get_many(probes) == expected
+    assert frozen.get_many(probes[:-1]) == expected[:-1]
+    assert list(frozen.items()) == list(tree.items())
+    assert len(frozen) == len(list(tree))
+    for lo, hi in [(None, None), (100, 200), (500, None), (300, 299)]:
+        for inclusive in [(True, True), (False, False)]:
+            for reverse in [False, True]:
+                assert list(frozen.range(lo, hi, inclusive, reverse)) == list(
+                    tree.range(lo, hi, inclusive, reverse)
+                )
+
+    # 凍結した後に元の B木を変更しても、凍結した木は変わらない
+    tree.delete_range(0, 1000)
+    assert list(frozen) == sorted(frozen)
+    assert len(frozen) > 0
+
+
+def test_frozen_save_and_open(tmp_path):
+    """save したファイルを open で mmap し、コピーなしで検索できることをテストします。"""
+    path = tmp_path / "index.frozen"
+    frozen = BTree.from_sorted(((k, -k) for k in range(0, 30000, 3)), 8).freeze()
+    with open(path, "wb") as file:
+        frozen.save(file)
+
+    with FrozenBTree.open(str(path)) as opened:
+        assert isinstance(opened._keys, memoryview)
+        assert len(opened) == 10000
+        assert opened.get(2997) == -2997
+        assert opened.get(2998) is None
+        assert opened.get_many([0, 1, 3.5, 29997]) == [0, None, None, -29997]
+        assert list(opened.range(30, 40)) == [
+            (30, -30),
+            (33, -33),
+            (36, -36),
+            (39, -39),
+        ]
+        assert list(opened.items()) == list(frozen.items())
+    assert opened._mmap is None
+
+    empty = tmp_path / "empty.frozen"
+    with open(empty, "wb") as file:
+        BTree(2).freeze().save(file)
+    with FrozenBTree.open(str(empty)) as opened:
+        assert opened.get(0) is None
+        assert opened.get_many([0]) == [None]
+
+
+def test_frozen_errors(tmp_path):
+    """不正な入力とファイル、int 以外のキーの保存がエラーになることをテストします。"""
+    with pytest.raises(ValueError):
+        FrozenBTree.from_sorted([(2, 0), (1, 0)])
+
+    words = BTree.from_sorted([("apple", 1), ("banana", 2), ("cherry", 3)], 2).freeze()
+    assert words.get("banana") == 2
+    assert words.get_many(["cherry", "date"]) == [3, None]
+    with pytest.raises(TypeError):
+        with open(tmp_path / "words", "wb") as file:
+            words.save(file)
+
+    path = tmp_path / "bad"
+    path.write_bytes(b"NOTFROZE" + bytes(8))
+    with pytest.raises(ValueError):
+        FrozenBTree.open(str(path))
+    path.write_bytes(b"BTFROZ01" + (100).to_bytes(8, "little") + bytes(16))
+    with pytest.raises(ValueError):
+        FrozenBTree.open(str(path))
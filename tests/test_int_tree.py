@@ -0,0 +1,102 @@
+import random
+from array import array
+
+import pytest
+
+import b_tree.int_tree as int_tree
+from b_tree.int_tree import IntBTree, IntNode
+
+
+def _check_arrays(node):
+    """キーと値が型付き配列に格納されていることを確認します。"""
+    assert isinstance(node.keys, array)
+    assert isinstance(node.values, array)
+
+
+def test_int_node_uses_typed_arrays():
+    node = IntNode()
+    assert node.keys.typecode == "q"
+    assert node.values.typecode == "q"
+    assert node.is_leaf is True
+
+
+@pytest.mark.parametrize("t", [2, 3, 16])
+def test_int_btree_random_operations(t, check_sizes):
+    """ランダムな挿入・検索・更新・削除の結果が辞書と一致することをテストします。"""
+    rng = random.Random(t)
+    keys = rng.sample(range(-(2**40), 2**40), 2000)
+    tree = IntBTree(t)
+    expected = {}
+    for k in keys:
+        tree.insert(k, k // 3)
+        expected[k] = k // 3
+    check_sizes(tree.root, t, check_node=_check_arrays)
+    assert list(tree.items()) == sorted(expected.items())
+
+    node, idx = tree.search(keys[10])
+    assert node.values[idx] == expected[keys[10]]
+    assert tree.search(2**41) is None
+    assert tree.get(keys[10]) == expected[keys[10]]
+    assert tree.get(2**41) is None
+    assert tree.update(keys[10], 7) is True
+    expected[keys[10]] = 7
+
+    rng.shuffle(keys)
+    assert tree.delete_many(keys[:1000] + [2**41]) == [True] * 1000 + [False]
+    for k in keys[:1000]:
+        del expected[k]
+    check_sizes(tree.root, t, check_node=_check_arrays)
+    assert list(tree) == sorted(expected)
+    assert [k for k, _ in tree.range(0, 2**39)] == sorted(
+        k for k in expected if 0 <= k <= 2**39
+    )
+
+
+@pytest.mark.parametrize("t", [2, 5])
+@pytest.mark.parametrize("fill_factor", [1.0, 0.5])
+def test_int_btree_from_sorted(t, fill_factor, check_sizes):
+    for n in list(range(0, 40)) + [1000]:
+        tree = IntBTree.from_sorted(((k, -k) for k in range(n)), t, fill_factor)
+        check_sizes(tree.root, t, check_node=_check_arrays)
+        assert list(tree.items()) == [(k, -k) for k in range(n)]
+        tree.insert_many([(n + 1, 0), (n, 0)])
+        assert list(tree)[-2:] == [n, n + 1]
+        check_sizes(tree.root, t, check_node=_check_arrays)
+
+    with pytest.raises(ValueError):
+        IntBTree.from_sorted([(1, 0), (0, 0)], 2)
+
+
+def test_int_btree_batches_do_not_insert_one_by_one(monkeypatch, check_sizes):
+    """insert_many と delete_many が 1 件ずつの操作を使わず、型付き配列を保つことをテストします。"""
+    monkeypatch.setattr(IntBTree, "insert", lambda *args: pytest.fail("insert"))
+    monkeypatch.setattr(IntBTree, "delete", lambda *args: pytest.fail("delete"))
+    tree = IntBTree(3)
+    tree.insert_many((k, -k) for k in range(999, -1, -1))
+    tree.insert_many([(500, 1), (2000, 2)])
+    check_sizes(tree.root, 3, check_node=_check_arrays)
+    assert sorted(v for k, v in tree.items() if k == 500) == [-500, 1]
+    assert tree.get_many([2000, 1000]) == [2, None]
+    assert tree.delete_many([500, 7, 5000]) == [True, True, False]
+    check_sizes(tree.root, 3, check_node=_check_arrays)
+    assert list(tree) == [k for k in range(1000) if k != 7] + [2000]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_int_btree_get_many(monkeypatch, use_numpy):
+    """get_many が numpy の有無にかかわらず入力順に結果を返すことをテストします。"""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    monkeypatch.setattr(int_tree, "_HAS_NUMPY", use_numpy)
+
+    tree = IntBTree.from_sorted(((k, k * 2) for k in range(0, 5000, 2)), 4)
+    probes = [4999, 4, 3, 4, -1, 0, 4998, 2500, 10**12]
+    assert tree.get_many(probes) == [None, 8, None, 8, None, 0, 9996, 5000, None]
+    assert tree.get_many([]) == []
+
+    rng = random.Random(0)
+    probes = [rng.randrange(-10, 5010) for _ in range(3000)]
+    assert tree.get_many(probes) == [
+        k * 2 if k % 2 == 0 and 0 <= k < 5000 else None for k in probes
+    ]
+    assert IntBTree(2).get_many([1]) == [None]
@@ -161,3 +161,13 @@ def test_delete_from_leaf():
     assert len(node.items) == initial_length - 2
     keys2 = [item.key for item in node.items]
     assert keys2 == [10, 30]  # キーが削除され、順序が維持されているか
+
+
+def test_find_key_binary_search():
+    node = Node(4, True)
+    node.items = [KeyValuePair(k, k) for k in [10, 20, 30, 40]]
+    assert node._find_key(5) == 0
+    assert node._find_key(10) == 0
+    assert node._find_key(25) == 2
+    assert node._find_key(40) == 3
+    assert node._find_key(45) == 4
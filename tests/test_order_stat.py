@@ -0,0 +1,148 @@
+import io
+import random
+from bisect import bisect_left, bisect_right
+
+import pytest
+
+from b_tree.order_stat import OrderStatisticBTree, SizedNode
+
+
+def _check_sizes(node):
+    """各ノードの size がサブツリーのキー数と一致しているかを確認し、キー数を返します。"""
+    assert isinstance(node, SizedNode)
+    size = len(node.items) + sum(_check_sizes(child) for child in node.children)
+    assert node.size == size
+    return size
+
+
+def _check_queries(tree, keys, rng):
+    """len / rank / select / count_range をソート済みのキーのリストと比較します。"""
+    _check_sizes(tree.root)
+    assert len(tree) == len(keys)
+    for k in range(len(keys)):
+        assert tree.select(k)[0] == keys[k]
+    for _ in range(50):
+        lo, hi = sorted(rng.randrange(-10, 1010) for _ in range(2))
+        assert tree.rank(lo) == bisect_left(keys, lo)
+        assert tree.count_range(lo, hi) == bisect_right(keys, hi) - bisect_left(
+            keys, lo
+        )
+        assert tree.count_range(lo, hi, (False, False)) == max(
+            0, bisect_left(keys, hi) - bisect_right(keys, lo)
+        )
+
+
+def test_queries_after_random_operations():
+    """挿入・削除・一括操作を混ぜた後も、順位に関する問い合わせが正しいことをテストします。"""
+    rng = random.Random(0)
+    for t in (2, 3, 5):
+        tree = OrderStatisticBTree(t)
+        keys = []
+        for step in range(1500):
+            op = rng.random()
+            if op < 0.5:
+                key = rng.randrange(1000)
+                tree.insert(key, key)
+                keys.append(key)
+            elif op < 0.8:
+                key = rng.randrange(1000)
+                if tree.delete(key):
+                    keys.remove(key)
+            elif op < 0.9:
+                batch = [rng.randrange(1000) for _ in range(20)]
+                tree.insert_many((key, key) for key in batch)
+                keys.extend(batch)
+            else:
+                batch = [rng.randrange(1000) for _ in range(20)]
+                for key, ok in zip(batch, tree.delete_many(batch), strict=True):
+                    if ok:
+                        keys.remove(key)
+            keys.sort()
+            if step % 100 == 0:
+                _check_queries(tree, keys, rng)
+        _check_queries(tree, keys, rng)
+
+
+def test_queries_after_appends():
+    """右端への追記と、その後の削除による右端の修正でも size が保たれることをテストします。"""
+    rng = random.Random(1)
+    tree = OrderStatisticBTree(3)
+    tree.append_optimized = True
+    for key in range(0, 1000, 2):
+        tree.insert(key, key)
+    keys = list(range(0, 1000, 2))
+    _check_queries(tree, keys, rng)
+
+    tree.insert(501, 501)
+    tree.delete(998)
+    keys.remove(998)
+    keys.append(501)
+    keys.sort()
+    _check_queries(tree, keys, rng)
+
+
+def test_from_sorted_load_and_snapshot():
+    """from_sorted / load で構築した B木と、スナップショット後の変更で size が正しいことをテストします。"""
+    rng = random.Random(2)
+    keys = list(range(0, 1000, 3))
+    tree = OrderStatisticBTree.from_sorted(((k, k) for k in keys), 4)
+    _check_queries(tree, keys, rng)
+
+    buf = io.BytesIO()
+    tree.dump(buf)
+    buf.seek(0)
+    loaded = OrderStatisticBTree.load(buf)
+    assert isinstance(loaded, OrderStatisticBTree)
+    _check_queries(loaded, keys, rng)
+
+    snap = tree.snapshot()
+    tree.insert(1, 1)
+    tree.delete(0)
+    _check_queries(tree, sorted(keys[1:] + [1]), rng)
+    assert list(snap) == keys
+
+
+def test_select_and_empty_tree():
+    """空の B木と select の範囲外の順位、負の順位をテストします。"""
+    tree = OrderStatisticBTree(2)
+    assert len(tree) == 0
+    assert tree.rank(5) == 0
+    assert tree.count_range() == 0
+    with pytest.raises(IndexError):
+        tree.select(0)
+
+    tree.insert_many((k, k * 10) for k in range(10))
+    assert tree.select(-1) == (9, 90)
+    assert tree.select(3) == (3, 30)
+    assert tree.count_range(hi=4, inclusive=(True, False)) == 4
+    with pytest.raises(IndexError):
+        tree.select(10)
+
+
+def test_delete_range_keeps_sizes():
+    """delete_range の後も size が正しく、削除した数を size から求めることをテストします。"""
+    rng = random.Random(3)
+    keys = list(range(1000))
+    tree = OrderStatisticBTree.from_sorted(((k, k) for k in keys), 3)
+    for lo, hi in [(100, 200), (-5, 50), (900, 2000), (300, 301), (250, 700)]:
+        expected = [k for k in keys if not lo <= k <= hi]
+        assert tree.delete_range(lo, hi) == len(keys) - len(expected)
+        keys = expected
+        _check_queries(tree, keys, rng)
+
+
+def test_split_at_and_join_keep_sizes():
+    """split_at と join で作った B木の size が正しいことをテストします。"""
+    rng = random.Random(4)
+    keys = sorted(rng.choices(range(1000), k=800))
+    tree = OrderStatisticBTree.from_sorted(((k, k) for k in keys), 3)
+    left, right = tree.split_at(400)
+    assert isinstance(left, OrderStatisticBTree)
+    _check_queries(left, [k for k in keys if k < 400], rng)
+    _check_queries(right, [k for k in keys if k >= 400], rng)
+
+    small = OrderStatisticBTree.from_sorted(((k, k) for k in range(2000, 2005)), 3)
+    joined = OrderStatisticBTree.join(right, small)
+    _check_queries(joined, [k for k in keys if k >= 400] + list(range(2000, 2005)), rng)
+    joined = OrderStatisticBTree.join(left, joined)
+    _check_queries(joined, keys + list(range(2000, 2005)), rng)
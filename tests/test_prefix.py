@@ -0,0 +1,163 @@
+import random
+
+import pytest
+
+from b_tree.prefix import PrefixBPlusTree, PrefixNode
+
+
+def _check_tree(tree):
+    """B+木の制約と、各ノードの接頭辞と接尾辞を確認し、葉を順にたどったキーを返します。"""
+    t = tree.t
+
+    def walk(node, is_root, lo, hi):
+        assert isinstance(node, PrefixNode)
+        assert len(node.keys) <= 2 * t - 1
+        if not is_root:
+            assert len(node.keys) >= t - 1
+        keys = node._full_keys()
+        assert keys == sorted(keys)
+        for key in keys:
+            # 同じキーが複数ある場合、区切りキーと等しいキーは左側の子ノードにも残る
+            assert (lo is None or key >= lo) and (hi is None or key <= hi)
+        if node.is_leaf:
+            assert len(node.values) == len(node.keys)
+            return 1
+        assert len(node.children) == len(node.keys) + 1
+        bounds = [lo] + keys + [hi]
+        heights = {
+            walk(child, False, bounds[i], bounds[i + 1])
+            for i, child in enumerate(node.children)
+        }
+        assert len(heights) == 1
+        return heights.pop() + 1
+
+    walk(tree.root, True, None, None)
+
+    leaf = tree.root
+    while not leaf.is_leaf:
+        leaf = leaf.children[0]
+    keys = []
+    while leaf is not None:
+        keys.extend(leaf._full_keys())
+        if leaf.next is not None:
+            assert leaf.next.prev is leaf
+        leaf = leaf.next
+    return keys
+
+
+def _url(rng):
+    """接頭辞を共有する URL 風のキーを作成します。"""
+    host = rng.choice(["example.com", "example.org", "b.example.com"])
+    path = "/".join(rng.choice(["api", "v1", "v2", "users", "items"]) for _ in range(3))
+    return f"https://{host}/{path}/{rng.randrange(1000)}"
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_prefix_tree_matches_model(t):
+    """ランダムな挿入・更新・削除の結果が、辞書と一致することをテストします。"""
+    rng = random.Random(t)
+    tree = PrefixBPlusTree(t)
+    expected = {}
+    for step in range(3000):
+        key = _url(rng)
+        op = rng.random()
+        if op < 0.6:
+            if key not in expected:
+                tree.insert(key, step)
+                expected[key] = step
+        elif op < 0.9:
+            assert tree.delete(key) is (key in expected)
+            expected.pop(key, None)
+        else:
+            assert tree.update(key, -step) is (key in expected)
+            if key in expected:
+                expected[key] = -step
+        found = tree.search(key)
+        assert (found is not None) is (key in expected)
+        if found is not None:
+            leaf, i = found
+            assert leaf.values[i] == expected[key]
+
+    assert _check_tree(tree) == sorted(expected)
+    assert list(tree.items()) == sorted(expected.items())
+    lo, hi = "https://example.com/v1", "https://example.org/api/v1"
+    assert list(tree.range(lo, hi, inclusive=(True, False))) == [
+        (k, v) for k, v in sorted(expected.items()) if lo <= k < hi
+    ]
+    assert list(tree.range(lo, hi, reverse=True)) == [
+        (k, v) for k, v in sorted(expected.items(), reverse=True) if lo <= k <= hi
+    ]
+
+
+def test_prefix_nodes_store_suffixes_and_short_separators():
+    """ノードが共通接頭辞を 1 つだけ持ち、区切りキーが最も短いキーになることをテストします。"""
+    tree = PrefixBPlusTree(2)
+    for name in ["alpha", "alpine", "beta", "betamax"]:
+        tree.insert(f"/srv/data/{name}", len(name))
+
+    root = tree.root
+    assert root._full_keys() == ["/srv/data/b"]
+    left, right = root.children
+    assert (left.prefix, left.keys) == ("/srv/data/alp", ["ha", "ine"])
+    assert (right.prefix, right.keys) == ("/srv/data/beta", ["", "max"])
+
+    # 接頭辞を共有しないキーを挿入すると接頭辞が短くなる
+    tree.insert("/srv/data/a", 1)
+    assert left.prefix == "/srv/data/a"
+    assert tree.search("/srv/data/alpine")[0] is left
+    assert tree.search("/srv/data/al") is None
+    assert list(tree) == [
+        "/srv/data/a",
+        "/srv/data/alpha",
+        "/srv/data/alpine",
+        "/srv/data/beta",
+        "/srv/data/betamax",
+    ]
+
+
+def test_prefix_tree_bytes_keys():
+    """bytes のキーを格納でき、str 以外の型のキーは TypeError になることをテストします。"""
+    tree = PrefixBPlusTree(3)
+    keys = [b"/var/log/app/%05d" % i for i in range(500)]
+    for i, key in enumerate(reversed(keys)):
+        tree.insert(key, i)
+    for key in keys[::3]:
+        assert tree.delete(key) is True
+    assert _check_tree(tree) == [key for i, key in enumerate(keys) if i % 3]
+    assert tree.search(b"/var/log/app/00001") is not None
+    assert tree.search(b"/var/log/app/00000") is None
+
+    with pytest.raises(TypeError):
+        tree.insert(1, 1)
+
+
+@pytest.mark.parametrize("make_key", [lambda i: f"/srv/{i:03d}", lambda i: b"k%d" % i])
+def test_prefix_tree_duplicate_keys(make_key):
+    """同じキーが左右の葉に分かれても、検索・更新・削除・範囲の走査で見つかることをテストします。"""
+    rng = random.Random(0)
+    for t in [2, 3]:
+        tree = PrefixBPlusTree(t)
+        model = []
+        for step in range(2000):
+            key = make_key(rng.randrange(30))
+            if rng.random() < 0.55:
+                tree.insert(key, step)
+                model.append(key)
+            else:
+                assert (tree.search(key) is not None) == (key in model)
+                assert tree.update(key, step) == (key in model)
+                assert tree.delete(key) == (key in model)
+                if key in model:
+                    model.remove(key)
+        assert _check_tree(tree) == sorted(model)
+        lo, hi = make_key(10), make_key(20)
+        for inclusive in [(True, True), (False, False)]:
+            expected = [
+                key
+                for key in sorted(model)
+                if lo < key < hi or (inclusive[0] and key in (lo, hi))
+            ]
+            assert [key for key, _ in tree.range(lo, hi, inclusive)] == expected
+            assert [
+                key for key, _ in tree.range(lo, hi, inclusive, reverse=True)
+            ] == expected[::-1]
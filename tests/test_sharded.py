@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from b_tree.sharded import ShardedBTree
+
+
+@pytest.fixture
+def tree():
+    """偶数のキーを 3 つのシャードに分けて持つ B木を作成し、テストの後にワーカーを終了します。"""
+    with ShardedBTree.from_sorted(
+        ((k, k) for k in range(0, 3000, 2)), 3, shards=3
+    ) as tree:
+        yield tree
+
+
+def test_sharded_bulk_load_and_lookups(tree):
+    """並列の一括構築で均等なシャードに分かれ、一括検索が入力の順に値を返すことをテストします。"""
+    assert tree.boundaries == [1000, 2000]
+    assert tree.shard_sizes() == [500, 500, 500]
+    assert len(tree) == 1500
+
+    probes = random.Random(0).sample(range(-10, 3010), 500)
+    assert tree.get_many(probes) == [
+        k if k % 2 == 0 and 0 <= k < 3000 else None for k in probes
+    ]
+    assert tree.get(1000) == 1000
+    assert tree.get(1001) is None
+
+
+def test_sharded_writes_and_range_scans(tree):
+    """一括挿入・削除の後の範囲の走査が、シャードをまたいでキーの順に並ぶことをテストします。"""
+    tree.chunk_size = 7
+    tree.insert_many((k, -k) for k in range(1, 3000, 10))
+    assert tree.delete_many([0, 1, 999999]) == [True, True, False]
+    assert tree.update(2, -2) is True
+    tree.insert(-5, 5)
+    expected = sorted(
+        {
+            **{k: k for k in range(0, 3000, 2)},
+            **{k: -k for k in range(1, 3000, 10)},
+            2: -2,
+            -5: 5,
+        }.items()
+    )
+    expected = [(k, v) for k, v in expected if k not in (0, 1)]
+
+    assert list(tree.items()) == expected
+    assert list(tree.range(990, 2010, inclusive=(False, True))) == [
+        (k, v) for k, v in expected if 990 < k <= 2010
+    ]
+    assert list(tree.range(None, 1500, reverse=True)) == [
+        (k, v) for k, v in reversed(expected) if k <= 1500
+    ]
+
+    # 途中でやめた走査の後も、他の操作の応答が混ざらない
+    scan = tree.range(500)
+    assert next(scan) == (500, 500)
+    assert tree.get(2500) == 2500
+    assert next(scan) == (501, -501)
+    scan.close()
+    assert tree.delete_range(1000, 1999) == sum(
+        1 for k, _ in expected if 1000 <= k <= 1999
+    )
+    assert tree.shard_sizes()[1] == 0
+
+
+def test_sharded_range_closes_every_scan(tree, monkeypatch):
+    """走査をやめるときに 1 つのシャードで例外が発生しても、他のシャードの走査を閉じることをテストします。"""
+    tree.chunk_size = 4
+    scan = tree.range()
+    assert next(scan) == (0, 0)
+    failing = tree._shards[1]
+    receive = failing.receive
+
+    def failing_receive(ticket):
+        receive(ticket)
+        raise RuntimeError("受信に失敗しました。")
+
+    monkeypatch.setattr(failing, "receive", failing_receive)
+    with pytest.raises(RuntimeError):
+        scan.close()
+    monkeypatch.undo()
+    for shard in tree._shards:
+        assert shard._received == shard._sent
+        assert not shard._replies
+    assert list(tree.range(0, 10)) == [(k, k) for k in range(0, 11, 2)]
+
+
+def test_sharded_errors():
+    """不正な引数とワーカーでの例外が親プロセスで送出されることをテストします。"""
+    with pytest.raises(ValueError):
+        ShardedBTree(3, boundaries=[5, 5])
+    with pytest.raises(ValueError):
+        ShardedBTree.from_sorted([(2, 2), (1, 1)], 3, shards=2)
+    with ShardedBTree(3, boundaries=[10]) as tree:
+        tree.insert_many([(1, 1), (20, 20)])
+        with pytest.raises(TypeError):
+            tree.get_many([1, "a"])
+        assert tree.get_many([1, 20]) == [1, 20]
@@ -0,0 +1,102 @@
+import random
+import threading
+
+import pytest
+
+from b_tree.b_tree import BTree
+from b_tree.concurrent import ConcurrentBTree
+from b_tree.node import Node
+from b_tree.order_stat import OrderStatisticBTree
+from b_tree.stats import OperationCounters, count_operations
+
+
+def test_count_operations_counts_structure_changes():
+    """分割・マージ・借用・高さの変化が数えられることをテストします。"""
+    tree = BTree(2)
+    with count_operations() as counters:
+        for k in range(100):
+            tree.insert(k, k)
+        grows = counters.root_grows
+        assert counters.splits > 0
+        assert grows == tree._height() - 1
+        for k in range(100):
+            tree.delete(k)
+    assert counters.merges > 0
+    assert counters.borrows_from_prev + counters.borrows_from_next > 0
+    assert counters.root_shrinks == grows
+    assert counters.comparisons > counters.node_visits > 0
+
+
+def test_count_operations_counts_appends():
+    """追記の高速化による挿入と右寄りの分割が数えられることをテストします。"""
+    tree = BTree(4, append_optimized=True)
+    with count_operations() as counters:
+        for k in range(10000):
+            tree.insert(k, k)
+    assert counters.appends == 10000
+    assert counters.splits == 0
+    assert counters.root_grows == tree._height() - 1
+
+    # 最初の葉のほかは、右寄りの分割と新しいルートで作ったノード
+    def count_nodes(node):
+        return 1 + sum(count_nodes(child) for child in node.children)
+
+    assert count_nodes(tree.root) == 1 + counters.right_splits + counters.root_grows
+
+
+def test_count_operations_restores_methods():
+    """ブロックを抜けるとカウンタが外れ、入れ子にできないことをテストします。"""
+    split_child = Node.split_child
+    insert = BTree.insert
+    with count_operations() as counters:
+        assert Node._counters is counters
+        assert Node.split_child is split_child
+        assert BTree.insert is insert
+        with pytest.raises(RuntimeError):
+            with count_operations():
+                pass
+    assert Node._counters is None
+
+    tree = BTree(2)
+    for k in range(50):
+        tree.insert(k, k)
+    assert counters.as_dict()["comparisons"] == 0
+
+
+def test_count_operations_ignores_other_threads():
+    """他のスレッドの操作は数えず、ConcurrentBTree の高さの変化も数えることをテストします。"""
+    tree = ConcurrentBTree(2)
+    with count_operations() as counters:
+        worker = threading.Thread(
+            target=lambda: [tree.insert(k, k) for k in range(100)]
+        )
+        worker.start()
+        worker.join()
+        assert counters.as_dict() == OperationCounters().as_dict()
+
+        height = tree._height()
+        for k in range(100, 1000):
+            tree.insert(k, k)
+        assert counters.root_grows == tree._height() - height > 0
+        assert counters.splits > 0
+        height = tree._height()
+        for k in range(1000):
+            tree.delete(k)
+    assert counters.root_shrinks == height - 1
+
+
+def test_count_operations_search_visits():
+    """検索で訪問するノード数が木の高さと一致し、サブクラスの分割も数えられることをテストします。"""
+    rng = random.Random(0)
+    tree = OrderStatisticBTree.from_sorted(((k, k) for k in range(10_000)), 4)
+    with count_operations() as counters:
+        tree.search(rng.randrange(10_000) * 2 + 20_000)
+    assert counters.node_visits == tree._height()
+
+    keys = list(range(10_000, 11_000))
+    rng.shuffle(keys)
+    with count_operations() as counters:
+        for k in keys:
+            tree.insert(k, k)
+    assert counters.splits > 0
+    assert len(tree) == 11_000
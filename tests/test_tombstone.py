@@ -0,0 +1,114 @@
+import io
+import random
+
+import pytest
+
+from b_tree.b_tree import BTree
+from b_tree.node import Node
+from b_tree.tombstone import TombstoneBTree
+
+
+@pytest.mark.parametrize("t", [2, 3, 8])
+def test_tombstone_matches_model(t, check_sizes):
+    """重複したキーを含むランダムな操作の結果が、ソート済みのリストと一致することをテストします。"""
+    rng = random.Random(t)
+    tree = TombstoneBTree(t, compact_ratio=0.3)
+    expected = []
+    for _ in range(4000):
+        key = rng.randrange(300)
+        op = rng.random()
+        if op < 0.45:
+            tree.insert(key, key)
+            expected.append(key)
+        elif op < 0.85:
+            assert tree.delete(key) is (key in expected)
+            if key in expected:
+                expected.remove(key)
+        elif op < 0.95:
+            assert tree.update(key, key) is (key in expected)
+        else:
+            batch = [rng.randrange(300) for _ in range(10)]
+            results = tree.delete_many(batch)
+            for k, ok in zip(batch, results, strict=True):
+                assert ok is (k in expected)
+                if ok:
+                    expected.remove(k)
+        assert (tree.search(key) is not None) is (key in expected)
+        assert tree.dead_entries <= 0.3 * len(expected) / 0.7 + 1
+    expected.sort()
+    check_sizes(tree.root, t)
+    assert list(tree) == expected
+    assert list(tree.range(100, 200, reverse=True)) == [
+        (k, k) for k in reversed(expected) if 100 <= k <= 200
+    ]
+    probes = list(range(300))
+    assert tree.get_many(probes) == [k if k in expected else None for k in probes]
+
+
+def test_tombstone_delete_does_not_restructure(monkeypatch, check_sizes):
+    """削除がノードを組み替えず、割合を超えたときにまとめて組み直すことをテストします。"""
+    tree = TombstoneBTree.from_sorted(((k, k) for k in range(1000)), 3)
+    tree.compact_ratio = 0.5
+    for name in ["_merge_children", "_borrow_from_prev", "_borrow_from_next"]:
+        monkeypatch.setattr(Node, name, lambda *args, name=name: pytest.fail(name))
+
+    root = tree.root
+    for k in range(0, 1000, 2):
+        assert tree.delete(k) is True
+    assert tree.root is root
+    assert tree.dead_entries == 500
+    assert tree.stats()["entries"] == 1000
+    assert tree.search(0) is None
+    assert tree.get_many([0, 1]) == [None, 1]
+
+    # 生きているペアの割合が半分を下回ると、墓標を取り除いて組み直す
+    assert tree.delete(1) is True
+    assert tree.dead_entries == 0
+    assert tree.stats()["entries"] == 499
+    check_sizes(tree.root, 3)
+    assert list(tree) == list(range(3, 1000, 2))
+
+
+def test_tombstone_snapshot_dump_and_split():
+    """スナップショット・dump・split_at・join が墓標を読み飛ばすことをテストします。"""
+    tree = TombstoneBTree(2, compact_ratio=0.9)
+    tree.insert_many((k, k) for k in range(200))
+    tree.delete_many(range(0, 200, 3))
+
+    snap = tree.snapshot()
+    tree.delete_many(range(1, 200, 3))
+    tree.update(2, -2)
+    assert list(snap) == [k for k in range(200) if k % 3]
+    assert snap.search(3) is None
+    assert snap.get_many([2]) == [2]
+    with pytest.raises(TypeError):
+        snap.delete(2)
+    with pytest.raises(TypeError):
+        snap.compact()
+
+    remaining = list(range(2, 200, 3))
+    buf = io.BytesIO()
+    tree.dump(buf)
+    buf.seek(0)
+    assert list(BTree.load(buf).items()) == [(2, -2)] + [(k, k) for k in remaining[1:]]
+
+    left, right = tree.split_at(100)
+    assert tree.dead_entries == 0
+    assert list(left) == [k for k in remaining if k < 100]
+    assert list(right) == [k for k in remaining if k >= 100]
+    right.delete(101)
+    joined = TombstoneBTree.join(left, right)
+    assert isinstance(joined, TombstoneBTree)
+    assert list(joined) == [k for k in remaining if k != 101]
+    # 墓標のあった入力は組み直されるが、内容は変わらない
+    assert right.dead_entries == 0
+    assert list(right) == [k for k in remaining if k >= 100 and k != 101]
+    assert joined.delete_range(50, 150) == sum(
+        1 for k in remaining if 50 <= k <= 150 and k != 101
+    )
+
+
+def test_tombstone_invalid_ratio():
+    """compact_ratio が範囲外の場合に ValueError になることをテストします。"""
+    with pytest.raises(ValueError):
+        TombstoneBTree(3, compact_ratio=0)
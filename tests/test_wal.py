@@ -0,0 +1,159 @@
+import os
+import random
+
+import pytest
+
+from b_tree.codec import decode_key, encode_key
+from b_tree.wal import LOG_FILE, SNAPSHOT_FILE, DurableBTree
+
+
+def test_encode_decode_key():
+    """キーをバイト列に変換して元に戻せることをテストします。"""
+    data = b"".join(encode_key(k) for k in [-5, "あいう", b"\x00\xff"])
+    offset = 0
+    decoded = []
+    for _ in range(3):
+        key, offset = decode_key(data, offset)
+        decoded.append(key)
+    assert decoded == [-5, "あいう", b"\x00\xff"]
+    assert offset == len(data)
+    with pytest.raises(TypeError):
+        encode_key(1.5)
+
+
+def test_recovery_replays_log(tmp_path):
+    """チェックポイントなしで閉じずに終了しても、ログから内容を復元できることをテストします。"""
+    directory = str(tmp_path / "db")
+    rng = random.Random(0)
+    tree = DurableBTree(directory, 3)
+    expected = {}
+    for k in rng.sample(range(10000), 500):
+        tree.insert(k, k * 2)
+        expected[k] = k * 2
+    for k in list(expected)[:200]:
+        assert tree.delete(k) is True
+        del expected[k]
+    k = next(iter(expected))
+    assert tree.update(k, -1) is True
+    expected[k] = -1
+    assert tree.update(-1, 0) is False
+    # close を呼ばずに再度開く (クラッシュを模擬する)
+
+    recovered = DurableBTree(directory, 3)
+    assert list(recovered.items()) == sorted(expected.items())
+    recovered.close()
+    tree.close()
+
+
+def test_checkpoint_truncates_log(tmp_path):
+    """チェックポイントでスナップショットが作成され、ログが空になることをテストします。"""
+    directory = str(tmp_path / "db")
+    with DurableBTree(directory, 4, checkpoint_every=100) as tree:
+        for k in range(250):
+            tree.insert(f"key{k:04d}", k)
+        # 200 件目でチェックポイントが行われ、残りの 50 件がログに残る
+        assert os.path.exists(os.path.join(directory, SNAPSHOT_FILE))
+        assert tree._records_since_checkpoint == 50
+
+    with DurableBTree(directory, 4) as tree:
+        assert list(tree.items()) == [(f"key{k:04d}", k) for k in range(250)]
+        tree.checkpoint()
+        assert os.path.getsize(os.path.join(directory, LOG_FILE)) == 0
+        tree.insert("zzz", 1)
+
+    with DurableBTree(directory, 4) as tree:
+        assert len(list(tree)) == 251
+        assert tree.get_many(["key0007", "zzz", "none"]) == [7, 1, None]
+
+
+def test_group_commit(tmp_path):
+    """group_size 件たまるまでログがファイルに書き込まれないことをテストします。"""
+    directory = str(tmp_path / "db")
+    tree = DurableBTree(directory, 3, group_size=10)
+    log_path = os.path.join(directory, LOG_FILE)
+    for k in range(9):
+        tree.insert(k, k)
+    assert os.path.getsize(log_path) == 0
+    tree.insert(9, 9)
+    size = os.path.getsize(log_path)
+    assert size > 0
+    tree.insert(10, 10)
+    assert os.path.getsize(log_path) == size
+    tree.commit()
+    assert os.path.getsize(log_path) > size
+    tree.close()
+
+
+def test_torn_tail_is_discarded(tmp_path):
+    """途中までしか書かれていない末尾のレコードを無視して復元できることをテストします。"""
+    directory = str(tmp_path / "db")
+    with DurableBTree(directory, 3) as tree:
+        for k in range(20):
+            tree.insert(k, k)
+    log_path = os.path.join(directory, LOG_FILE)
+    with open(log_path, "r+b") as f:
+        f.truncate(os.path.getsize(log_path) - 3)
+
+    with DurableBTree(directory, 3) as tree:
+        assert list(tree) == list(range(19))
+        # 切り詰めた後のログに続けて書き込める
+        tree.insert(100, 100)
+    with DurableBTree(directory, 3) as tree:
+        assert list(tree) == [*range(19), 100]
+
+
+def test_stale_log_after_checkpoint_is_skipped(tmp_path):
+    """スナップショットに含まれるログのレコードが二重に適用されないことをテストします。"""
+    directory = str(tmp_path / "db")
+    log_path = os.path.join(directory, LOG_FILE)
+    with DurableBTree(directory, 3) as tree:
+        for k in range(30):
+            tree.insert(k, k)
+        tree.commit()
+        with open(log_path, "rb") as f:
+            stale_log = f.read()
+        tree.checkpoint()
+    # スナップショットの置き換え後、ログを空にする前にクラッシュした状態を作る
+    with open(log_path, "wb") as f:
+        f.write(stale_log)
+
+    with DurableBTree(directory, 3) as tree:
+        assert list(tree) == list(range(30))
+        tree.insert(30, 30)
+    with DurableBTree(directory, 3) as tree:
+        assert list(tree) == list(range(31))
+
+
+def test_unloggable_operations_leave_tree_unchanged(tmp_path):
+    """ログに書けないキーや値の操作が、B木もログも変更しないことをテストします。"""
+    directory = str(tmp_path / "db")
+    with DurableBTree(directory, 3) as tree:
+        tree.insert_many((k, k) for k in range(10))
+        with pytest.raises(TypeError):
+            tree.insert(20, 2**63)
+        with pytest.raises(TypeError):
+            tree.insert(1.5, 0)
+        with pytest.raises(TypeError):
+            tree.update(3, -(2**63) - 1)
+        with pytest.raises(TypeError):
+            tree.insert_many([(11, 11), (2**64, 0)])
+        with pytest.raises(TypeError):
+            tree.delete_many([4, 5.0])
+        assert list(tree.items()) == [(k, k) for k in range(10)]
+        assert tree._records_since_checkpoint == 10
+
+    with DurableBTree(directory, 3) as tree:
+        assert list(tree.items()) == [(k, k) for k in range(10)]
+
+
+def test_batch_across_checkpoint(tmp_path):
+    """チェックポイントをまたぐ一括操作が、復元で二重に適用されないことをテストします。"""
+    directory = str(tmp_path / "db")
+    with DurableBTree(directory, 3, checkpoint_every=25) as tree:
+        tree.insert_many((k, k) for k in range(20))
+        tree.insert_many((k, k) for k in range(20, 40))
+        assert tree._records_since_checkpoint == 0
+        assert tree.delete_many(range(0, 40, 2)) == [True] * 20
+
+    with DurableBTree(directory, 3) as tree:
+        assert list(tree) == list(range(1, 40, 2))